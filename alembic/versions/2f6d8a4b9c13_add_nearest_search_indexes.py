@@ -0,0 +1,38 @@
+"""add_nearest_search_indexes
+
+Revision ID: 2f6d8a4b9c13
+Revises: e7b3c5d20a19
+Create Date: 2026-10-17 12:21:44.017326
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2f6d8a4b9c13"
+down_revision: Union[str, None] = "e7b3c5d20a19"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # add_column doesn't create the spatial index declared on the model,
+    # and the KNN (<->) ordering needs it
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_buildings_location "
+        "ON buildings USING gist (location)"
+    )
+    op.create_index(
+        "ix_organizations_building_id",
+        "organizations",
+        ["building_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_organizations_building_id", table_name="organizations")
+    op.execute("DROP INDEX IF EXISTS idx_buildings_location")
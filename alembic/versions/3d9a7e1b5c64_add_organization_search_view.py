@@ -0,0 +1,85 @@
+"""add_organization_search_view
+
+Revision ID: 3d9a7e1b5c64
+Revises: 8b1e4f7c2d56
+Create Date: 2026-10-17 15:12:27.318406
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3d9a7e1b5c64"
+down_revision: Union[str, None] = "8b1e4f7c2d56"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # activity_ids holds every ancestor of the organization's activities, so
+    # "in activity X or below" is `activity_ids @> ARRAY[X]`
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW organization_search AS
+        SELECT
+            organizations.id,
+            organizations.name,
+            search_normalize(organizations.name) AS search_name,
+            organizations.building_id,
+            buildings.latitude,
+            buildings.longitude,
+            buildings.location,
+            COALESCE(
+                (
+                    SELECT array_agg(
+                        DISTINCT activity_closure.ancestor_id
+                        ORDER BY activity_closure.ancestor_id
+                    )
+                    FROM organization_activities
+                    JOIN activity_closure
+                        ON activity_closure.descendant_id
+                        = organization_activities.activity_id
+                    WHERE organization_activities.organization_id = organizations.id
+                ),
+                '{}'
+            ) AS activity_ids,
+            COALESCE(
+                (
+                    SELECT array_agg(phones.number ORDER BY phones.id)
+                    FROM phones
+                    WHERE phones.organization_id = organizations.id
+                ),
+                '{}'
+            ) AS phones
+        FROM organizations
+        JOIN buildings ON buildings.id = organizations.building_id
+        """
+    )
+
+    # The unique index is what allows REFRESH ... CONCURRENTLY
+    op.execute(
+        "CREATE UNIQUE INDEX ux_organization_search_id ON organization_search (id)"
+    )
+    op.execute(
+        "CREATE INDEX ix_organization_search_activity_ids ON organization_search "
+        "USING gin (activity_ids)"
+    )
+    op.execute(
+        "CREATE INDEX ix_organization_search_location ON organization_search "
+        "USING gist (location)"
+    )
+    op.execute(
+        "CREATE INDEX ix_organization_search_search_name_trgm ON organization_search "
+        "USING gin (search_name gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_organization_search_phones ON organization_search "
+        "USING gin (phones)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS organization_search")
@@ -0,0 +1,47 @@
+"""add_trigram_name_search
+
+Revision ID: 5c8e1f0a7b2d
+Revises: d35f6413cf26
+Create Date: 2026-10-17 10:12:41.218305
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5c8e1f0a7b2d"
+down_revision: Union[str, None] = "d35f6413cf26"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Case-folds (Cyrillic included) and treats ё as е, must match
+    # core.repository.repository.normalize_search_text
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION search_normalize(value text) RETURNS text
+        LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+        AS $$ SELECT replace(lower(replace(value, 'Ё', 'Е')), 'ё', 'е') $$
+        """
+    )
+
+    op.execute(
+        "CREATE INDEX ix_organizations_name_trgm ON organizations "
+        "USING gin (search_normalize(name) gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_buildings_address_trgm ON buildings "
+        "USING gin (search_normalize(address) gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_buildings_address_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_organizations_name_trgm")
+    op.execute("DROP FUNCTION IF EXISTS search_normalize(text)")
@@ -0,0 +1,63 @@
+"""notify_geo_changes
+
+Revision ID: 8b1e4f7c2d56
+Revises: 2f6d8a4b9c13
+Create Date: 2026-10-17 13:37:52.640981
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8b1e4f7c2d56"
+down_revision: Union[str, None] = "2f6d8a4b9c13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Payload is "<table>:<id>" of the changed row, or "truncate", so the
+    # embedded spatial index (core.geo.engine) reloads only what changed
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_geo_changed() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                PERFORM pg_notify('geo_changed', 'truncate');
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('geo_changed', TG_TABLE_NAME || ':' || OLD.id);
+            ELSE
+                PERFORM pg_notify('geo_changed', TG_TABLE_NAME || ':' || NEW.id);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    for table in ("organizations", "buildings"):
+        op.execute(
+            f"""
+            CREATE TRIGGER geo_changed
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION notify_geo_changed()
+            """
+        )
+        op.execute(
+            f"""
+            CREATE TRIGGER geo_truncated
+            AFTER TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_geo_changed()
+            """
+        )
+
+
+def downgrade() -> None:
+    for table in ("organizations", "buildings"):
+        op.execute(f"DROP TRIGGER IF EXISTS geo_truncated ON {table}")
+        op.execute(f"DROP TRIGGER IF EXISTS geo_changed ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS notify_geo_changed()")
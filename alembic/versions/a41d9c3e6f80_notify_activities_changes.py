@@ -0,0 +1,47 @@
+"""notify_activities_changes
+
+Revision ID: a41d9c3e6f80
+Revises: 5c8e1f0a7b2d
+Create Date: 2026-10-17 11:03:17.554210
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a41d9c3e6f80"
+down_revision: Union[str, None] = "5c8e1f0a7b2d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Workers keep an in-memory copy of the activity tree and reload it
+    # when this channel fires (core.repository.activity_tree)
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_activities_changed() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            PERFORM pg_notify('activities_changed', '');
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER activities_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON activities
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_activities_changed()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS activities_changed ON activities")
+    op.execute("DROP FUNCTION IF EXISTS notify_activities_changed()")
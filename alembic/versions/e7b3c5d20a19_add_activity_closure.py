@@ -0,0 +1,136 @@
+"""add_activity_closure
+
+Revision ID: e7b3c5d20a19
+Revises: a41d9c3e6f80
+Create Date: 2026-10-17 11:48:05.903114
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e7b3c5d20a19"
+down_revision: Union[str, None] = "a41d9c3e6f80"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "activity_closure",
+        sa.Column("ancestor_id", sa.Integer(), nullable=False),
+        sa.Column("descendant_id", sa.Integer(), nullable=False),
+        sa.Column("depth", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["ancestor_id"], ["activities.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["descendant_id"], ["activities.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("ancestor_id", "descendant_id"),
+    )
+    op.create_index(
+        "ix_activity_closure_descendant_id",
+        "activity_closure",
+        ["descendant_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_organization_activities_activity_id_organization_id",
+        "organization_activities",
+        ["activity_id", "organization_id"],
+        unique=False,
+    )
+
+    op.execute(
+        """
+        INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE tree AS (
+            SELECT id AS ancestor_id, id AS descendant_id, 0 AS depth
+            FROM activities
+            UNION ALL
+            SELECT tree.ancestor_id, activities.id, tree.depth + 1
+            FROM tree
+            JOIN activities ON activities.parent_id = tree.descendant_id
+        )
+        SELECT ancestor_id, descendant_id, depth FROM tree
+        """
+    )
+
+    # Rows of deleted activities go away through ON DELETE CASCADE
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION activity_closure_insert() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+            SELECT NEW.id, NEW.id, 0
+            UNION ALL
+            SELECT ancestor_id, NEW.id, depth + 1
+            FROM activity_closure
+            WHERE descendant_id = NEW.parent_id;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION activity_closure_move() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            -- Detach the subtree from its former ancestors
+            DELETE FROM activity_closure
+            WHERE descendant_id IN (
+                SELECT descendant_id FROM activity_closure WHERE ancestor_id = NEW.id
+            )
+            AND ancestor_id IN (
+                SELECT ancestor_id FROM activity_closure
+                WHERE descendant_id = NEW.id AND ancestor_id <> NEW.id
+            );
+
+            -- and attach it under the new parent
+            INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+            SELECT above.ancestor_id, below.descendant_id, above.depth + below.depth + 1
+            FROM activity_closure AS above
+            CROSS JOIN activity_closure AS below
+            WHERE above.descendant_id = NEW.parent_id
+              AND below.ancestor_id = NEW.id;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER activity_closure_insert
+        AFTER INSERT ON activities
+        FOR EACH ROW EXECUTE FUNCTION activity_closure_insert()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER activity_closure_move
+        AFTER UPDATE OF parent_id ON activities
+        FOR EACH ROW
+        WHEN (OLD.parent_id IS DISTINCT FROM NEW.parent_id)
+        EXECUTE FUNCTION activity_closure_move()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS activity_closure_move ON activities")
+    op.execute("DROP TRIGGER IF EXISTS activity_closure_insert ON activities")
+    op.execute("DROP FUNCTION IF EXISTS activity_closure_move()")
+    op.execute("DROP FUNCTION IF EXISTS activity_closure_insert()")
+    op.drop_index(
+        "ix_organization_activities_activity_id_organization_id",
+        table_name="organization_activities",
+    )
+    op.drop_index("ix_activity_closure_descendant_id", table_name="activity_closure")
+    op.drop_table("activity_closure")
@@ -1,2 +1,3 @@
+from api.admin import router as admin_router
 from api.buildings import router as buildings_router
 from api.organizations import router as organizations_router
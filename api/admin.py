@@ -0,0 +1,63 @@
+import os
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from redis.asyncio import Redis
+
+from api.auth import handle_api_key
+from core.cache.local import local_cache
+from core.cache.policy import purge_stale_entries
+from core.cache.redis import get_redis_client
+from core.cache.stats import cache_prefix, flush_key_hits, get_top_keys
+from core.cache.utils import CACHE_NAMESPACES, bump_generation
+from schemas.cache import (
+    CacheGenerationResponse,
+    CachePurgeResponse,
+    CacheTopKeysResponse,
+)
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(handle_api_key)],
+)
+
+
+@router.post("/cache/{namespace}/bump", response_model=CacheGenerationResponse)
+async def bump_cache_generation(
+    namespace: str,
+    background_tasks: BackgroundTasks,
+    cache: Redis = Depends(get_redis_client),
+):
+    if namespace not in CACHE_NAMESPACES:
+        raise HTTPException(status_code=404, detail="Cache namespace not found")
+
+    generation: int = await bump_generation(cache, namespace)
+    background_tasks.add_task(purge_stale_entries, cache, namespace)
+
+    return {"namespace": namespace, "generation": generation}
+
+
+@router.post("/cache/purge", response_model=CachePurgeResponse)
+async def purge_cache(cache: Redis = Depends(get_redis_client)):
+    return {"deleted": await purge_stale_entries(cache)}
+
+
+@router.get("/cache/top-keys", response_model=CacheTopKeysResponse)
+async def get_cache_top_keys(
+    limit: int = Query(20, description="Number of keys", ge=1, le=1000),
+    cache: Redis = Depends(get_redis_client),
+):
+    """Most hit cache keys across workers, and the local cache of this one.
+
+    Workers add their counts to Redis periodically; the serving worker flushes
+    its own first.
+    """
+    await flush_key_hits(cache)
+    return {
+        "pid": os.getpid(),
+        "local_cache": local_cache.stats(),
+        "keys": [
+            {"key": key, "prefix": cache_prefix(key), "path": path, "hits": hits}
+            for key, path, hits in await get_top_keys(cache, limit)
+        ],
+    }
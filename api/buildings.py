@@ -1,17 +1,23 @@
-from typing import Any, Optional, Sequence
+from typing import Optional, Sequence, Union
 
 import orjson
-from fastapi import APIRouter, Depends, Query, Request
-from loguru import logger
+from fastapi import APIRouter, Depends, Query
 from redis.asyncio import Redis
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.auth import handle_api_key
+from config import settings
+from core.cache.policy import cached, get_or_set_batch
 from core.cache.redis import get_redis_client
-from core.cache.utils import build_get_query_cache_key, get_cache, set_cache
+from core.cache.responses import RawJSONResponse
+from core.repository.pagination import decode_cursor, split_page
 from core.repository.repository import CrudRepository
 from models import Building, get_session
+from schemas.batch import BatchRequest
 from schemas.building import BuildingResponse
+from schemas.pagination import CursorPage
+from schemas.serialization import dump_rows
 
 router = APIRouter(
     prefix="/buildings",
@@ -20,102 +26,94 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=list[BuildingResponse])
+@router.get(
+    "/",
+    response_model=Union[list[BuildingResponse], CursorPage[BuildingResponse]],
+)
+@cached("buildings")
 async def list_buildings(
-    request: Request,
     session: AsyncSession = Depends(get_session),
-    cache: Redis = Depends(get_redis_client),
-    limit: Optional[int] = Query(None, description="Query limit"),
-    offset: Optional[int] = Query(None, description="Query offset"),
+    limit: Optional[int] = Query(
+        None, description="Query limit", ge=1, le=settings.MAX_PAGE_SIZE
+    ),
+    offset: Optional[int] = Query(None, description="Query offset", ge=0),
+    cursor: Optional[str] = Query(
+        None, description="Keyset pagination cursor, pass it empty for the first page"
+    ),
 ):
-    cache_key: str = build_get_query_cache_key(prefix="buildings", url=request.url)
+    repository = CrudRepository(session)
 
-    try:
-        cached: Optional[str] = await get_cache(client=cache, key=cache_key)
-        if cached:
-            return orjson.loads(cached)
-    except Exception as e:
-        logger.warning(f"Cache get failed for {cache_key}: {e}")
+    if cursor is None:
+        result: Sequence[Row] = await repository.get_all_buildings(
+            limit=limit, offset=offset
+        )
+        return dump_rows(BuildingResponse, result)
 
-    repository = CrudRepository(session)
-    result: Sequence[Building] = await repository.get_all_buildings(
-        limit=limit, offset=offset
+    (after_id,) = decode_cursor(cursor, "id")
+    page_size: int = limit or settings.PAGE_SIZE
+    result: Sequence[Row] = await repository.get_all_buildings(
+        limit=page_size + 1, after_id=after_id
     )
+    page, next_cursor = split_page(result, page_size, lambda i: {"id": i.id})
 
-    response: list[dict[str, Any]] = [
-        BuildingResponse.model_validate(i).model_dump() for i in result
-    ]
+    return {
+        "items": dump_rows(BuildingResponse, page),
+        "next_cursor": next_cursor,
+    }
 
-    try:
-        await set_cache(
-            client=cache, key=cache_key, value=orjson.dumps(response), ttl=180
-        )
-    except Exception as e:
-        logger.warning(f"Cache set failed for {cache_key}: {e}")
 
-    return response
+@router.post("/batch", response_model=list[BuildingResponse])
+async def get_buildings_batch(
+    request: BatchRequest,
+    session: AsyncSession = Depends(get_session),
+    redis_client: Redis = Depends(get_redis_client),
+):
+    """Buildings by id, in request order; unknown ids are skipped."""
+    ids = list(dict.fromkeys(request.ids))
+
+    async def load(missing: list[int]) -> dict[int, bytes]:
+        repository = CrudRepository(session)
+        result: Sequence[Building] = await repository.get_buildings_by_ids(missing)
+        return {
+            i.id: orjson.dumps(BuildingResponse.model_validate(i).model_dump())
+            for i in result
+        }
+
+    found: dict[int, bytes] = await get_or_set_batch(
+        client=redis_client,
+        prefix="building_id",
+        paths={i: f"/buildings/{i}" for i in ids},
+        loader=load,
+    )
+
+    return RawJSONResponse(b"[" + b",".join(found[i] for i in ids if i in found) + b"]")
 
 
 @router.get("/{building_id}", response_model=BuildingResponse)
+@cached("building_id")
 async def get_building_by_id(
-    request: Request,
     building_id: int,
     session: AsyncSession = Depends(get_session),
-    cache: Redis = Depends(get_redis_client),
 ):
-    cache_key: str = build_get_query_cache_key(prefix="building_id", url=request.url)
-
-    try:
-        cached: Optional[str] = await get_cache(client=cache, key=cache_key)
-        if cached:
-            return orjson.loads(cached)
-    except Exception as e:
-        logger.warning(f"Cache get failed for {cache_key}: {e}")
-
     repository = CrudRepository(session)
     result: Optional[Building] = await repository.get_building_by_id(
         building_id=building_id
     )
-    response: dict[str, Any] = BuildingResponse.model_validate(result).model_dump()
-
-    try:
-        await set_cache(
-            client=cache, key=cache_key, value=orjson.dumps(response), ttl=180
-        )
-    except Exception as e:
-        logger.warning(f"Cache set failed for {cache_key}: {e}")
 
-    return response
+    return BuildingResponse.model_validate(result).model_dump()
 
 
-@router.get("/search/by-address", response_model=BuildingResponse)
-async def get_building_by_address(
-    request: Request,
-    address: str,
+@router.get("/search/by-address", response_model=list[BuildingResponse])
+@cached("building_address")
+async def get_buildings_by_address(
+    address: str = Query(..., description="Building address to search", min_length=1),
+    limit: int = Query(20, description="Query limit", ge=1, le=100),
+    offset: int = Query(0, description="Query offset", ge=0),
     session: AsyncSession = Depends(get_session),
-    cache: Redis = Depends(get_redis_client),
 ):
-    cache_key: str = build_get_query_cache_key(
-        prefix="building_address", url=request.url
-    )
-
-    try:
-        cached: Optional[str] = await get_cache(client=cache, key=cache_key)
-        if cached:
-            return orjson.loads(cached)
-    except Exception as e:
-        logger.warning(f"Cache get failed for {cache_key}: {e}")
-
     repository = CrudRepository(session)
-    result: Optional[Building] = await repository.get_building_by_address(address)
-
-    response: dict[str, Any] = BuildingResponse.model_validate(result).model_dump()
-
-    try:
-        await set_cache(
-            client=cache, key=cache_key, value=orjson.dumps(response), ttl=180
-        )
-    except Exception as e:
-        logger.warning(f"Cache set failed for {cache_key}: {e}")
+    result: Sequence[Row] = await repository.get_buildings_by_address(
+        address, limit=limit, offset=offset
+    )
 
-    return response
+    return dump_rows(BuildingResponse, result)
@@ -0,0 +1,7 @@
+from fastapi import Response
+
+from core.metrics import CONTENT_TYPE, render_metrics
+
+
+async def metrics() -> Response:
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
@@ -1,21 +1,33 @@
-from typing import Any, Optional, Sequence
+import zlib
+from typing import Any, AsyncIterator, Optional, Sequence, Union
 
 import orjson
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from loguru import logger
+from fastapi.responses import StreamingResponse
 from redis.asyncio import Redis
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.auth import handle_api_key
+from config import settings
+from core.cache.policy import CACHE_POLICIES, cached, get_or_set_batch
 from core.cache.redis import get_redis_client
-from core.cache.utils import build_get_query_cache_key, get_cache, set_cache
-from core.repository.repository import CrudRepository
-from models import Activity, Building, Organization, get_session
+from core.cache.responses import RawJSONResponse, cached_response
+from core.geo import Cluster, TileLocationSearch, cluster_tiles, get_clusters
+from core.repository.pagination import decode_cursor, split_page
+from core.repository.repository import CrudRepository, normalize_search_text
+from models import Activity, AsyncSessionLocal, Building, get_session
+from schemas.batch import BatchRequest
 from schemas.organization import (
     ActivityResponse,
+    ClusterResponse,
+    OrganizationDistanceResponse,
     OrganizationListResponse,
     OrganizationResponse,
+    OrganizationSearchResponse,
 )
+from schemas.pagination import CursorPage
+from schemas.serialization import dump_rows
 
 router = APIRouter(
     prefix="/organizations",
@@ -24,26 +36,24 @@ router = APIRouter(
 )
 
 
-@router.get("/by-building/{building_id}", response_model=list[OrganizationListResponse])
+@router.get(
+    "/by-building/{building_id}",
+    response_model=Union[
+        list[OrganizationListResponse], CursorPage[OrganizationListResponse]
+    ],
+)
+@cached("orgs_by_building")
 async def get_organizations_by_building(
-    request: Request,
     building_id: int,
-    limit: Optional[int] = Query(None, description="Query limit"),
-    offset: Optional[int] = Query(None, description="Query offset"),
+    limit: Optional[int] = Query(
+        None, description="Query limit", ge=1, le=settings.MAX_PAGE_SIZE
+    ),
+    offset: Optional[int] = Query(None, description="Query offset", ge=0),
+    cursor: Optional[str] = Query(
+        None, description="Keyset pagination cursor, pass it empty for the first page"
+    ),
     session: AsyncSession = Depends(get_session),
-    cache: Redis = Depends(get_redis_client),
 ):
-    cache_key: str = build_get_query_cache_key(
-        prefix="orgs_by_building", url=request.url
-    )
-
-    try:
-        cached: Optional[str] = await get_cache(client=cache, key=cache_key)
-        if cached:
-            return orjson.loads(cached)
-    except Exception as e:
-        logger.warning(f"Cache get failed for {cache_key}: {e}")
-
     repository = CrudRepository(session=session)
 
     building: Optional[Building] = await repository.get_building_by_id(
@@ -52,71 +62,76 @@ async def get_organizations_by_building(
     if not building:
         raise HTTPException(status_code=404, detail="Building not found")
 
-    result: Sequence[Organization] = await repository.get_organizations_by_building(
-        building_id, limit=limit, offset=offset
-    )
-
-    response: list[dict[str, Any]] = [
-        OrganizationListResponse.model_validate(i).model_dump() for i in result
-    ]
-
-    try:
-        await set_cache(
-            client=cache, key=cache_key, value=orjson.dumps(response), ttl=300
+    if cursor is None:
+        result: Sequence[Row] = await repository.get_organizations_by_building(
+            building_id, limit=limit, offset=offset
         )
-    except Exception as e:
-        logger.warning(f"Cache set failed for {cache_key}: {e}")
+        return dump_rows(OrganizationListResponse, result)
 
-    return response
+    (after_id,) = decode_cursor(cursor, "id")
+    page_size: int = limit or settings.PAGE_SIZE
+    result: Sequence[Row] = await repository.get_organizations_by_building(
+        building_id, limit=page_size + 1, after_id=after_id
+    )
+    page, next_cursor = split_page(result, page_size, lambda i: {"id": i.id})
 
+    return {
+        "items": dump_rows(OrganizationListResponse, page),
+        "next_cursor": next_cursor,
+    }
 
-@router.get("/by-activity/{activity_id}", response_model=list[OrganizationListResponse])
+
+@router.get(
+    "/by-activity/{activity_id}",
+    response_model=Union[
+        list[OrganizationListResponse], CursorPage[OrganizationListResponse]
+    ],
+)
+@cached("orgs_by_activity")
 async def get_organizations_by_activity(
-    request: Request,
     activity_id: int,
     session: AsyncSession = Depends(get_session),
-    cache: Redis = Depends(get_redis_client),
-    limit: Optional[int] = Query(None, description="Query limit"),
-    offset: Optional[int] = Query(None, description="Query offset"),
+    limit: Optional[int] = Query(
+        None, description="Query limit", ge=1, le=settings.MAX_PAGE_SIZE
+    ),
+    offset: Optional[int] = Query(None, description="Query offset", ge=0),
+    cursor: Optional[str] = Query(
+        None, description="Keyset pagination cursor, pass it empty for the first page"
+    ),
 ):
-    cache_key: str = build_get_query_cache_key(
-        prefix="orgs_by_activity", url=request.url
-    )
-
-    try:
-        cached: Optional[str] = await get_cache(client=cache, key=cache_key)
-        if cached:
-            return orjson.loads(cached)
-    except Exception as e:
-        logger.warning(f"Cache get failed for {cache_key}: {e}")
-
     repository = CrudRepository(session=session)
 
     activity: Optional[Activity] = await repository.get_activity_by_id(activity_id)
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
 
-    result = await repository.get_organizations_by_activity(
-        activity_id, limit=limit, offset=offset
-    )
-
-    response: list[dict[str, Any]] = [
-        OrganizationListResponse.model_validate(i).model_dump() for i in result
-    ]
-
-    try:
-        await set_cache(
-            client=cache, key=cache_key, value=orjson.dumps(response), ttl=300
+    if cursor is None:
+        result: Sequence[Row] = await repository.get_organizations_by_activity(
+            activity_id, limit=limit, offset=offset
         )
-    except Exception as e:
-        logger.warning(f"Cache set failed for {cache_key}: {e}")
+        return dump_rows(OrganizationListResponse, result)
+
+    (after_id,) = decode_cursor(cursor, "id")
+    page_size: int = limit or settings.PAGE_SIZE
+    result: Sequence[Row] = await repository.get_organizations_by_activity(
+        activity_id, limit=page_size + 1, after_id=after_id
+    )
+    page, next_cursor = split_page(result, page_size, lambda i: {"id": i.id})
 
-    return response
+    return {
+        "items": dump_rows(OrganizationListResponse, page),
+        "next_cursor": next_cursor,
+    }
 
 
-@router.get("/by-location", response_model=list[OrganizationListResponse])
+@router.get(
+    "/by-location",
+    response_model=Union[
+        list[OrganizationListResponse], CursorPage[OrganizationListResponse]
+    ],
+)
+@cached("orgs_by_location", skip=lambda: settings.GEO_CACHE_MODE == "tiles")
 async def get_organizations_by_location(
-    request: Request,
     latitude: float = Query(..., description="Center point latitude", ge=-90, le=90),
     longitude: float = Query(
         ..., description="Center point longitude", ge=-180, le=180
@@ -134,45 +149,54 @@ async def get_organizations_by_location(
     max_lon: Optional[float] = Query(
         None, description="Maximum longitude for rectangle", ge=-180, le=180
     ),
-    limit: Optional[int] = Query(None, description="Query limit"),
-    offset: Optional[int] = Query(None, description="Query offset"),
+    limit: Optional[int] = Query(
+        None, description="Query limit", ge=1, le=settings.LOCATION_MAX_RESULTS
+    ),
+    offset: Optional[int] = Query(None, description="Query offset", ge=0),
+    cursor: Optional[str] = Query(
+        None, description="Keyset pagination cursor, pass it empty for the first page"
+    ),
     session: AsyncSession = Depends(get_session),
-    cache: Redis = Depends(get_redis_client),
+    redis_client: Redis = Depends(get_redis_client),
 ):
-    cache_key: str = build_get_query_cache_key(
-        prefix="orgs_by_location", url=request.url
-    )
-
-    try:
-        cached: Optional[str] = await get_cache(client=cache, key=cache_key)
-        if cached:
-            return orjson.loads(cached)
-    except Exception as e:
-        logger.warning(f"Cache get failed for {cache_key}: {e}")
-
     repository = CrudRepository(session=session)
+    search: Union[CrudRepository, TileLocationSearch] = repository
+    if settings.GEO_CACHE_MODE == "tiles":
+        search = TileLocationSearch(client=redis_client, repository=repository)
+
+    # Capped even without a limit: a city-sized box would match the whole table
+    max_results: int = settings.LOCATION_MAX_RESULTS
+    page_size: int = limit or settings.PAGE_SIZE
 
     if radius is not None:
-        result: Sequence[Organization] = await repository.get_organizations_by_radius(
+        if cursor is None:
+            result: Sequence[
+                tuple[Row, float]
+            ] = await search.get_organizations_by_radius(
+                latitude=latitude,
+                longitude=longitude,
+                radius_meters=radius,
+                limit=limit or max_results,
+                offset=offset,
+            )
+            return dump_rows(OrganizationListResponse, (i for i, _ in result))
+
+        distance, after_id = decode_cursor(cursor, "distance", "id")
+        result: Sequence[tuple[Row, float]] = await search.get_organizations_by_radius(
             latitude=latitude,
             longitude=longitude,
             radius_meters=radius,
-            limit=limit,
-            offset=offset,
+            limit=page_size + 1,
+            after=None if after_id is None else (distance, after_id),
+        )
+        page, next_cursor = split_page(
+            result, page_size, lambda i: {"distance": i[1], "id": i[0].id}
         )
 
-        response: list[dict[str, Any]] = [
-            OrganizationListResponse.model_validate(i).model_dump() for i in result
-        ]
-
-        try:
-            await set_cache(
-                client=cache, key=cache_key, value=orjson.dumps(response), ttl=300
-            )
-        except Exception as e:
-            logger.warning(f"Cache set failed for {cache_key}: {e}")
-
-        return response
+        return {
+            "items": dump_rows(OrganizationListResponse, (i for i, _ in page)),
+            "next_cursor": next_cursor,
+        }
 
     elif all(
         [
@@ -194,12 +218,32 @@ async def get_organizations_by_location(
                 detail="Min longitude should be lower than max longitude",
             )
 
-        return await repository.get_organizations_by_area(
+        if cursor is None:
+            result: Sequence[Row] = await search.get_organizations_by_area(
+                min_latitude=min_lat,
+                max_latitude=max_lat,
+                min_longitude=min_lon,
+                max_longitude=max_lon,
+                limit=limit or max_results,
+                offset=offset,
+            )
+            return dump_rows(OrganizationListResponse, result)
+
+        (after_id,) = decode_cursor(cursor, "id")
+        result: Sequence[Row] = await search.get_organizations_by_area(
             min_latitude=min_lat,
             max_latitude=max_lat,
             min_longitude=min_lon,
             max_longitude=max_lon,
+            limit=page_size + 1,
+            after_id=after_id,
         )
+        page, next_cursor = split_page(result, page_size, lambda i: {"id": i.id})
+
+        return {
+            "items": dump_rows(OrganizationListResponse, page),
+            "next_cursor": next_cursor,
+        }
 
     else:
         raise HTTPException(
@@ -208,121 +252,364 @@ async def get_organizations_by_location(
         )
 
 
-@router.get("/{organization_id}", response_model=OrganizationResponse)
-async def get_organization_by_id(
+@router.get("/clusters", response_model=list[ClusterResponse])
+async def get_organization_clusters(
     request: Request,
-    organization_id: int,
+    min_lat: float = Query(..., description="Viewport minimum latitude", ge=-90, le=90),
+    max_lat: float = Query(..., description="Viewport maximum latitude", ge=-90, le=90),
+    min_lon: float = Query(
+        ..., description="Viewport minimum longitude", ge=-180, le=180
+    ),
+    max_lon: float = Query(
+        ..., description="Viewport maximum longitude", ge=-180, le=180
+    ),
+    zoom: int = Query(..., description="Map zoom level", ge=0, le=20),
     session: AsyncSession = Depends(get_session),
-    cache: Redis = Depends(get_redis_client),
+    redis_client: Redis = Depends(get_redis_client),
+):
+    if min_lat >= max_lat:
+        raise HTTPException(
+            status_code=400,
+            detail="Min latitude should be lower than max latutide",
+        )
+
+    if min_lon >= max_lon:
+        raise HTTPException(
+            status_code=400,
+            detail="Min longitude should be lower than max longitude",
+        )
+
+    tiles = cluster_tiles(min_lat, max_lat, min_lon, max_lon, zoom)
+    if len(tiles) > settings.GEO_CACHE_MAX_TILES:
+        raise HTTPException(
+            status_code=400,
+            detail="Viewport is too large for this zoom level",
+        )
+
+    clusters: list[Cluster] = await get_clusters(
+        client=redis_client,
+        repository=CrudRepository(session=session),
+        min_latitude=min_lat,
+        max_latitude=max_lat,
+        min_longitude=min_lon,
+        max_longitude=max_lon,
+        zoom=zoom,
+    )
+
+    # Built from tiles cached under the clusters policy, so they share its TTL
+    return cached_response(
+        request,
+        orjson.dumps([cluster._asdict() for cluster in clusters]),
+        max_age=CACHE_POLICIES["clusters"].expires_in,
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_organizations(
+    gzip: bool = Query(False, description="Gzip the stream"),
 ):
-    cache_key: str = build_get_query_cache_key(
-        prefix="organization_id", url=request.url
+    """All organizations with buildings, phones and activities as NDJSON."""
+    headers = {"Content-Encoding": "gzip"} if gzip else None
+    return StreamingResponse(
+        _export_chunks(compress=gzip),
+        media_type="application/x-ndjson",
+        headers=headers,
     )
 
-    try:
-        cached: Optional[str] = await get_cache(client=cache, key=cache_key)
-        if cached:
-            return orjson.loads(cached)
-    except Exception as e:
-        logger.warning(f"Cache get failed for {cache_key}: {e}")
 
+async def _export_chunks(compress: bool) -> AsyncIterator[bytes]:
+    # The request session is closed before the body is streamed
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    async with AsyncSessionLocal() as session:
+        repository = CrudRepository(session=session)
+        async for batch in repository.stream_organizations(
+            batch_size=settings.EXPORT_BATCH_SIZE
+        ):
+            chunk = b"".join(
+                orjson.dumps(OrganizationResponse.model_validate(i).model_dump())
+                + b"\n"
+                for i in batch
+            )
+            if compressor is not None:
+                chunk = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield chunk
+
+    if compressor is not None:
+        yield compressor.flush()
+
+
+@router.get("/nearest", response_model=list[OrganizationDistanceResponse])
+@cached("orgs_nearest")
+async def get_nearest_organizations(
+    lat: float = Query(..., description="Point latitude", ge=-90, le=90),
+    lon: float = Query(..., description="Point longitude", ge=-180, le=180),
+    k: int = Query(10, description="Number of organizations", ge=1, le=100),
+    activity_id: Optional[int] = Query(
+        None, description="Only organizations of this activity or its subactivities"
+    ),
+    session: AsyncSession = Depends(get_session),
+):
     repository = CrudRepository(session=session)
 
-    result: Optional[Organization] = await repository.get_organization_by_id(
-        organization_id
+    if activity_id is not None:
+        activity: Optional[Activity] = await repository.get_activity_by_id(activity_id)
+        if not activity:
+            raise HTTPException(status_code=404, detail="Activity not found")
+
+    result: Sequence[Row] = await repository.get_nearest_organizations(
+        latitude=lat, longitude=lon, k=k, activity_id=activity_id
     )
-    if not result:
-        raise HTTPException(status_code=404, detail="Organization not found")
 
-    response: dict[str, Any] = OrganizationResponse.model_validate(result).model_dump()
+    return dump_rows(OrganizationDistanceResponse, result)
 
-    try:
-        await set_cache(
-            client=cache, key=cache_key, value=orjson.dumps(response), ttl=180
-        )
-    except Exception as e:
-        logger.warning(f"Cache set failed for {cache_key}: {e}")
 
-    return response
+def _search_cache_params(arguments: dict[str, Any]) -> list[tuple[str, Any]]:
+    """Canonical filter set of /search: parsed values, normalized name, no
+    unset filters, so equivalent queries share an entry."""
+    params = {
+        key: value
+        for key, value in arguments.items()
+        if key != "session" and value is not None
+    }
+    if "name" in params:
+        params["name"] = normalize_search_text(params["name"])
+    return sorted(params.items())
 
 
-@router.get("/search/by-name", response_model=list[OrganizationListResponse])
-async def search_organizations_by_name(
-    name: str = Query(..., description="Organization name to search", min_length=1),
+@router.get("/search", response_model=CursorPage[OrganizationSearchResponse])
+@cached("orgs_search", key_params=_search_cache_params)
+async def search_organizations(
+    activity_id: Optional[int] = Query(
+        None, description="Only organizations of this activity or its subactivities"
+    ),
+    name: Optional[str] = Query(
+        None, description="Part of the organization name", min_length=1
+    ),
+    lat: Optional[float] = Query(
+        None, description="Point latitude, results go nearest first", ge=-90, le=90
+    ),
+    lon: Optional[float] = Query(
+        None, description="Point longitude, results go nearest first", ge=-180, le=180
+    ),
+    radius: Optional[float] = Query(
+        None, description="Search radius in meters around the point", gt=0
+    ),
+    min_lat: Optional[float] = Query(
+        None, description="Minimum latitude for rectangle", ge=-90, le=90
+    ),
+    max_lat: Optional[float] = Query(
+        None, description="Maximum latitude for rectangle", ge=-90, le=90
+    ),
+    min_lon: Optional[float] = Query(
+        None, description="Minimum longitude for rectangle", ge=-180, le=180
+    ),
+    max_lon: Optional[float] = Query(
+        None, description="Maximum longitude for rectangle", ge=-180, le=180
+    ),
+    limit: int = Query(
+        settings.PAGE_SIZE,
+        description="Page size",
+        ge=1,
+        le=settings.LOCATION_MAX_RESULTS,
+    ),
+    cursor: str = Query("", description="Keyset pagination cursor"),
     session: AsyncSession = Depends(get_session),
 ):
+    """Organizations matching all the given filters, one page at a time.
+
+    With a point (``lat``/``lon``) results are ordered nearest first and
+    carry their distance, otherwise they are ordered by id.
+    """
+    if (lat is None) != (lon is None):
+        raise HTTPException(
+            status_code=400, detail="Please provide both 'lat' and 'lon'"
+        )
+
+    if radius is not None and lat is None:
+        raise HTTPException(
+            status_code=400, detail="'radius' requires a point ('lat' and 'lon')"
+        )
+
+    box_bounds = (min_lat, max_lat, min_lon, max_lon)
+    box: Optional[tuple[float, float, float, float]] = None
+    if any(i is not None for i in box_bounds):
+        if any(i is None for i in box_bounds):
+            raise HTTPException(
+                status_code=400,
+                detail="Please provide all rectangle parameters (min_lat, max_lat, min_lon, max_lon)",
+            )
+        if min_lat >= max_lat:
+            raise HTTPException(
+                status_code=400,
+                detail="Min latitude should be lower than max latutide",
+            )
+        if min_lon >= max_lon:
+            raise HTTPException(
+                status_code=400,
+                detail="Min longitude should be lower than max longitude",
+            )
+        box = box_bounds
+
+    if activity_id is None and name is None and lat is None and box is None:
+        raise HTTPException(status_code=400, detail="Please provide a filter")
+
     repository = CrudRepository(session=session)
 
-    return await repository.get_organization_by_name(name)
+    if activity_id is not None:
+        activity: Optional[Activity] = await repository.get_activity_by_id(activity_id)
+        if not activity:
+            raise HTTPException(status_code=404, detail="Activity not found")
+
+    # Keyset position: the sort key of the last row
+    fields = ("id",) if lat is None else ("distance", "id")
+    after = decode_cursor(cursor, *fields)
+
+    result: Sequence[Row] = await repository.search_organizations(
+        activity_id=activity_id,
+        name=name,
+        latitude=lat,
+        longitude=lon,
+        radius_meters=radius,
+        box=box,
+        limit=limit + 1,
+        after=None if after[-1] is None else after,
+    )
+    page, next_cursor = split_page(
+        result, limit, lambda i: {field: getattr(i, field) for field in fields}
+    )
 
+    return {
+        "items": dump_rows(OrganizationSearchResponse, page),
+        "next_cursor": next_cursor,
+    }
 
-@router.get("/", response_model=list[OrganizationListResponse])
-async def list_all_organizations(
-    request: Request,
+
+@router.post("/batch", response_model=list[OrganizationResponse])
+async def get_organizations_batch(
+    request: BatchRequest,
     session: AsyncSession = Depends(get_session),
-    cache: Redis = Depends(get_redis_client),
-    limit: Optional[int] = Query(None, description="Query limit"),
-    offset: Optional[int] = Query(None, description="Query offset"),
+    redis_client: Redis = Depends(get_redis_client),
 ):
-    cache_key: str = build_get_query_cache_key(prefix="all_orgs", url=request.url)
+    """Organizations by id, in request order; unknown ids are skipped."""
+    ids = list(dict.fromkeys(request.ids))
+
+    async def load(missing: list[int]) -> dict[int, bytes]:
+        repository = CrudRepository(session=session)
+        return await repository.get_organization_documents(missing)
+
+    found: dict[int, bytes] = await get_or_set_batch(
+        client=redis_client,
+        prefix="organization_id",
+        paths={i: f"/organizations/{i}" for i in ids},
+        loader=load,
+    )
+
+    return RawJSONResponse(b"[" + b",".join(found[i] for i in ids if i in found) + b"]")
 
-    try:
-        cached: Optional[str] = await get_cache(client=cache, key=cache_key)
-        if cached:
-            return orjson.loads(cached)
-    except Exception as e:
-        logger.warning(f"Cache get failed for {cache_key}: {e}")
 
+@router.get("/{organization_id}", response_model=OrganizationResponse)
+@cached("organization_id")
+async def get_organization_by_id(
+    organization_id: int,
+    session: AsyncSession = Depends(get_session),
+):
     repository = CrudRepository(session=session)
-    result: Sequence[Organization] = await repository.get_all_organizations(
-        limit=limit, offset=offset
+
+    result: Optional[bytes] = await repository.get_organization_document(
+        organization_id
     )
+    if result is None:
+        raise HTTPException(status_code=404, detail="Organization not found")
 
-    response: list[dict[str, Any]] = [
-        OrganizationListResponse.model_validate(i).model_dump() for i in result
-    ]
+    return result
 
-    try:
-        await set_cache(
-            client=cache, key=cache_key, value=orjson.dumps(response), ttl=180
-        )
-    except Exception as e:
-        logger.warning(f"Cache set failed for {cache_key}: {e}")
 
-    return response
+@router.get("/search/by-name", response_model=list[OrganizationListResponse])
+@cached("orgs_by_name")
+async def search_organizations_by_name(
+    name: str = Query(..., description="Organization name to search", min_length=1),
+    limit: int = Query(20, description="Query limit", ge=1, le=100),
+    offset: int = Query(0, description="Query offset", ge=0),
+    session: AsyncSession = Depends(get_session),
+):
+    repository = CrudRepository(session=session)
+    result: Sequence[Row] = await repository.get_organization_by_name(
+        name, limit=limit, offset=offset
+    )
 
+    return dump_rows(OrganizationListResponse, result)
 
-@router.get("/activities/all", response_model=list[ActivityResponse])
-async def get_activity_ids(
-    request: Request,
+
+@router.get(
+    "/",
+    response_model=Union[
+        list[OrganizationListResponse], CursorPage[OrganizationListResponse]
+    ],
+)
+@cached("all_orgs")
+async def list_all_organizations(
     session: AsyncSession = Depends(get_session),
-    cache: Redis = Depends(get_redis_client),
-    limit: Optional[int] = Query(None, description="Query limit"),
-    offset: Optional[int] = Query(None, description="Query offset"),
+    limit: Optional[int] = Query(
+        None, description="Query limit", ge=1, le=settings.MAX_PAGE_SIZE
+    ),
+    offset: Optional[int] = Query(None, description="Query offset", ge=0),
+    cursor: Optional[str] = Query(
+        None, description="Keyset pagination cursor, pass it empty for the first page"
+    ),
 ):
-    cache_key: str = build_get_query_cache_key(prefix="all_activities", url=request.url)
+    repository = CrudRepository(session=session)
 
-    try:
-        cached: Optional[str] = await get_cache(client=cache, key=cache_key)
-        if cached:
-            return orjson.loads(cached)
-    except Exception as e:
-        logger.warning(f"Cache get failed for {cache_key}: {e}")
+    if cursor is None:
+        result: Sequence[Row] = await repository.get_all_organizations(
+            limit=limit, offset=offset
+        )
+        return dump_rows(OrganizationListResponse, result)
 
-    repository = CrudRepository(session=session)
-    result: list[tuple[Any]] = await repository.get_activity_ids(
-        limit=limit, offset=offset
+    (after_id,) = decode_cursor(cursor, "id")
+    page_size: int = limit or settings.PAGE_SIZE
+    result: Sequence[Row] = await repository.get_all_organizations(
+        limit=page_size + 1, after_id=after_id
     )
+    page, next_cursor = split_page(result, page_size, lambda i: {"id": i.id})
+
+    return {
+        "items": dump_rows(OrganizationListResponse, page),
+        "next_cursor": next_cursor,
+    }
 
-    response: list[dict[str, Any]] = [
-        ActivityResponse.model_validate(i).model_dump() for i in result
-    ]
 
-    try:
-        await set_cache(
-            client=cache, key=cache_key, value=orjson.dumps(response), ttl=600
+@router.get(
+    "/activities/all",
+    response_model=Union[list[ActivityResponse], CursorPage[ActivityResponse]],
+)
+@cached("all_activities")
+async def get_activity_ids(
+    session: AsyncSession = Depends(get_session),
+    limit: Optional[int] = Query(
+        None, description="Query limit", ge=1, le=settings.MAX_PAGE_SIZE
+    ),
+    offset: Optional[int] = Query(None, description="Query offset", ge=0),
+    cursor: Optional[str] = Query(
+        None, description="Keyset pagination cursor, pass it empty for the first page"
+    ),
+):
+    repository = CrudRepository(session=session)
+
+    if cursor is None:
+        result: Sequence[Row] = await repository.get_activity_ids(
+            limit=limit, offset=offset
         )
-    except Exception as e:
-        logger.warning(f"Cache set failed for {cache_key}: {e}")
+        return dump_rows(ActivityResponse, result)
+
+    (after_id,) = decode_cursor(cursor, "id")
+    page_size: int = limit or settings.PAGE_SIZE
+    result: Sequence[Row] = await repository.get_activity_ids(
+        limit=page_size + 1, after_id=after_id
+    )
+    page, next_cursor = split_page(result, page_size, lambda i: {"id": i.id})
 
-    return response
+    return {
+        "items": dump_rows(ActivityResponse, page),
+        "next_cursor": next_cursor,
+    }
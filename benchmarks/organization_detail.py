@@ -0,0 +1,106 @@
+"""Organization detail: ORM hydration vs. a JSON document built by Postgres.
+
+Runs both ways of producing the ``GET /organizations/{id}`` body against the
+configured database and prints per-request timings:
+
+python -m benchmarks.organization_detail --iterations 500
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable
+
+import orjson
+from sqlalchemy import select
+
+from core.repository.repository import CrudRepository
+from models import AsyncSessionLocal, Organization, async_engine
+from schemas.organization import OrganizationResponse
+
+
+async def _orm(repository: CrudRepository, organization_id: int) -> bytes:
+    organization = await repository.get_organization_by_id(organization_id)
+    return orjson.dumps(OrganizationResponse.model_validate(organization).model_dump())
+
+
+async def _document(repository: CrudRepository, organization_id: int) -> bytes:
+    return await repository.get_organization_document(organization_id)
+
+
+async def _measure(
+    load: Callable[[CrudRepository, int], Awaitable[bytes]],
+    ids: list[int],
+    iterations: int,
+) -> list[float]:
+    """Milliseconds per request, each on a fresh session like the API does."""
+    timings = []
+    for i in range(iterations):
+        organization_id = ids[i % len(ids)]
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            await load(CrudRepository(session=session), organization_id)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _report(name: str, timings: list[float]) -> None:
+    percentiles = statistics.quantiles(timings, n=100)
+    print(
+        f"{name:<10} mean {statistics.fmean(timings):7.3f} ms"
+        f"  p50 {percentiles[49]:7.3f} ms"
+        f"  p95 {percentiles[94]:7.3f} ms"
+        f"  p99 {percentiles[98]:7.3f} ms"
+    )
+
+
+async def _run(iterations: int, ids: list[int], warmup: int) -> None:
+    try:
+        if not ids:
+            async with AsyncSessionLocal() as session:
+                ids = list(
+                    (
+                        await session.scalars(
+                            select(Organization.id).order_by(Organization.id).limit(100)
+                        )
+                    ).all()
+                )
+        if not ids:
+            raise SystemExit("No organizations in the database")
+
+        async with AsyncSessionLocal() as session:
+            repository = CrudRepository(session=session)
+            for organization_id in ids:
+                if orjson.loads(
+                    await _orm(repository, organization_id)
+                ) != orjson.loads(await _document(repository, organization_id)):
+                    raise SystemExit(
+                        f"Documents differ for organization {organization_id}"
+                    )
+
+        for name, load in (("orm", _orm), ("document", _document)):
+            await _measure(load, ids, warmup)
+            _report(name, await _measure(load, ids, iterations))
+    finally:
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.organization_detail")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument(
+        "--ids",
+        type=int,
+        nargs="*",
+        default=[],
+        help="Organization ids to request, the first 100 by default",
+    )
+
+    args = parser.parse_args()
+    asyncio.run(_run(args.iterations, args.ids, args.warmup))
+
+
+if __name__ == "__main__":
+    main()
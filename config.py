@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -15,6 +17,65 @@ class Settings(BaseSettings):
 
     REDIS_URL: str
     CACHE_TTL: int
+    # Per-prefix TTL overrides for core.cache.policy.CACHE_POLICIES
+    CACHE_TTLS: dict[str, int] = {}
+    # Entries are kept this many seconds past their TTL and served stale
+    # while a single request refreshes them
+    CACHE_STALE_TTL: int = 30
+    # Payloads from this size on are stored zlib-compressed in Redis
+    CACHE_COMPRESS_MIN_BYTES: int = 1024
+    CACHE_COMPRESS_LEVEL: int = 6
+    # Cross-worker recompute lock
+    CACHE_LOCK_TIMEOUT: float = 10.0
+    CACHE_LOCK_WAIT: float = 2.0
+    CACHE_LOCK_POLL_INTERVAL: float = 0.05
+    # How long a worker trusts its copy of the invalidation generations
+    CACHE_GENERATION_LOCAL_TTL: int = 1
+
+    # In-process cache in front of Redis (per worker)
+    LOCAL_CACHE_MAX_ENTRIES: int = 1024
+    LOCAL_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    LOCAL_CACHE_TTL: int = 5
+    LOCAL_CACHE_TTLS: dict[str, int] = {"all_activities": 60}
+
+    # Distinct keys whose hits are counted for /admin/cache/top-keys, by each
+    # worker and in Redis, where workers add their counts every interval
+    CACHE_TOP_KEYS_TRACKED: int = 10000
+    CACHE_TOP_KEYS_FLUSH_INTERVAL: int = 10
+
+    # Seconds between activity tree version checks, on top of LISTEN/NOTIFY
+    ACTIVITY_TREE_CHECK_INTERVAL: int = 60
+
+    # Organizations per server-side cursor fetch of /organizations/export
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # Default page size of cursor pagination
+    PAGE_SIZE: int = 100
+    # Upper bound on the limit query parameter of list endpoints
+    MAX_PAGE_SIZE: int = 1000
+    # Upper bound on the organizations returned by one /by-location request
+    LOCATION_MAX_RESULTS: int = 1000
+
+    # "exact" caches /by-location per query, "tiles" caches the organizations
+    # of GEO_TILE_SIZE-degree grid cells and filters them in-process
+    GEO_CACHE_MODE: Literal["exact", "tiles"] = "exact"
+    GEO_TILE_SIZE: float = 0.01
+    # Larger searches skip the tile cache and go to the database
+    GEO_CACHE_MAX_TILES: int = 256
+    # Cells per side of a /organizations/clusters tile
+    CLUSTER_GRID_SIZE: int = 8
+    # "embedded" answers location searches from an in-memory index per worker
+    GEO_ENGINE: Literal["postgis", "embedded"] = "postgis"
+    # Full reload period of the embedded index, on top of LISTEN/NOTIFY updates
+    GEO_ENGINE_RELOAD_INTERVAL: int = 300
+
+    # Serve organization searches from the organization_search materialized
+    # view instead of joining the base tables; results lag until its refresh
+    SEARCH_VIEW_ENABLED: bool = False
+
+    # Warn when a request runs the same statement (up to its parameters)
+    # more times than this, the mark of N+1 queries
+    SQL_REPEATED_STATEMENT_THRESHOLD: int = 10
 
     # API Security
     API_KEY: str
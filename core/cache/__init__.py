@@ -1,2 +1,14 @@
+from .local import LocalCache, local_cache
+from .policy import CACHE_POLICIES, CachePolicy, cached
 from .redis import get_redis_client, init_redis, shutdown_redis
-from .utils import build_get_query_cache_key, delete_cache, get_cache, set_cache
+from .singleflight import single_flight
+from .utils import (
+    build_cache_key,
+    build_query_cache_key,
+    delete_cache,
+    get_cache,
+    get_many_cache,
+    get_or_set_cache,
+    set_cache,
+    set_many_cache,
+)
@@ -0,0 +1,57 @@
+"""Cache maintenance commands, e.g. after a bulk data load:
+
+python -m core.cache.cli bump organizations buildings
+python -m core.cache.cli purge
+"""
+
+import argparse
+import asyncio
+
+from redis import asyncio as redis_async
+
+from config import settings
+from core.cache.policy import purge_stale_entries
+from core.cache.utils import CACHE_NAMESPACES, bump_generation
+
+
+async def _bump(namespaces: list[str]) -> None:
+    client = redis_async.from_url(settings.REDIS_URL)
+    try:
+        for namespace in namespaces:
+            generation = await bump_generation(client, namespace)
+            print(f"{namespace}: generation {generation}")
+        for namespace in namespaces:
+            deleted = await purge_stale_entries(client, namespace)
+            print(f"{namespace}: purged {deleted} stale entries")
+    finally:
+        await client.close()
+
+
+async def _purge() -> None:
+    client = redis_async.from_url(settings.REDIS_URL)
+    try:
+        deleted = await purge_stale_entries(client)
+        print(f"Purged {deleted} stale entries")
+    finally:
+        await client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m core.cache.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bump = commands.add_parser("bump", help="Invalidate cached data of namespaces")
+    bump.add_argument(
+        "namespaces", nargs="*", choices=CACHE_NAMESPACES, default=CACHE_NAMESPACES
+    )
+    commands.add_parser("purge", help="Delete entries of old generations")
+
+    args = parser.parse_args()
+    if args.command == "bump":
+        asyncio.run(_bump(list(args.namespaces)))
+    else:
+        asyncio.run(_purge())
+
+
+if __name__ == "__main__":
+    main()
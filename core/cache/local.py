@@ -0,0 +1,98 @@
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from config import settings
+
+
+class LocalCache:
+    """Per-worker LRU cache with TTLs, kept in front of Redis.
+
+    Entries are evicted least-recently-used first whenever either the entry
+    count or the total payload size goes over its limit. TTLs are looked up by
+    key prefix (the part before the first ``:``) unless given explicitly.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        default_ttl: int,
+        prefix_ttls: Optional[dict[str, int]] = None,
+    ):
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.default_ttl: int = default_ttl
+        self.prefix_ttls: dict[str, int] = prefix_ttls or {}
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._size: int = 0
+
+    def ttl_for(self, key: str) -> int:
+        prefix = key.split(":", 1)[0]
+        return self.prefix_ttls.get(prefix, self.default_ttl)
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._discard(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        ttl = self.ttl_for(key) if ttl is None else ttl
+        size = len(value)
+
+        self._discard(key)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._size += size
+
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        self._discard(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+
+local_cache = LocalCache(
+    max_entries=settings.LOCAL_CACHE_MAX_ENTRIES,
+    max_bytes=settings.LOCAL_CACHE_MAX_BYTES,
+    default_ttl=settings.LOCAL_CACHE_TTL,
+    prefix_ttls=settings.LOCAL_CACHE_TTLS,
+)
@@ -0,0 +1,224 @@
+import functools
+import inspect
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+import orjson
+from fastapi import Depends, Request, Response
+from loguru import logger
+from redis.asyncio import Redis
+
+from config import settings
+from core.cache.redis import get_redis_client
+from core.cache.responses import cached_response
+from core.cache.stats import key_hits
+from core.cache.utils import (
+    build_query_cache_key,
+    canonical_query,
+    get_generations,
+    get_many_cache,
+    get_or_set_cache,
+    purge_stale_generations,
+    set_many_cache,
+)
+from core.request_stats import measure_serialization
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    prefix: str
+    ttl: Optional[int] = None
+    # Entities whose generation is folded into the key, see bump_generation
+    namespaces: tuple[str, ...] = ()
+
+    @property
+    def expires_in(self) -> int:
+        """TTL in seconds: ``CACHE_TTLS`` override, then policy, then ``CACHE_TTL``."""
+        ttl = self.ttl if self.ttl is not None else settings.CACHE_TTL
+        return settings.CACHE_TTLS.get(self.prefix, ttl)
+
+
+CACHE_POLICIES: dict[str, CachePolicy] = {
+    policy.prefix: policy
+    for policy in (
+        CachePolicy("buildings", ttl=180, namespaces=("buildings",)),
+        CachePolicy("building_id", ttl=180, namespaces=("buildings",)),
+        CachePolicy("building_address", ttl=180, namespaces=("buildings",)),
+        CachePolicy(
+            "orgs_by_building", ttl=300, namespaces=("organizations", "buildings")
+        ),
+        CachePolicy(
+            "orgs_by_activity", ttl=300, namespaces=("organizations", "activities")
+        ),
+        CachePolicy(
+            "orgs_by_location", ttl=300, namespaces=("organizations", "buildings")
+        ),
+        CachePolicy(
+            "orgs_nearest",
+            ttl=300,
+            namespaces=("organizations", "buildings", "activities"),
+        ),
+        CachePolicy("orgs_by_name", namespaces=("organizations",)),
+        CachePolicy(
+            "orgs_search",
+            ttl=300,
+            namespaces=("organizations", "buildings", "activities"),
+        ),
+        CachePolicy(
+            "organization_id",
+            ttl=180,
+            namespaces=("organizations", "buildings", "activities"),
+        ),
+        CachePolicy("all_orgs", ttl=180, namespaces=("organizations",)),
+        CachePolicy("all_activities", ttl=600, namespaces=("activities",)),
+        CachePolicy("geo_tile", ttl=600, namespaces=("organizations", "buildings")),
+        CachePolicy("clusters", ttl=600, namespaces=("organizations", "buildings")),
+    )
+}
+
+
+def cached(
+    prefix: str,
+    skip: Optional[Callable[[], bool]] = None,
+    key_params: Optional[Callable[[dict[str, Any]], Iterable[tuple[str, Any]]]] = None,
+) -> Callable:
+    """Serve a GET endpoint through the cache under the policy for ``prefix``.
+
+    The endpoint returns plain JSON-serializable data (or already serialized
+    bytes); the response is always the raw cached JSON. Keys are built from
+    the path and the sorted query parameters, so the host and the parameter
+    order don't produce separate entries. Responses carry the entry's ETag
+    and a ``Cache-Control`` max-age of what remains of its TTL (0 for a stale
+    entry); a matching ``If-None-Match`` on a cache hit is answered with a
+    304 without running the endpoint. ``key_params`` replaces the query
+    parameters with ones derived from the endpoint arguments, for endpoints
+    where different queries ask for the same thing. When ``skip`` returns
+    True the endpoint is called directly, for endpoints that do their own
+    caching.
+    """
+    policy = CACHE_POLICIES[prefix]
+
+    def decorator(endpoint: Callable) -> Callable:
+        signature = inspect.signature(endpoint)
+
+        @functools.wraps(endpoint)
+        async def wrapper(
+            *args: Any, _cache_request: Request, _cache_client: Redis, **kwargs: Any
+        ) -> Response:
+            async def load() -> bytes:
+                result = await endpoint(*args, **kwargs)
+                if isinstance(result, bytes):
+                    return result
+                with measure_serialization():
+                    return orjson.dumps(result)
+
+            if skip is not None and skip():
+                return cached_response(_cache_request, await load(), policy.expires_in)
+
+            try:
+                generations = await get_generations(_cache_client, policy.namespaces)
+            except Exception as e:
+                logger.warning(f"Cache generations lookup failed for {prefix}: {e}")
+                return cached_response(_cache_request, await load(), policy.expires_in)
+
+            params = list(
+                _cache_request.query_params.multi_items()
+                if key_params is None
+                else key_params(kwargs)
+            )
+            cache_key: str = build_query_cache_key(
+                prefix=policy.prefix,
+                path=_cache_request.url.path,
+                params=params,
+                generations=generations,
+            )
+
+            payload: bytes = await get_or_set_cache(
+                client=_cache_client,
+                key=cache_key,
+                ttl=policy.expires_in,
+                loader=load,
+            )
+            if key_hits.needs_path(cache_key):
+                key_hits.describe(
+                    cache_key, canonical_query(_cache_request.url.path, params)
+                )
+            return cached_response(_cache_request, payload, policy.expires_in)
+
+        wrapper.__signature__ = signature.replace(
+            parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter(
+                    "_cache_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request
+                ),
+                inspect.Parameter(
+                    "_cache_client",
+                    inspect.Parameter.KEYWORD_ONLY,
+                    annotation=Redis,
+                    default=Depends(get_redis_client),
+                ),
+            ]
+        )
+        return wrapper
+
+    return decorator
+
+
+async def get_or_set_batch(
+    client: Redis,
+    prefix: str,
+    paths: dict[int, str],
+    loader: Callable[[list[int]], Awaitable[dict[int, bytes]]],
+) -> dict[int, bytes]:
+    """Cached JSON of several detail resources, by id.
+
+    ``paths`` maps each id to the path of its detail endpoint, so entries are
+    shared with that endpoint's ``cached(prefix)``. Hits are read with one
+    MGET, misses come from a single ``loader`` call (ids it doesn't return
+    don't exist) and are written back in one pipeline.
+    """
+    policy = CACHE_POLICIES[prefix]
+    try:
+        generations = await get_generations(client, policy.namespaces)
+        keys = {
+            id_: build_query_cache_key(
+                prefix=policy.prefix, path=path, generations=generations
+            )
+            for id_, path in paths.items()
+        }
+        cached_values = await get_many_cache(client, list(keys.values()))
+    except Exception as e:
+        logger.warning(f"Cache get failed for {prefix} batch: {e}")
+        return await loader(list(paths))
+
+    result = {
+        id_: value for id_, value in zip(keys, cached_values) if value is not None
+    }
+    for id_ in result:
+        if key_hits.needs_path(keys[id_]):
+            key_hits.describe(keys[id_], canonical_query(paths[id_]))
+    missing = [id_ for id_ in keys if id_ not in result]
+    if missing:
+        loaded = await loader(missing)
+        result.update(loaded)
+        try:
+            await set_many_cache(
+                client,
+                {keys[id_]: value for id_, value in loaded.items()},
+                ttl=policy.expires_in,
+            )
+        except Exception as e:
+            logger.warning(f"Cache set failed for {prefix} batch: {e}")
+
+    return result
+
+
+async def purge_stale_entries(client: Redis, namespace: Optional[str] = None) -> int:
+    """Purge old-generation entries of every policy (depending on ``namespace``)."""
+    deleted = 0
+    for policy in CACHE_POLICIES.values():
+        if namespace is None or namespace in policy.namespaces:
+            deleted += await purge_stale_generations(
+                client, prefix=policy.prefix, namespaces=policy.namespaces
+            )
+    return deleted
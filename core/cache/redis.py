@@ -1,19 +1,50 @@
-from typing import Optional
+import time
+from typing import Any, Optional
 
 from redis import asyncio as redis_async
+from redis.asyncio.client import Pipeline
 
 from config import settings
+from core.request_stats import record_cache_call
+
+
+class InstrumentedRedis(redis_async.Redis):
+    """Redis client timing its round trips for the current request's stats."""
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        start_time = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            record_cache_call(time.perf_counter() - start_time)
+
+    def pipeline(
+        self, transaction: bool = True, shard_hint: Optional[str] = None
+    ) -> Pipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline timed as a single round trip when executed."""
+
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        start_time = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error=raise_on_error)
+        finally:
+            record_cache_call(time.perf_counter() - start_time)
+
 
 _redis_client: Optional[redis_async.Redis] = None
 
 
 async def init_redis() -> None:
     global _redis_client
-    _redis_client = redis_async.from_url(
-        settings.REDIS_URL,
-        encoding="utf-8",
-        decode_responses=True,
-    )
+    # Binary mode: cached payloads are serialized JSON bytes that are sent
+    # to clients as-is
+    _redis_client = InstrumentedRedis.from_url(settings.REDIS_URL)
 
 
 async def get_redis_client() -> redis_async.Redis:
@@ -0,0 +1,49 @@
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from core.cache.utils import with_etag
+
+
+class RawJSONResponse(Response):
+    """Response for JSON that is already serialized, e.g. a cached payload.
+
+    FastAPI returns ``Response`` instances as-is, so the body is neither parsed
+    nor validated against the route's ``response_model`` again.
+    """
+
+    media_type = "application/json"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header lists ``etag`` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+def cached_response(request: Request, payload: bytes, max_age: int) -> Response:
+    """``payload`` with its ETag and a ``Cache-Control`` of ``max_age`` seconds,
+    or an empty 304 when the client already has it.
+
+    ``max_age`` is lowered to the payload's remaining freshness when the cache
+    knows it, so clients don't keep an entry longer than the server does.
+    Responses depend on the API key, so shared caches key them on it.
+    """
+    payload = with_etag(payload)
+    fresh_for = payload.fresh_for()
+    if fresh_for is not None:
+        max_age = min(max_age, fresh_for)
+    headers = {
+        "ETag": payload.etag,
+        "Cache-Control": f"public, max-age={max_age}",
+        "Vary": "X-API-KEY",
+    }
+    if etag_matches(request.headers.get("if-none-match"), payload.etag):
+        return Response(status_code=304, headers=headers)
+    return RawJSONResponse(payload, headers=headers)
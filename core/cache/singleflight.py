@@ -0,0 +1,41 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+_in_flight: dict[str, asyncio.Task] = {}
+
+
+def is_in_flight(key: str) -> bool:
+    return key in _in_flight
+
+
+def start_flight(key: str, fn: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+    """The task running ``fn`` for ``key``, started unless one is running.
+
+    The task belongs to no caller: it runs to completion even if every caller
+    waiting for it goes away, and is forgotten once done.
+    """
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fn())
+        _in_flight[key] = task
+        task.add_done_callback(lambda done: _forget(key, done))
+    return task
+
+
+def _forget(key: str, task: asyncio.Task) -> None:
+    if _in_flight.get(key) is task:
+        del _in_flight[key]
+    # mark the exception as retrieved so a flight without waiters doesn't
+    # log a warning
+    if not task.cancelled():
+        task.exception()
+
+
+async def single_flight(key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """Run ``fn`` once per key for all concurrent callers in this worker.
+
+    The first caller starts ``fn``; callers arriving while it is still running
+    wait for the same result (or exception) instead of starting their own.
+    """
+    # shield: a caller being cancelled must not cancel the shared computation
+    return await asyncio.shield(start_flight(key, fn))
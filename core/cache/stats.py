@@ -0,0 +1,167 @@
+import asyncio
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from loguru import logger
+from redis.asyncio import Redis
+
+from config import settings
+from core.cache.redis import get_redis_client
+from core.metrics import (
+    CACHE_ERRORS,
+    CACHE_LOOKUPS,
+    CACHE_OPERATION_DURATION,
+    CACHE_PAYLOAD_SIZE,
+)
+
+
+def cache_prefix(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+TOP_KEYS_KEY = "cache_stats:top_keys"
+TOP_KEYS_PATHS_KEY = "cache_stats:top_key_paths"
+
+
+class KeyHits:
+    """Hit counts of the keys of this worker since they were last flushed.
+
+    Bounded: once more than ``max_keys`` keys are counted, the less hit half
+    is dropped, so a key needs a steady flow of hits to be counted. Keys of
+    path-based entries also get their canonical ``path?query``, which their
+    digest can't be turned back into.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys: int = max_keys
+        self._hits: Counter[str] = Counter()
+        self._paths: dict[str, str] = {}
+
+    def hit(self, key: str) -> None:
+        self._hits[key] += 1
+        if len(self._hits) > self.max_keys:
+            self._hits = Counter(dict(self._hits.most_common(self.max_keys // 2)))
+            self._paths = {
+                kept: path for kept, path in self._paths.items() if kept in self._hits
+            }
+
+    def needs_path(self, key: str) -> bool:
+        return key in self._hits and key not in self._paths
+
+    def describe(self, key: str, path: str) -> None:
+        self._paths[key] = path
+
+    def drain(self) -> tuple[Counter[str], dict[str, str]]:
+        """Counts and paths collected so far, which are then reset."""
+        hits, paths = self._hits, self._paths
+        self._hits, self._paths = Counter(), {}
+        return hits, paths
+
+    def clear(self) -> None:
+        self._hits.clear()
+        self._paths.clear()
+
+
+key_hits = KeyHits(max_keys=settings.CACHE_TOP_KEYS_TRACKED)
+_flusher: Optional[asyncio.Task] = None
+
+
+async def flush_key_hits(client: Redis) -> None:
+    """Add this worker's counts to the ones shared by all workers.
+
+    Counts go to a sorted set trimmed to the ``CACHE_TOP_KEYS_TRACKED`` most
+    hit keys, paths to a hash that loses the keys trimmed from it.
+    """
+    hits, paths = key_hits.drain()
+    if not hits:
+        return
+
+    async with client.pipeline() as pipe:
+        for key, count in hits.items():
+            pipe.zincrby(TOP_KEYS_KEY, count, key)
+        if paths:
+            pipe.hset(TOP_KEYS_PATHS_KEY, mapping=paths)
+        pipe.zrange(TOP_KEYS_KEY, 0, -settings.CACHE_TOP_KEYS_TRACKED - 1)
+        pipe.zremrangebyrank(TOP_KEYS_KEY, 0, -settings.CACHE_TOP_KEYS_TRACKED - 1)
+        *_, trimmed, _ = await pipe.execute()
+
+    if trimmed:
+        await client.hdel(TOP_KEYS_PATHS_KEY, *trimmed)
+
+
+async def get_top_keys(
+    client: Redis, limit: int
+) -> list[tuple[str, Optional[str], int]]:
+    """(key, path, hits) of the ``limit`` most hit keys across workers."""
+    top = await client.zrevrange(TOP_KEYS_KEY, 0, limit - 1, withscores=True)
+    if not top:
+        return []
+
+    paths = await client.hmget(TOP_KEYS_PATHS_KEY, [key for key, _ in top])
+    return [
+        (key.decode(), path.decode() if path is not None else None, int(hits))
+        for (key, hits), path in zip(top, paths)
+    ]
+
+
+async def _flush_key_hits_periodically() -> None:
+    client = await get_redis_client()
+    while True:
+        await asyncio.sleep(settings.CACHE_TOP_KEYS_FLUSH_INTERVAL)
+        try:
+            await flush_key_hits(client)
+        except Exception as e:
+            logger.warning(f"Cache key hits flush failed: {e}")
+
+
+async def init_cache_stats() -> None:
+    global _flusher
+    _flusher = asyncio.create_task(_flush_key_hits_periodically())
+
+
+async def shutdown_cache_stats() -> None:
+    """Stop the periodic flush and flush what is left."""
+    if _flusher is None:
+        return
+
+    _flusher.cancel()
+    try:
+        await flush_key_hits(await get_redis_client())
+    except Exception as e:
+        logger.warning(f"Cache key hits flush failed: {e}")
+
+
+def record_hit(key: str, result: str) -> None:
+    """A lookup of ``key`` answered from ``result``: local, redis or stale."""
+    CACHE_LOOKUPS.labels(cache_prefix(key), result).inc()
+    key_hits.hit(key)
+
+
+def record_miss(key: str) -> None:
+    CACHE_LOOKUPS.labels(cache_prefix(key), "miss").inc()
+
+
+def record_error(key: str, operation: str) -> None:
+    CACHE_ERRORS.labels(cache_prefix(key), operation).inc()
+
+
+def record_payload(key: str, operation: str, value: bytes) -> None:
+    CACHE_PAYLOAD_SIZE.labels(cache_prefix(key), operation).observe(len(value))
+
+
+@contextmanager
+def measure_operation(key: str, operation: str) -> Iterator[None]:
+    """Time a Redis round trip for ``key``'s prefix; count it as an error if
+    it raises."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        record_error(key, operation)
+        raise
+    finally:
+        CACHE_OPERATION_DURATION.labels(cache_prefix(key), operation).observe(
+            time.perf_counter() - start_time
+        )
@@ -1,20 +1,408 @@
+import asyncio
 import hashlib
-from typing import Any, Optional
+import time
+import zlib
+from typing import Awaitable, Callable, Iterable, Optional, Sequence
+from urllib.parse import urlencode
 
+from loguru import logger
 from redis.asyncio import Redis
 
+from config import settings
+from core.cache.local import local_cache
+from core.cache.singleflight import is_in_flight, single_flight, start_flight
+from core.cache.stats import (
+    measure_operation,
+    record_error,
+    record_hit,
+    record_miss,
+    record_payload,
+)
 
-async def get_cache(client: Redis, key: str) -> Optional[dict[str, Any]]:
-    return await client.get(name=key)
+CACHE_NAMESPACES: tuple[str, ...] = ("organizations", "buildings", "activities")
 
+# Header byte of a payload stored in Redis: bit 0 is set when the payload is
+# zlib-compressed, bit 1 when the 16-byte digest of its ETag comes next
+COMPRESSED_FLAG = 0x01
+ETAG_FLAG = 0x02
+ETAG_DIGEST_SIZE = 16
 
-async def set_cache(client: Redis, key: str, value: str, ttl: int) -> bool:
-    return await client.setex(name=key, time=ttl, value=value)
+
+class CachePayload(bytes):
+    """Cached JSON bytes along with their ETag.
+
+    The ETag is computed once when the payload is stored and kept in the
+    Redis entry and the local cache, so hits don't hash the payload again.
+    ``get_or_set_cache`` also sets ``fresh_until``, the ``time.monotonic()``
+    at which the entry stops being fresh, when it knows it.
+    """
+
+    etag: str
+    fresh_until: Optional[float] = None
+
+    def fresh_for(self) -> Optional[int]:
+        """Seconds, rounded, the entry stays fresh; None when unknown."""
+        if self.fresh_until is None:
+            return None
+        return max(round(self.fresh_until - time.monotonic()), 0)
+
+
+def with_etag(value: bytes, digest: Optional[bytes] = None) -> CachePayload:
+    """``value`` as a ``CachePayload``, hashing it unless ``digest`` is given."""
+    if isinstance(value, CachePayload) and digest is None:
+        return value
+
+    if digest is None:
+        digest = hashlib.blake2b(value, digest_size=ETAG_DIGEST_SIZE).digest()
+    payload = CachePayload(value)
+    payload.etag = f'"{digest.hex()}"'
+    return payload
+
+
+def encode_payload(value: bytes) -> bytes:
+    """Redis representation of ``value``: the header byte, the ETag digest,
+    then the payload, zlib-compressed from ``CACHE_COMPRESS_MIN_BYTES`` on."""
+    payload = with_etag(value)
+    header = ETAG_FLAG
+    body = bytes(payload)
+    if len(body) >= settings.CACHE_COMPRESS_MIN_BYTES:
+        header |= COMPRESSED_FLAG
+        body = zlib.compress(body, settings.CACHE_COMPRESS_LEVEL)
+    return bytes((header,)) + bytes.fromhex(payload.etag.strip('"')) + body
+
+
+def decode_payload(stored: bytes) -> CachePayload:
+    """Inverse of ``encode_payload``.
+
+    Entries written without the ETag digest get it computed; entries written
+    before the header existed are plain JSON, which never starts with a
+    header byte, and are returned as they are.
+    """
+    body, digest = _decode(stored)
+    return with_etag(body, digest)
+
+
+def _decode(stored: bytes) -> tuple[bytes, Optional[bytes]]:
+    """Payload and ETag digest, if stored, of a Redis entry."""
+    header = stored[0] if stored else None
+    if header is None or header > (COMPRESSED_FLAG | ETAG_FLAG):
+        return stored, None
+
+    digest = None
+    body = stored[1:]
+    if header & ETAG_FLAG:
+        digest, body = body[:ETAG_DIGEST_SIZE], body[ETAG_DIGEST_SIZE:]
+    if header & COMPRESSED_FLAG:
+        body = zlib.decompress(body)
+    return body, digest
+
+
+def _plain(value: Optional[bytes]) -> Optional[bytes]:
+    """``value`` as exact ``bytes``, which some consumers such as orjson need."""
+    return value if value is None or type(value) is bytes else bytes(value)
+
+
+async def get_cache(client: Redis, key: str) -> Optional[bytes]:
+    cached = local_cache.get(key)
+    if cached is not None:
+        record_hit(key, "local")
+        return cached
+
+    with measure_operation(key, "get"):
+        stored = await client.get(name=key)
+    if stored is None:
+        record_miss(key)
+        return None
+
+    record_hit(key, "redis")
+    record_payload(key, "get", stored)
+    cached = decode_payload(stored)
+    local_cache.set(key, cached)
+    return cached
+
+
+async def set_cache(client: Redis, key: str, value: bytes, ttl: int) -> bool:
+    """Store ``value`` as fresh for ``ttl`` seconds.
+
+    Redis keeps it for another ``CACHE_STALE_TTL`` seconds so that
+    ``get_or_set_cache`` can serve it stale while it is being refreshed.
+    """
+    value = with_etag(value)
+    local_cache.set(key, value, ttl=min(ttl, local_cache.ttl_for(key)))
+    stored = encode_payload(value)
+    record_payload(key, "set", stored)
+    with measure_operation(key, "set"):
+        return await client.setex(
+            name=key, time=ttl + settings.CACHE_STALE_TTL, value=stored
+        )
+
+
+async def get_many_cache(client: Redis, keys: Sequence[str]) -> list[Optional[bytes]]:
+    """``get_cache`` for several keys with a single MGET for the local misses.
+
+    The local cache keeps the payloads with their ETags, like ``get_cache``;
+    the returned values are plain ``bytes``.
+    """
+    values = [local_cache.get(key) for key in keys]
+    for key, value in zip(keys, values):
+        if value is not None:
+            record_hit(key, "local")
+
+    missing = [i for i, value in enumerate(values) if value is None]
+    if missing:
+        with measure_operation(keys[missing[0]], "get"):
+            fetched = await client.mget([keys[i] for i in missing])
+        for i, stored in zip(missing, fetched):
+            if stored is None:
+                record_miss(keys[i])
+                continue
+            record_hit(keys[i], "redis")
+            record_payload(keys[i], "get", stored)
+            values[i] = decode_payload(stored)
+            local_cache.set(keys[i], values[i])
+    return [_plain(value) for value in values]
+
+
+async def set_many_cache(client: Redis, items: dict[str, bytes], ttl: int) -> None:
+    """``set_cache`` for several entries in one pipeline round trip."""
+    if not items:
+        return
+
+    async with client.pipeline(transaction=False) as pipe:
+        for key, value in items.items():
+            value = with_etag(value)
+            local_cache.set(key, value, ttl=min(ttl, local_cache.ttl_for(key)))
+            stored = encode_payload(value)
+            record_payload(key, "set", stored)
+            pipe.setex(name=key, time=ttl + settings.CACHE_STALE_TTL, value=stored)
+        with measure_operation(next(iter(items)), "set"):
+            await pipe.execute()
 
 
 async def delete_cache(client: Redis, key: str) -> None:
+    local_cache.delete(key)
     await client.delete(key)
 
 
-def build_get_query_cache_key(prefix: str, url: str) -> str:
-    return f"{prefix}:{hashlib.sha256(str(url).encode()).hexdigest()}"
+async def get_or_set_cache(
+    client: Redis,
+    key: str,
+    ttl: int,
+    loader: Callable[[], Awaitable[bytes]],
+) -> bytes:
+    """Return the cached value for ``key``, computing it with ``loader`` on a miss.
+
+    Concurrent misses in one worker share a single ``loader`` call, and a Redis
+    lock makes other workers wait for that result instead of recomputing it.
+    Entries past their TTL but still inside the stale window are returned
+    as-is right away, while a background task (one per key and worker)
+    refreshes them. Returned
+    payloads are ``CachePayload``s whose ``fresh_for()`` is what remains of
+    the TTL, 0 for stale ones.
+    """
+    cached = local_cache.get(key)
+    if cached is not None:
+        record_hit(key, "local")
+        return cached
+
+    try:
+        with measure_operation(key, "get"):
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.pttl(key)
+                stored, pttl = await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Cache get failed for {key}: {e}")
+        return await single_flight(key, loader)
+
+    if stored is None:
+        record_miss(key)
+        return await single_flight(
+            key, lambda: _refresh_cache(client, key, ttl, loader, stale=None)
+        )
+
+    record_payload(key, "get", stored)
+    cached = decode_payload(stored)
+    stale_ms = settings.CACHE_STALE_TTL * 1000
+    if pttl < 0 or pttl > stale_ms:
+        record_hit(key, "redis")
+        fresh_for = local_cache.ttl_for(key)
+        if pttl > 0:
+            cached.fresh_until = time.monotonic() + (pttl - stale_ms) / 1000
+            fresh_for = min(fresh_for, (pttl - stale_ms) // 1000)
+        local_cache.set(key, cached, ttl=fresh_for)
+        return cached
+
+    record_hit(key, "stale")
+    cached.fresh_until = time.monotonic()
+    if not is_in_flight(key):
+        start_flight(
+            key, lambda: _refresh_in_background(client, key, ttl, loader, cached)
+        )
+    return cached
+
+
+async def _refresh_in_background(
+    client: Redis,
+    key: str,
+    ttl: int,
+    loader: Callable[[], Awaitable[bytes]],
+    stale: bytes,
+) -> bytes:
+    """``_refresh_cache`` for a stale entry, with nobody to report errors to."""
+    try:
+        return await _refresh_cache(client, key, ttl, loader, stale=stale)
+    except Exception as e:
+        logger.warning(f"Cache refresh failed for {key}: {e}")
+        return stale
+
+
+async def _refresh_cache(
+    client: Redis,
+    key: str,
+    ttl: int,
+    loader: Callable[[], Awaitable[bytes]],
+    stale: Optional[bytes],
+) -> bytes:
+    lock = client.lock(
+        f"lock:{key}", timeout=settings.CACHE_LOCK_TIMEOUT, thread_local=False
+    )
+    try:
+        locked = await lock.acquire(blocking=False)
+    except Exception as e:
+        logger.warning(f"Cache lock failed for {key}: {e}")
+        record_error(key, "lock")
+        locked = None
+
+    if locked is False:
+        if stale is not None:
+            return stale
+
+        cached = await _wait_for_cache(client, key)
+        if cached is not None:
+            return cached
+
+    try:
+        value = with_etag(await loader())
+        value.fresh_until = time.monotonic() + ttl
+        try:
+            await set_cache(client=client, key=key, value=value, ttl=ttl)
+        except Exception as e:
+            logger.warning(f"Cache set failed for {key}: {e}")
+        return value
+    finally:
+        if locked:
+            try:
+                await lock.release()
+            except Exception as e:
+                logger.warning(f"Cache lock release failed for {key}: {e}")
+
+
+async def _wait_for_cache(client: Redis, key: str) -> Optional[bytes]:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.CACHE_LOCK_WAIT
+
+    while loop.time() < deadline:
+        await asyncio.sleep(settings.CACHE_LOCK_POLL_INTERVAL)
+        try:
+            with measure_operation(key, "get"):
+                stored = await client.get(name=key)
+        except Exception as e:
+            logger.warning(f"Cache get failed for {key}: {e}")
+            return None
+        if stored is not None:
+            return decode_payload(stored)
+
+    return None
+
+
+def canonical_query(path: str, params: Iterable[tuple[str, str]] = ()) -> str:
+    """``path?query`` with sorted parameters, what query cache keys digest."""
+    return f"{path}?{urlencode(sorted(params))}"
+
+
+def build_query_cache_key(
+    prefix: str,
+    path: str,
+    params: Iterable[tuple[str, str]] = (),
+    generations: Sequence[int] = (),
+) -> str:
+    canonical = canonical_query(path, params)
+    digest = hashlib.sha256(canonical.encode()).hexdigest()
+    return build_cache_key(prefix, digest, generations=generations)
+
+
+def build_cache_key(prefix: str, suffix: str, generations: Sequence[int] = ()) -> str:
+    """``prefix:[generations:]suffix``, the layout ``purge_stale_generations`` expects."""
+    if generations:
+        return f"{prefix}:{_generation_tag(generations)}:{suffix}"
+    return f"{prefix}:{suffix}"
+
+
+def _generation_key(namespace: str) -> str:
+    return f"cache_generation:{namespace}"
+
+
+def _generation_tag(generations: Sequence[int]) -> str:
+    return "g" + ".".join(str(generation) for generation in generations)
+
+
+async def get_generations(client: Redis, namespaces: Sequence[str]) -> list[int]:
+    """Current generation of each namespace; a namespace never bumped is 0.
+
+    Generations are kept in the local cache for ``CACHE_GENERATION_LOCAL_TTL``
+    seconds, so a bump made through another worker is seen within that delay.
+    """
+    keys = [_generation_key(namespace) for namespace in namespaces]
+    values = [local_cache.get(key) for key in keys]
+
+    missing = [i for i, value in enumerate(values) if value is None]
+    if missing:
+        fetched = await client.mget([keys[i] for i in missing])
+        for i, value in zip(missing, fetched):
+            values[i] = value or b"0"
+            local_cache.set(keys[i], values[i], ttl=settings.CACHE_GENERATION_LOCAL_TTL)
+
+    return [int(value) for value in values]
+
+
+async def bump_generation(client: Redis, namespace: str) -> int:
+    """Invalidate every entry depending on ``namespace`` in O(1).
+
+    Old entries are no longer addressed by any key and expire on their own,
+    or can be removed earlier with ``purge_stale_generations``.
+    """
+    if namespace not in CACHE_NAMESPACES:
+        raise ValueError(f"Unknown cache namespace: {namespace}")
+
+    key = _generation_key(namespace)
+    generation = await client.incr(key)
+    local_cache.delete(key)
+    return generation
+
+
+async def purge_stale_generations(
+    client: Redis,
+    prefix: str,
+    namespaces: Sequence[str],
+    batch_size: int = 500,
+) -> int:
+    """Delete entries under ``prefix`` that were built for older generations.
+
+    Keys are walked with SCAN in ``batch_size`` steps and unlinked per batch,
+    so Redis is never blocked on a large keyspace.
+    """
+    current = f"{prefix}:{_generation_tag(await get_generations(client, namespaces))}:"
+    deleted = 0
+    batch: list[bytes] = []
+
+    async for key in client.scan_iter(match=f"{prefix}:g*", count=batch_size):
+        if not key.decode().startswith(current):
+            batch.append(key)
+        if len(batch) >= batch_size:
+            deleted += await client.unlink(*batch)
+            batch = []
+
+    if batch:
+        deleted += await client.unlink(*batch)
+    return deleted
@@ -0,0 +1,17 @@
+from .cache import TileLocationSearch
+from .clusters import Cluster, cluster_tiles, get_clusters
+from .engine import (
+    SpatialIndex,
+    get_spatial_index,
+    init_geo_engine,
+    shutdown_geo_engine,
+)
+from .tiles import (
+    EARTH_RADIUS_METERS,
+    OrganizationPoint,
+    box_around,
+    sphere_distance,
+    tile_bounds,
+    tile_of,
+    tiles_in_box,
+)
@@ -0,0 +1,216 @@
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional, Sequence
+
+import orjson
+from loguru import logger
+from redis.asyncio import Redis
+
+from config import settings
+from core.cache.policy import CACHE_POLICIES, CachePolicy
+from core.cache.utils import (
+    build_cache_key,
+    get_generations,
+    get_many_cache,
+    set_many_cache,
+)
+from core.geo.tiles import (
+    OrganizationPoint,
+    Tile,
+    box_around,
+    sphere_distance,
+    tile_of,
+    tiles_in_box,
+)
+
+if TYPE_CHECKING:
+    from core.repository.repository import CrudRepository
+
+TILE_POLICY = CACHE_POLICIES["geo_tile"]
+
+
+class TileLocationSearch:
+    """Location searches served from cached grid tiles.
+
+    Mirrors ``CrudRepository.get_organizations_by_radius`` and
+    ``get_organizations_by_area``. The organizations of every tile touched
+    by the search are read with one MGET, tiles missing from the cache are
+    loaded with one query, and the exact filter, ordering and pagination are
+    applied in-process. Nearby searches share tiles and so cache entries.
+
+    Distances are great-circle distances on the same sphere as PostGIS.
+    """
+
+    def __init__(
+        self,
+        client: Redis,
+        repository: "CrudRepository",
+        tile_size: Optional[float] = None,
+        max_tiles: Optional[int] = None,
+    ):
+        self.client: Redis = client
+        self.repository: "CrudRepository" = repository
+        self.tile_size: float = tile_size or settings.GEO_TILE_SIZE
+        self.max_tiles: int = max_tiles or settings.GEO_CACHE_MAX_TILES
+
+    async def get_organizations_by_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_meters: float,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        after: Optional[tuple[float, int]] = None,
+    ) -> Sequence[tuple[OrganizationPoint, float]]:
+        tiles = tiles_in_box(
+            *box_around(latitude, longitude, radius_meters), self.tile_size
+        )
+        if len(tiles) > self.max_tiles:
+            return await self.repository.get_organizations_by_radius(
+                latitude=latitude,
+                longitude=longitude,
+                radius_meters=radius_meters,
+                limit=limit,
+                offset=offset,
+                after=after,
+            )
+
+        result = []
+        for organization in await self._get_tiles(tiles):
+            distance = sphere_distance(
+                latitude, longitude, organization.latitude, organization.longitude
+            )
+            if distance <= radius_meters and (
+                after is None or (distance, organization.id) > tuple(after)
+            ):
+                result.append((organization, distance))
+
+        result.sort(key=lambda i: (i[1], i[0].id))
+        return _slice(result, limit, offset)
+
+    async def get_organizations_by_area(
+        self,
+        min_latitude: float,
+        max_latitude: float,
+        min_longitude: float,
+        max_longitude: float,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        after_id: Optional[int] = None,
+    ) -> Sequence[OrganizationPoint]:
+        tiles = tiles_in_box(
+            min_latitude, max_latitude, min_longitude, max_longitude, self.tile_size
+        )
+        if len(tiles) > self.max_tiles:
+            return await self.repository.get_organizations_by_area(
+                min_latitude=min_latitude,
+                max_latitude=max_latitude,
+                min_longitude=min_longitude,
+                max_longitude=max_longitude,
+                limit=limit,
+                offset=offset,
+                after_id=after_id,
+            )
+
+        result = [
+            organization
+            for organization in await self._get_tiles(tiles)
+            if min_latitude <= organization.latitude <= max_latitude
+            and min_longitude <= organization.longitude <= max_longitude
+            and (after_id is None or organization.id > after_id)
+        ]
+
+        result.sort(key=lambda i: i.id)
+        return _slice(result, limit, offset)
+
+    async def _get_tiles(self, tiles: list[Tile]) -> list[OrganizationPoint]:
+        rows = await get_tiles(
+            self.client,
+            TILE_POLICY,
+            tiles,
+            name=lambda tile: f"{self.tile_size}:{tile[0]}:{tile[1]}",
+            loader=self._load_tiles,
+        )
+        return [OrganizationPoint(*row) for row in rows]
+
+    async def _load_tiles(
+        self, tiles: list[Tile]
+    ) -> dict[Tile, list[OrganizationPoint]]:
+        """Organizations of ``tiles``, with one query over their bounding box.
+
+        The box is padded: ``row * tile_size`` can round either way of a
+        coordinate that ``tile_of`` puts in the tile, so points on an edge
+        are fetched anyway and assigned by ``tile_of`` below.
+        """
+        pad = self.tile_size * 1e-6
+        rows = await self.repository.get_organization_points(
+            min_latitude=min(row for row, _ in tiles) * self.tile_size - pad,
+            max_latitude=(max(row for row, _ in tiles) + 1) * self.tile_size + pad,
+            min_longitude=min(col for _, col in tiles) * self.tile_size - pad,
+            max_longitude=(max(col for _, col in tiles) + 1) * self.tile_size + pad,
+        )
+
+        loaded: dict[Tile, list[OrganizationPoint]] = {tile: [] for tile in tiles}
+        for row in rows:
+            organization = OrganizationPoint(*row)
+            tile = tile_of(
+                organization.latitude, organization.longitude, self.tile_size
+            )
+            if tile in loaded:
+                loaded[tile].append(organization)
+        return loaded
+
+
+async def get_tiles(
+    client: Redis,
+    policy: CachePolicy,
+    tiles: list[Tile],
+    name: Callable[[Tile], str],
+    loader: Callable[[list[Tile]], Awaitable[dict[Tile, list[Sequence]]]],
+) -> list[Sequence]:
+    """Rows of all ``tiles``, cached per tile under ``policy``.
+
+    Cached tiles are read with one MGET, the missing ones come from a single
+    ``loader`` call and are written back in one pipeline. Rows are stored as
+    JSON arrays.
+    """
+    try:
+        generations = await get_generations(client, policy.namespaces)
+        keys = [
+            build_cache_key(policy.prefix, name(tile), generations=generations)
+            for tile in tiles
+        ]
+        cached = await get_many_cache(client, keys)
+    except Exception as e:
+        logger.warning(f"Cache get failed for {policy.prefix} tiles: {e}")
+        return [row for rows in (await loader(tiles)).values() for row in rows]
+
+    result: list[Sequence] = []
+    missing: list[int] = []
+    for i, value in enumerate(cached):
+        if value is None:
+            missing.append(i)
+        else:
+            result.extend(orjson.loads(value))
+
+    if missing:
+        loaded = await loader([tiles[i] for i in missing])
+        for rows in loaded.values():
+            result.extend(rows)
+
+        try:
+            await set_many_cache(
+                client,
+                {
+                    keys[i]: orjson.dumps([list(row) for row in loaded[tiles[i]]])
+                    for i in missing
+                },
+                ttl=policy.expires_in,
+            )
+        except Exception as e:
+            logger.warning(f"Cache set failed for {policy.prefix} tiles: {e}")
+
+    return result
+
+
+def _slice(items: list, limit: Optional[int], offset: Optional[int]) -> list:
+    start = offset or 0
+    return items[start : start + limit if limit is not None else None]
@@ -0,0 +1,96 @@
+from typing import TYPE_CHECKING, NamedTuple
+
+from redis.asyncio import Redis
+
+from config import settings
+from core.cache.policy import CACHE_POLICIES
+from core.geo.cache import get_tiles
+from core.geo.tiles import Tile, tile_of, tiles_in_box
+
+if TYPE_CHECKING:
+    from core.repository.repository import CrudRepository
+
+CLUSTER_POLICY = CACHE_POLICIES["clusters"]
+
+
+class Cluster(NamedTuple):
+    latitude: float
+    longitude: float
+    count: int
+
+
+def cluster_tile_size(zoom: int) -> float:
+    """Side in degrees of a cached tile: 360° split 2^zoom times."""
+    return 360.0 / 2**zoom
+
+
+def cluster_tiles(
+    min_latitude: float,
+    max_latitude: float,
+    min_longitude: float,
+    max_longitude: float,
+    zoom: int,
+) -> list[Tile]:
+    return tiles_in_box(
+        min_latitude,
+        max_latitude,
+        min_longitude,
+        max_longitude,
+        cluster_tile_size(zoom),
+    )
+
+
+async def get_clusters(
+    client: Redis,
+    repository: "CrudRepository",
+    min_latitude: float,
+    max_latitude: float,
+    min_longitude: float,
+    max_longitude: float,
+    zoom: int,
+) -> list[Cluster]:
+    """Organization counts and centroids per grid cell inside the viewport.
+
+    Each tile is split into ``CLUSTER_GRID_SIZE`` x ``CLUSTER_GRID_SIZE``
+    cells and cached on its own, so panning and other clients looking at the
+    same area reuse the tiles. Clusters are returned when their centroid is
+    in the viewport.
+    """
+    tile_size = cluster_tile_size(zoom)
+    cell_size = tile_size / settings.CLUSTER_GRID_SIZE
+
+    async def load(tiles: list[Tile]) -> dict[Tile, list[Cluster]]:
+        rows = await repository.get_clusters(
+            min_latitude=min(row for row, _ in tiles) * tile_size,
+            max_latitude=(max(row for row, _ in tiles) + 1) * tile_size,
+            min_longitude=min(col for _, col in tiles) * tile_size,
+            max_longitude=(max(col for _, col in tiles) + 1) * tile_size,
+            cell_size=cell_size,
+        )
+
+        loaded: dict[Tile, list[Cluster]] = {tile: [] for tile in tiles}
+        for cell_latitude, cell_longitude, latitude, longitude, count in rows:
+            # A tile side is a whole number of cells, so a cell center lies
+            # in the tile holding the whole cell
+            tile = tile_of(cell_latitude, cell_longitude, tile_size)
+            if tile in loaded:
+                loaded[tile].append(Cluster(latitude, longitude, count))
+        return loaded
+
+    tiles = cluster_tiles(
+        min_latitude, max_latitude, min_longitude, max_longitude, zoom
+    )
+    clusters = await get_tiles(
+        client,
+        CLUSTER_POLICY,
+        tiles,
+        name=lambda tile: f"{zoom}:{tile[0]}:{tile[1]}",
+        loader=load,
+    )
+
+    return [
+        cluster
+        for cluster in map(lambda row: Cluster(*row), clusters)
+        if min_latitude <= cluster.latitude <= max_latitude
+        and min_longitude <= cluster.longitude <= max_longitude
+    ]
@@ -0,0 +1,319 @@
+import asyncio
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+import asyncpg
+import numpy as np
+from loguru import logger
+from sqlalchemy import or_, select
+
+from config import settings
+from core.geo.tiles import EARTH_RADIUS_METERS, OrganizationPoint, box_around
+from models import AsyncSessionLocal, Building, Organization, async_engine
+
+NOTIFY_CHANNEL = "geo_changed"
+
+
+class OrganizationDistance(NamedTuple):
+    id: int
+    name: str
+    building_id: int
+    distance: float
+
+
+# Per-row arrays of SpatialIndex, kept in the same order as ``names``
+_COLUMNS = (
+    "ids",
+    "building_ids",
+    "latitudes",
+    "longitudes",
+    "_phi",
+    "_lambda",
+    "_sin_phi",
+    "_cos_phi",
+)
+
+
+class SpatialIndex:
+    """Immutable in-memory index of organization locations.
+
+    One row per organization, sorted by latitude, so a search only looks at
+    the latitude band it can match and filters that band with vectorized
+    sphere distances. Distances and orderings follow the PostGIS queries of
+    ``CrudRepository``: meters on the PostGIS sphere, ties broken by id.
+    """
+
+    def __init__(self, points: Iterable[Sequence]):
+        points = sorted(
+            (OrganizationPoint(*point) for point in points), key=lambda i: i.latitude
+        )
+
+        self.ids = np.array([i.id for i in points], dtype=np.int64)
+        self.building_ids = np.array([i.building_id for i in points], dtype=np.int64)
+        self.latitudes = np.array([i.latitude for i in points], dtype=np.float64)
+        self.longitudes = np.array([i.longitude for i in points], dtype=np.float64)
+        self.names: list[str] = [i.name for i in points]
+
+        self._phi = np.radians(self.latitudes)
+        self._lambda = np.radians(self.longitudes)
+        self._sin_phi = np.sin(self._phi)
+        self._cos_phi = np.cos(self._phi)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def updated(
+        self,
+        organization_ids: Iterable[int],
+        building_ids: Iterable[int],
+        points: Iterable[Sequence],
+    ) -> "SpatialIndex":
+        """Copy without the given organizations and buildings, plus ``points``.
+
+        Only ``points`` are sorted and have their trigonometry computed, the
+        kept rows are masked and the new ones merged in by latitude.
+        """
+        kept = ~(
+            np.isin(self.ids, list(organization_ids))
+            | np.isin(self.building_ids, list(building_ids))
+        )
+        added = SpatialIndex(points)
+        positions = np.searchsorted(self.latitudes[kept], added.latitudes, side="right")
+
+        index = SpatialIndex.__new__(SpatialIndex)
+        for column in _COLUMNS:
+            setattr(
+                index,
+                column,
+                np.insert(
+                    getattr(self, column)[kept], positions, getattr(added, column)
+                ),
+            )
+        names = np.empty(len(added), dtype=object)
+        names[:] = added.names
+        index.names = np.insert(
+            np.array(self.names, dtype=object)[kept], positions, names
+        ).tolist()
+        return index
+
+    def radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_meters: float,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        after: Optional[tuple[float, int]] = None,
+    ) -> list[tuple[OrganizationPoint, float]]:
+        min_lat, max_lat, _, _ = box_around(latitude, longitude, radius_meters)
+        band = self._latitude_band(min_lat - 1e-9, max_lat + 1e-9)
+        distances = self._distances(latitude, longitude, band)
+
+        mask = distances <= radius_meters
+        if after is not None:
+            after_distance, after_id = after
+            mask &= (distances > after_distance) | (
+                (distances == after_distance) & (self.ids[band] > after_id)
+            )
+
+        rows = np.arange(band.start, band.stop)[mask]
+        distances = distances[mask]
+        order = _page(np.lexsort((self.ids[rows], distances)), limit, offset)
+        return [(self._point(rows[i]), float(distances[i])) for i in order]
+
+    def box(
+        self,
+        min_latitude: float,
+        max_latitude: float,
+        min_longitude: float,
+        max_longitude: float,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        after_id: Optional[int] = None,
+    ) -> list[OrganizationPoint]:
+        band = self._latitude_band(min_latitude, max_latitude)
+        longitudes = self.longitudes[band]
+
+        mask = (longitudes >= min_longitude) & (longitudes <= max_longitude)
+        if after_id is not None:
+            mask &= self.ids[band] > after_id
+
+        rows = np.arange(band.start, band.stop)[mask]
+        order = _page(np.argsort(self.ids[rows], kind="stable"), limit, offset)
+        return [self._point(rows[i]) for i in order]
+
+    def nearest(
+        self, latitude: float, longitude: float, k: int
+    ) -> list[tuple[OrganizationPoint, float]]:
+        distances = self._distances(latitude, longitude, slice(0, len(self)))
+        rows = np.arange(len(self))
+        if k < len(self):
+            # Everything as near as the k-th one, so ties on it still go by id
+            kth = np.partition(distances, k - 1)[k - 1]
+            rows = rows[distances <= kth]
+
+        order = np.lexsort((self.ids[rows], distances[rows]))[:k]
+        return [(self._point(rows[i]), float(distances[rows[i]])) for i in order]
+
+    def _latitude_band(self, min_latitude: float, max_latitude: float) -> slice:
+        start = np.searchsorted(self.latitudes, min_latitude, side="left")
+        stop = np.searchsorted(self.latitudes, max_latitude, side="right")
+        return slice(int(start), int(max(start, stop)))
+
+    def _distances(self, latitude: float, longitude: float, band: slice) -> np.ndarray:
+        """Same formula as PostGIS' sphere_distance, so results match it."""
+        phi = np.radians(latitude)
+        sin_phi, cos_phi = np.sin(phi), np.cos(phi)
+        d_lambda = self._lambda[band] - np.radians(longitude)
+        cos_d_lambda = np.cos(d_lambda)
+
+        a = np.hypot(
+            self._cos_phi[band] * np.sin(d_lambda),
+            cos_phi * self._sin_phi[band]
+            - sin_phi * self._cos_phi[band] * cos_d_lambda,
+        )
+        b = sin_phi * self._sin_phi[band] + cos_phi * self._cos_phi[band] * cos_d_lambda
+        return EARTH_RADIUS_METERS * np.arctan2(a, b)
+
+    def _point(self, row: int) -> OrganizationPoint:
+        return OrganizationPoint(
+            id=int(self.ids[row]),
+            name=self.names[row],
+            building_id=int(self.building_ids[row]),
+            latitude=float(self.latitudes[row]),
+            longitude=float(self.longitudes[row]),
+        )
+
+
+def _page(order: np.ndarray, limit: Optional[int], offset: Optional[int]) -> np.ndarray:
+    start = offset or 0
+    return order[start : start + limit if limit is not None else None]
+
+
+_spatial_index: Optional[SpatialIndex] = None
+_changed = asyncio.Event()
+_changed_organizations: set[int] = set()
+_changed_buildings: set[int] = set()
+_reload_requested: bool = False
+_watcher: Optional[asyncio.Task] = None
+_listener: Optional[asyncpg.Connection] = None
+
+
+def get_spatial_index() -> Optional[SpatialIndex]:
+    """The embedded index, when ``GEO_ENGINE`` is "embedded" and it is loaded."""
+    if settings.GEO_ENGINE != "embedded":
+        return None
+    return _spatial_index
+
+
+async def _load_points(
+    organization_ids: Iterable[int] = (), building_ids: Iterable[int] = ()
+) -> list[tuple]:
+    query = (
+        select(
+            Organization.id,
+            Organization.name,
+            Organization.building_id,
+            Building.latitude,
+            Building.longitude,
+        )
+        .join(Building, Building.id == Organization.building_id)
+        .where(Building.location.isnot(None))
+    )
+    organization_ids, building_ids = list(organization_ids), list(building_ids)
+    if organization_ids or building_ids:
+        query = query.where(
+            or_(
+                Organization.id.in_(organization_ids),
+                Organization.building_id.in_(building_ids),
+            )
+        )
+
+    async with AsyncSessionLocal() as session:
+        return (await session.execute(query)).tuples().all()
+
+
+async def reload_spatial_index() -> None:
+    global _spatial_index
+
+    _spatial_index = SpatialIndex(await _load_points())
+    logger.info(f"Spatial index loaded: {len(_spatial_index)} organizations")
+
+
+async def _apply_changes(organization_ids: set[int], building_ids: set[int]) -> None:
+    """Reload only the changed organizations and the ones in changed buildings."""
+    global _spatial_index
+
+    points = await _load_points(organization_ids, building_ids)
+    _spatial_index = _spatial_index.updated(organization_ids, building_ids, points)
+
+
+def _on_notify(connection, pid, channel, payload: str) -> None:
+    global _reload_requested
+
+    table, _, row_id = payload.partition(":")
+    if table == "organizations":
+        _changed_organizations.add(int(row_id))
+    elif table == "buildings":
+        _changed_buildings.add(int(row_id))
+    else:
+        _reload_requested = True
+    _changed.set()
+
+
+async def _watch_spatial_index() -> None:
+    global _reload_requested
+
+    while True:
+        try:
+            await asyncio.wait_for(
+                _changed.wait(), timeout=settings.GEO_ENGINE_RELOAD_INTERVAL
+            )
+        except asyncio.TimeoutError:
+            _reload_requested = True
+        _changed.clear()
+
+        reload, _reload_requested = _reload_requested, False
+        organization_ids, building_ids = (
+            set(_changed_organizations),
+            set(_changed_buildings),
+        )
+        _changed_organizations.clear()
+        _changed_buildings.clear()
+
+        try:
+            if reload or _spatial_index is None:
+                await reload_spatial_index()
+            elif organization_ids or building_ids:
+                await _apply_changes(organization_ids, building_ids)
+        except Exception as e:
+            logger.warning(f"Spatial index refresh failed: {e}")
+            _reload_requested = True
+
+
+async def init_geo_engine() -> None:
+    """Load the embedded index and keep it in sync, when it is enabled."""
+    global _listener, _watcher
+
+    if settings.GEO_ENGINE != "embedded":
+        return
+
+    await reload_spatial_index()
+
+    try:
+        _listener = await asyncpg.connect(
+            async_engine.url.set(drivername="postgresql").render_as_string(
+                hide_password=False
+            )
+        )
+        await _listener.add_listener(NOTIFY_CHANNEL, _on_notify)
+    except Exception as e:
+        logger.warning(f"Spatial index LISTEN failed, using periodic reloads only: {e}")
+
+    _watcher = asyncio.create_task(_watch_spatial_index())
+
+
+async def shutdown_geo_engine() -> None:
+    if _watcher is not None:
+        _watcher.cancel()
+    if _listener is not None:
+        await _listener.close()
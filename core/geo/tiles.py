@@ -0,0 +1,84 @@
+import math
+from typing import NamedTuple
+
+# Mean Earth radius, the sphere PostGIS uses for geography with use_spheroid=false
+EARTH_RADIUS_METERS: float = 6371008.771415
+
+Tile = tuple[int, int]
+
+
+class OrganizationPoint(NamedTuple):
+    id: int
+    name: str
+    building_id: int
+    latitude: float
+    longitude: float
+
+
+def sphere_distance(
+    latitude: float, longitude: float, other_latitude: float, other_longitude: float
+) -> float:
+    """Great-circle distance in meters, computed the way PostGIS does on the sphere."""
+    phi1, phi2 = math.radians(latitude), math.radians(other_latitude)
+    d_lambda = math.radians(other_longitude - longitude)
+
+    a = math.hypot(
+        math.cos(phi2) * math.sin(d_lambda),
+        math.cos(phi1) * math.sin(phi2)
+        - math.sin(phi1) * math.cos(phi2) * math.cos(d_lambda),
+    )
+    b = math.sin(phi1) * math.sin(phi2) + math.cos(phi1) * math.cos(phi2) * math.cos(
+        d_lambda
+    )
+    return EARTH_RADIUS_METERS * math.atan2(a, b)
+
+
+def box_around(
+    latitude: float, longitude: float, radius_meters: float
+) -> tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lon, max_lon) containing the circle.
+
+    Clamped to valid coordinates: circles across the antimeridian are cut,
+    like the rectangle search.
+    """
+    d_lat = math.degrees(radius_meters / EARTH_RADIUS_METERS)
+    min_lat, max_lat = max(latitude - d_lat, -90.0), min(latitude + d_lat, 90.0)
+
+    cos_lat = min(math.cos(math.radians(min_lat)), math.cos(math.radians(max_lat)))
+    if cos_lat <= 1e-9:
+        return min_lat, max_lat, -180.0, 180.0
+
+    d_lon = min(d_lat / cos_lat, 180.0)
+    return (
+        min_lat,
+        max_lat,
+        max(longitude - d_lon, -180.0),
+        min(longitude + d_lon, 180.0),
+    )
+
+
+def tile_of(latitude: float, longitude: float, tile_size: float) -> Tile:
+    return math.floor(latitude / tile_size), math.floor(longitude / tile_size)
+
+
+def tiles_in_box(
+    min_lat: float, max_lat: float, min_lon: float, max_lon: float, tile_size: float
+) -> list[Tile]:
+    min_row, min_col = tile_of(min_lat, min_lon, tile_size)
+    max_row, max_col = tile_of(max_lat, max_lon, tile_size)
+    return [
+        (row, col)
+        for row in range(min_row, max_row + 1)
+        for col in range(min_col, max_col + 1)
+    ]
+
+
+def tile_bounds(tile: Tile, tile_size: float) -> tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lon, max_lon) of a tile."""
+    row, col = tile
+    return (
+        row * tile_size,
+        (row + 1) * tile_size,
+        col * tile_size,
+        (col + 1) * tile_size,
+    )
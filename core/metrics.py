@@ -0,0 +1,106 @@
+"""Prometheus metrics of the application.
+
+Under gunicorn every worker is a separate process: with
+``PROMETHEUS_MULTIPROC_DIR`` set, samples go to files in that directory and
+``render_metrics`` aggregates all workers (see gunicorn.conf.py for dead
+worker cleanup). Without it, as in tests, the default registry is used.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS = Counter(
+    "http_requests",
+    "Requests by route template and status code",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements run per request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+HTTP_REQUEST_PHASE_DURATION = Histogram(
+    "http_request_phase_duration_seconds",
+    "Time per request spent on db, cache and serialization",
+    ["route", "phase"],
+    buckets=LATENCY_BUCKETS,
+)
+REPEATED_STATEMENTS = Counter(
+    "http_request_repeated_statements",
+    "Requests running one statement more than SQL_REPEATED_STATEMENT_THRESHOLD times",
+    ["route"],
+)
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups",
+    "Cache reads by prefix and result: local, redis or stale hit, or miss",
+    ["prefix", "result"],
+)
+CACHE_ERRORS = Counter(
+    "cache_errors",
+    "Failed Redis cache operations by prefix",
+    ["prefix", "operation"],
+)
+CACHE_PAYLOAD_SIZE = Histogram(
+    "cache_payload_bytes",
+    "Size of cached payloads read from or written to Redis",
+    ["prefix", "operation"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+CACHE_OPERATION_DURATION = Histogram(
+    "cache_operation_duration_seconds",
+    "Redis cache round trip latency by prefix",
+    ["prefix", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+def render_metrics() -> bytes:
+    """All metrics in the Prometheus text format, summed over workers."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
@@ -0,0 +1,126 @@
+import asyncio
+from collections import defaultdict
+from types import MappingProxyType
+from typing import Iterable, Optional
+
+import asyncpg
+from loguru import logger
+from sqlalchemy import text
+
+from config import settings
+from models import AsyncSessionLocal, async_engine
+
+NOTIFY_CHANNEL = "activities_changed"
+
+_VERSION_QUERY = text(
+    "SELECT md5(coalesce(string_agg("
+    "id::text || ':' || coalesce(parent_id::text, ''), ',' ORDER BY id), '')) "
+    "FROM activities"
+)
+_ROWS_QUERY = text("SELECT id, parent_id FROM activities")
+
+
+class ActivityTreeIndex:
+    """Immutable snapshot of the activity tree with precomputed descendants."""
+
+    def __init__(self, rows: Iterable[tuple[int, Optional[int]]], version: str):
+        children: dict[int, list[int]] = defaultdict(list)
+        ids: list[int] = []
+        for activity_id, parent_id in rows:
+            ids.append(activity_id)
+            if parent_id is not None:
+                children[parent_id].append(activity_id)
+
+        descendants: dict[int, tuple[int, ...]] = {}
+        for activity_id in ids:
+            subtree, stack = [], [activity_id]
+            while stack:
+                current = stack.pop()
+                subtree.append(current)
+                stack.extend(children.get(current, ()))
+            descendants[activity_id] = tuple(sorted(subtree))
+
+        self.version: str = version
+        self._descendants = MappingProxyType(descendants)
+
+    def __contains__(self, activity_id: int) -> bool:
+        return activity_id in self._descendants
+
+    def __len__(self) -> int:
+        return len(self._descendants)
+
+    def descendants(self, activity_id: int) -> tuple[int, ...]:
+        """IDs of the activity and all of its children, at any depth."""
+        return self._descendants[activity_id]
+
+
+_activity_tree: Optional[ActivityTreeIndex] = None
+_changed = asyncio.Event()
+_watcher: Optional[asyncio.Task] = None
+_listener: Optional[asyncpg.Connection] = None
+
+
+def get_activity_tree() -> Optional[ActivityTreeIndex]:
+    return _activity_tree
+
+
+async def refresh_activity_tree() -> bool:
+    """Reload the tree if the activities table changed; True when reloaded."""
+    global _activity_tree
+
+    async with AsyncSessionLocal() as session:
+        version: str = (await session.execute(_VERSION_QUERY)).scalar_one()
+        if _activity_tree is not None and _activity_tree.version == version:
+            return False
+
+        rows = (await session.execute(_ROWS_QUERY)).tuples().all()
+
+    _activity_tree = ActivityTreeIndex(rows, version=version)
+    logger.info(f"Activity tree loaded: {len(_activity_tree)} activities")
+    return True
+
+
+def _on_notify(*args) -> None:
+    _changed.set()
+
+
+async def _watch_activity_tree() -> None:
+    while True:
+        try:
+            await asyncio.wait_for(
+                _changed.wait(), timeout=settings.ACTIVITY_TREE_CHECK_INTERVAL
+            )
+        except asyncio.TimeoutError:
+            pass
+        _changed.clear()
+
+        try:
+            await refresh_activity_tree()
+        except Exception as e:
+            logger.warning(f"Activity tree refresh failed: {e}")
+
+
+async def init_activity_tree() -> None:
+    """Load the tree and keep it fresh on NOTIFY and periodic version checks."""
+    global _listener, _watcher
+
+    await refresh_activity_tree()
+
+    try:
+        _listener = await asyncpg.connect(
+            async_engine.url.set(drivername="postgresql").render_as_string(
+                hide_password=False
+            )
+        )
+        await _listener.add_listener(NOTIFY_CHANNEL, _on_notify)
+    except Exception as e:
+        logger.warning(f"Activity tree LISTEN failed, using version checks only: {e}")
+
+    _watcher = asyncio.create_task(_watch_activity_tree())
+
+
+async def shutdown_activity_tree() -> None:
+    if _watcher is not None:
+        _watcher.cancel()
+    if _listener is not None:
+        await _listener.close()
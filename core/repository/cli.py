@@ -0,0 +1,56 @@
+"""Database maintenance commands, e.g. after a bulk data load:
+
+python -m core.repository.cli refresh-search
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from models import async_engine
+
+
+async def refresh_organization_search(concurrently: bool = True) -> None:
+    """Rebuild the ``organization_search`` view.
+
+    A concurrent refresh keeps the view readable meanwhile; the plain one is
+    faster and needed while it has never been populated.
+    """
+    mode = "CONCURRENTLY " if concurrently else ""
+    async with async_engine.begin() as connection:
+        await connection.execute(
+            text(f"REFRESH MATERIALIZED VIEW {mode}organization_search")
+        )
+
+
+async def _refresh_search(concurrently: bool) -> None:
+    try:
+        started = time.perf_counter()
+        await refresh_organization_search(concurrently)
+        print(f"organization_search refreshed in {time.perf_counter() - started:.2f}s")
+    finally:
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m core.repository.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    refresh = commands.add_parser(
+        "refresh-search", help="Refresh the organization_search view"
+    )
+    refresh.add_argument(
+        "--blocking",
+        action="store_true",
+        help="Lock the view for the refresh instead of refreshing concurrently",
+    )
+
+    args = parser.parse_args()
+    if args.command == "refresh-search":
+        asyncio.run(_refresh_search(concurrently=not args.blocking))
+
+
+if __name__ == "__main__":
+    main()
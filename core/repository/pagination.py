@@ -0,0 +1,49 @@
+import base64
+import binascii
+from typing import Any, Callable, Optional, Sequence, TypeVar
+
+import orjson
+
+T = TypeVar("T")
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(position: dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(position)).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, *fields: str) -> tuple[Any, ...]:
+    """Decode the numeric ``fields`` of an opaque cursor.
+
+    An empty cursor starts cursor pagination and decodes to all ``None``.
+    """
+    if not cursor:
+        return (None,) * len(fields)
+
+    try:
+        position = orjson.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+        values = tuple(position[field] for field in fields)
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise InvalidCursorError(f"Invalid cursor: {cursor}")
+    return values
+
+
+def split_page(
+    rows: Sequence[T],
+    page_size: int,
+    position_of: Callable[[T], dict[str, Any]],
+) -> tuple[Sequence[T], Optional[str]]:
+    """Split ``page_size + 1`` fetched rows into the page and the next cursor."""
+    if len(rows) <= page_size:
+        return rows, None
+    page = rows[:page_size]
+    return page, encode_cursor(position_of(page[-1]))
@@ -1,11 +1,248 @@
-from typing import Any, Optional, Sequence
+import math
+from typing import Any, AsyncIterator, Optional, Sequence
 
 from geoalchemy2 import Geography
-from sqlalchemy import func, select
+from sqlalchemy import (
+    ColumnElement,
+    Exists,
+    Row,
+    Select,
+    Text,
+    exists,
+    func,
+    literal,
+    literal_column,
+    null,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import contains_eager, selectinload
+from sqlalchemy.orm import selectinload
 
-from models import Activity, Building, Organization
+from config import settings
+from core.geo.engine import OrganizationDistance, get_spatial_index
+from core.repository.activity_tree import get_activity_tree
+from models import (
+    Activity,
+    Building,
+    Organization,
+    Phone,
+    activity_closure,
+    organization_activities,
+    organization_search,
+)
+
+
+def normalize_search_text(value: str) -> str:
+    """Python twin of the ``search_normalize`` SQL function."""
+    return value.replace("Ё", "Е").lower().replace("ё", "е")
+
+
+def _contains_pattern(value: str) -> str:
+    """LIKE pattern matching ``value`` anywhere, to be used with ``escape="/"``."""
+    escaped = value.replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return f"%{escaped}%"
+
+
+def _belongs_to_activity(activity_id: int) -> Exists:
+    """Semi-join on the organization being in the activity or any subactivity."""
+    tree = get_activity_tree()
+    if tree is not None and activity_id in tree:
+        activity_tree_ids = tree.descendants(activity_id)
+    else:
+        activity_tree_ids = select(activity_closure.c.descendant_id).where(
+            activity_closure.c.ancestor_id == activity_id
+        )
+
+    return exists().where(
+        organization_activities.c.organization_id == Organization.id,
+        organization_activities.c.activity_id.in_(activity_tree_ids),
+    )
+
+
+# Widest box, in degrees of longitude, prefiltered with a geography envelope
+_MAX_ENVELOPE_WIDTH = 90.0
+
+
+def _in_box(
+    location: ColumnElement,
+    latitude: ColumnElement,
+    longitude: ColumnElement,
+    min_latitude: float,
+    max_latitude: float,
+    min_longitude: float,
+    max_longitude: float,
+) -> list[ColumnElement[bool]]:
+    """Points inside the latitude/longitude box, bounds included.
+
+    The box is matched on the coordinate columns. The geography envelope is
+    only there to use the spatial index: its edges are great circles, which
+    bow away from the parallels by up to width²/16 radians, so it is widened
+    by twice that. The bound only holds for narrow boxes, so boxes wider than
+    ``_MAX_ENVELOPE_WIDTH`` degrees are matched on the columns alone.
+    """
+    conditions = [
+        location.isnot(None),
+        latitude.between(min_latitude, max_latitude),
+        longitude.between(min_longitude, max_longitude),
+    ]
+    width = max_longitude - min_longitude
+    if width > _MAX_ENVELOPE_WIDTH:
+        return conditions
+
+    margin = math.degrees(math.radians(width) ** 2 / 8) + 1e-6
+    make_envelope = func.ST_MakeEnvelope(
+        max(min_longitude - margin, -180.0),
+        max(min_latitude - margin, -90.0),
+        min(max_longitude + margin, 180.0),
+        min(max_latitude + margin, 90.0),
+        4326,
+    )
+    conditions.insert(1, func.ST_Intersects(location, make_envelope))
+    return conditions
+
+
+class _SearchSource:
+    """Columns organization searches read, from the base tables or from the
+    ``organization_search`` materialized view when ``SEARCH_VIEW_ENABLED``.
+
+    The view answers each filter with an index on a single table, at the
+    cost of lagging behind writes until it is refreshed.
+    """
+
+    def __init__(self, use_view: bool):
+        self.use_view: bool = use_view
+        if use_view:
+            view = organization_search.c
+            self.id = view.id
+            self.name = view.name
+            self.search_name = view.search_name
+            self.building_id = view.building_id
+            self.latitude = view.latitude
+            self.longitude = view.longitude
+            self.location = view.location
+        else:
+            self.id = Organization.id
+            self.name = Organization.name
+            self.search_name = func.search_normalize(Organization.name)
+            self.building_id = Organization.building_id
+            self.latitude = Building.latitude
+            self.longitude = Building.longitude
+            self.location = Building.location
+
+    @property
+    def list_columns(self) -> tuple[ColumnElement, ...]:
+        """Columns of ``OrganizationListResponse``."""
+        return (self.id, self.name, self.building_id)
+
+    def select(self, *columns: ColumnElement, located: bool = False) -> Select:
+        """``SELECT columns``, joined to buildings when reading the base tables
+        with ``located``, i.e. using coordinate columns."""
+        if self.use_view:
+            return select(*columns).select_from(organization_search)
+
+        query = select(*columns).select_from(Organization)
+        if located:
+            query = query.join(Building, Building.id == Organization.building_id)
+        return query
+
+    def belongs_to_activity(self, activity_id: int) -> ColumnElement[bool]:
+        if self.use_view:
+            return organization_search.c.activity_ids.contains([activity_id])
+        return _belongs_to_activity(activity_id)
+
+    def in_box(
+        self,
+        min_latitude: float,
+        max_latitude: float,
+        min_longitude: float,
+        max_longitude: float,
+    ) -> list[ColumnElement[bool]]:
+        return _in_box(
+            self.location,
+            self.latitude,
+            self.longitude,
+            min_latitude,
+            max_latitude,
+            min_longitude,
+            max_longitude,
+        )
+
+
+def _search_source() -> _SearchSource:
+    return _SearchSource(use_view=settings.SEARCH_VIEW_ENABLED)
+
+
+# Columns of the list responses: list reads return these as plain Core rows
+# instead of ORM entities
+ORGANIZATION_LIST_COLUMNS = (
+    Organization.id,
+    Organization.name,
+    Organization.building_id,
+)
+BUILDING_COLUMNS = (
+    Building.id,
+    Building.address,
+    Building.latitude,
+    Building.longitude,
+)
+ACTIVITY_COLUMNS = (Activity.id, Activity.name, Activity.parent_id, Activity.level)
+
+
+def _json_object(**fields: Any) -> ColumnElement:
+    """``json_build_object`` keeping the keyword order as key order."""
+    return func.json_build_object(
+        *(part for key, value in fields.items() for part in (literal(key), value))
+    )
+
+
+def _json_array(element: ColumnElement, order_by: ColumnElement) -> ColumnElement:
+    return func.coalesce(
+        func.json_agg(aggregate_order_by(element, order_by)),
+        literal_column("'[]'::json"),
+    )
+
+
+# OrganizationResponse built by Postgres, keys in the order of the schema
+_ORGANIZATION_DOCUMENT = _json_object(
+    name=Organization.name,
+    building_id=Organization.building_id,
+    id=Organization.id,
+    phones=select(
+        _json_array(
+            _json_object(
+                number=Phone.number, id=Phone.id, organization_id=Phone.organization_id
+            ),
+            order_by=Phone.id,
+        )
+    )
+    .where(Phone.organization_id == Organization.id)
+    .scalar_subquery(),
+    activities=select(
+        _json_array(
+            _json_object(
+                name=Activity.name,
+                parent_id=Activity.parent_id,
+                level=Activity.level,
+                id=Activity.id,
+            ),
+            order_by=Activity.id,
+        )
+    )
+    .join(
+        organization_activities,
+        organization_activities.c.activity_id == Activity.id,
+    )
+    .where(organization_activities.c.organization_id == Organization.id)
+    .scalar_subquery(),
+    building=_json_object(
+        address=Building.address,
+        latitude=Building.latitude,
+        longitude=Building.longitude,
+        id=Building.id,
+    ),
+)
 
 
 class CrudRepository:
@@ -21,19 +258,33 @@ class CrudRepository:
         )
         return building_result.scalar_one_or_none()
 
+    async def get_buildings_by_ids(
+        self, building_ids: Sequence[int]
+    ) -> Sequence[Building]:
+        result = await self.session.execute(
+            select(Building).where(Building.id.in_(building_ids))
+        )
+        return result.scalars().all()
+
     async def get_organizations_by_building(
         self,
         building_id: int,
         limit: Optional[int] = None,
         offset: Optional[int] = None,
-    ) -> Sequence[Organization]:
-        result = await self.session.execute(
-            select(Organization)
+        after_id: Optional[int] = None,
+    ) -> Sequence[Row]:
+        query = (
+            select(*ORGANIZATION_LIST_COLUMNS)
             .where(Organization.building_id == building_id)
+            .order_by(Organization.id)
             .limit(limit)
             .offset(offset)
         )
-        return result.scalars().all()
+        if after_id is not None:
+            query = query.where(Organization.id > after_id)
+
+        result = await self.session.execute(query)
+        return result.all()
 
     async def get_activity_by_id(self, activity_id: int) -> Optional[Activity]:
         activity_result = await self.session.execute(
@@ -41,41 +292,26 @@ class CrudRepository:
         )
         return activity_result.scalar_one_or_none()
 
-    async def __get_activity_tree_ids(self, activity_id: int) -> list[int]:
-        cte = (
-            select(Activity.id, Activity.parent_id)
-            .where(Activity.id == activity_id)
-            .cte(name="activity_tree", recursive=True)
-        )
-
-        cte = cte.union_all(
-            select(Activity.id, Activity.parent_id).where(
-                Activity.parent_id == cte.c.id
-            )
-        )
-
-        result = await self.session.execute(select(cte.c.id))
-
-        return [row[0] for row in result.fetchall()]
-
     async def get_organizations_by_activity(
         self,
         activity_id: int,
         limit: Optional[int] = None,
         offset: Optional[int] = None,
-    ) -> Sequence[Organization]:
-        activity_tree_ids: list[int] = await self.__get_activity_tree_ids(
-            activity_id=activity_id,
-        )
-        result = await self.session.execute(
-            select(Organization)
-            .join(Organization.activities)
-            .where(Activity.id.in_(activity_tree_ids))
-            .distinct()
+        after_id: Optional[int] = None,
+    ) -> Sequence[Row]:
+        source = _search_source()
+        query = (
+            source.select(*source.list_columns)
+            .where(source.belongs_to_activity(activity_id))
+            .order_by(source.id)
             .limit(limit)
             .offset(offset)
         )
-        return result.scalars().all()
+        if after_id is not None:
+            query = query.where(source.id > after_id)
+
+        result = await self.session.execute(query)
+        return result.all()
 
     async def get_all_buldings(self) -> Sequence[Organization]:
         result = await self.session.execute(
@@ -89,20 +325,98 @@ class CrudRepository:
         max_latitude: float,
         min_longitude: float,
         max_longitude: float,
-    ) -> Sequence[Organization]:
-        make_envelope = func.ST_MakeEnvelope(
-            min_longitude, min_latitude, max_longitude, max_latitude, 4326
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        after_id: Optional[int] = None,
+    ) -> Sequence[Row[tuple[int, str, int]]]:
+        """Rows of (id, name, building_id), enough for ``OrganizationListResponse``."""
+        spatial_index = get_spatial_index()
+        if spatial_index is not None:
+            return spatial_index.box(
+                min_latitude,
+                max_latitude,
+                min_longitude,
+                max_longitude,
+                limit=limit,
+                offset=offset,
+                after_id=after_id,
+            )
+
+        source = _search_source()
+        query = (
+            source.select(*source.list_columns, located=True)
+            .where(
+                *source.in_box(min_latitude, max_latitude, min_longitude, max_longitude)
+            )
+            .order_by(source.id)
+            .limit(limit)
+            .offset(offset)
         )
-        result = await self.session.execute(
-            select(Organization)
-            .join(Organization.building)
+        if after_id is not None:
+            query = query.where(source.id > after_id)
+
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def get_organization_points(
+        self,
+        min_latitude: float,
+        max_latitude: float,
+        min_longitude: float,
+        max_longitude: float,
+    ) -> Sequence[Row[tuple[int, str, int, float, float]]]:
+        """(id, name, building_id, latitude, longitude) of organizations whose
+        building lies in the box, bounds included."""
+        source = _search_source()
+        query = source.select(
+            *source.list_columns, source.latitude, source.longitude, located=True
+        ).where(
+            *source.in_box(min_latitude, max_latitude, min_longitude, max_longitude)
+        )
+
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def get_clusters(
+        self,
+        min_latitude: float,
+        max_latitude: float,
+        min_longitude: float,
+        max_longitude: float,
+        cell_size: float,
+    ) -> Sequence[Row[tuple[float, float, float, float, int]]]:
+        """Organizations in the box grouped into ``cell_size``-degree cells.
+
+        Rows are (cell latitude, cell longitude, centroid latitude, centroid
+        longitude, count). Cells span [k, k + 1) * ``cell_size`` on each axis,
+        the grid is snapped to their centers.
+        """
+        source = _search_source()
+        half = cell_size / 2
+        cell = func.ST_SnapToGrid(
+            func.ST_MakePoint(source.longitude, source.latitude),
+            half,
+            half,
+            cell_size,
+            cell_size,
+        )
+        query = (
+            source.select(
+                func.ST_Y(cell),
+                func.ST_X(cell),
+                func.avg(source.latitude),
+                func.avg(source.longitude),
+                func.count(),
+                located=True,
+            )
             .where(
-                Building.location.isnot(None),
-                func.ST_Intersects(Building.location, make_envelope),
+                *source.in_box(min_latitude, max_latitude, min_longitude, max_longitude)
             )
-            .options(selectinload(Organization.building))
+            .group_by(cell)
         )
-        return result.scalars().all()
+
+        result = await self.session.execute(query)
+        return result.all()
 
     async def get_organization_by_id(
         self, organization_id: int
@@ -118,39 +432,115 @@ class CrudRepository:
         )
         return result.scalar_one_or_none()
 
-    async def get_organization_by_name(self, name: str) -> Sequence[Organization]:
+    async def get_organization_documents(
+        self, organization_ids: Sequence[int]
+    ) -> dict[int, bytes]:
+        """``OrganizationResponse`` JSON of each found organization, by id.
+
+        The nested document is assembled by Postgres in a single statement,
+        with no ORM objects on the way.
+        """
         result = await self.session.execute(
-            select(Organization).where(Organization.name.ilike(f"%{name}%"))
+            select(Organization.id, _ORGANIZATION_DOCUMENT.cast(Text))
+            .join(Building, Building.id == Organization.building_id)
+            .where(Organization.id.in_(organization_ids))
         )
-        return result.scalars().all()
+        return {
+            organization_id: document.encode()
+            for organization_id, document in result.tuples()
+        }
 
-    async def get_all_organizations(
+    async def get_organization_document(self, organization_id: int) -> Optional[bytes]:
+        documents = await self.get_organization_documents([organization_id])
+        return documents.get(organization_id)
+
+    async def get_organization_by_name(
         self,
+        name: str,
         limit: Optional[int] = None,
         offset: Optional[int] = None,
-    ) -> Sequence[Organization]:
+    ) -> Sequence[Row]:
+        query = normalize_search_text(name)
+        source = _search_source()
         result = await self.session.execute(
-            select(Organization).limit(limit).offset(offset)
+            source.select(*source.list_columns)
+            .where(source.search_name.like(_contains_pattern(query), escape="/"))
+            .order_by(func.similarity(source.search_name, query).desc(), source.id)
+            .limit(limit)
+            .offset(offset)
         )
-        return result.scalars().all()
+        return result.all()
+
+    async def get_all_organizations(
+        self,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        after_id: Optional[int] = None,
+    ) -> Sequence[Row]:
+        query = (
+            select(*ORGANIZATION_LIST_COLUMNS)
+            .order_by(Organization.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        if after_id is not None:
+            query = query.where(Organization.id > after_id)
+
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def stream_organizations(
+        self, batch_size: int
+    ) -> AsyncIterator[Sequence[Organization]]:
+        """All organizations with their building, phones and activities, by id.
+
+        Rows come from a server-side cursor ``batch_size`` at a time and are
+        expunged once the batch is consumed, so memory doesn't grow with the
+        table.
+        """
+        result = await self.session.stream_scalars(
+            select(Organization)
+            .options(
+                selectinload(Organization.building),
+                selectinload(Organization.phones),
+                selectinload(Organization.activities),
+            )
+            .order_by(Organization.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for batch in result.partitions():
+            yield batch
+            self.session.expunge_all()
 
     async def get_activity_ids(
-        self, limit: Optional[int] = None, offset: Optional[int] = None
-    ) -> list[tuple[Any]]:
-        result = await self.session.execute(
-            select(Activity.id, Activity.name).limit(limit).offset(offset)
+        self,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        after_id: Optional[int] = None,
+    ) -> Sequence[Row]:
+        query = (
+            select(*ACTIVITY_COLUMNS).order_by(Activity.id).limit(limit).offset(offset)
         )
-        return result.fetchall()
+        if after_id is not None:
+            query = query.where(Activity.id > after_id)
+
+        result = await self.session.execute(query)
+        return result.all()
 
     async def get_all_buildings(
         self,
         limit: Optional[int] = None,
         offset: Optional[int] = None,
-    ) -> Sequence[Building]:
-        result = await self.session.execute(
-            select(Building).limit(limit).offset(offset)
+        after_id: Optional[int] = None,
+    ) -> Sequence[Row]:
+        query = (
+            select(*BUILDING_COLUMNS).order_by(Building.id).limit(limit).offset(offset)
         )
-        return result.scalars().all()
+        if after_id is not None:
+            query = query.where(Building.id > after_id)
+
+        result = await self.session.execute(query)
+        return result.all()
 
     async def get_organizations_by_radius(
         self,
@@ -159,26 +549,169 @@ class CrudRepository:
         radius_meters: float,
         limit: Optional[int] = None,
         offset: Optional[int] = None,
-    ) -> Sequence[Organization]:
+        after: Optional[tuple[float, int]] = None,
+    ) -> Sequence[tuple[Row[tuple[int, str, int]], float]]:
+        """(id, name, building_id) rows with their distance in meters, nearest
+        first.
+
+        Distances are on the sphere, like the ``<->`` ordering of
+        ``get_nearest_organizations`` and the embedded engine.
+        ``after`` is the ``(distance, id)`` of the last row of the previous page.
+        """
+        spatial_index = get_spatial_index()
+        if spatial_index is not None:
+            return spatial_index.radius(
+                latitude,
+                longitude,
+                radius_meters,
+                limit=limit,
+                offset=offset,
+                after=after,
+            )
+
+        source = _search_source()
         point = func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326).cast(
             Geography
         )
-        result = await self.session.execute(
-            select(Organization)
-            .join(Organization.building)
+        distance = func.ST_Distance(source.location, point, False)
+        query = (
+            source.select(
+                *source.list_columns, distance.label("distance"), located=True
+            )
             .where(
-                Building.location.isnot(None),
-                func.ST_DWithin(Building.location, point, radius_meters),
+                source.location.isnot(None),
+                func.ST_DWithin(source.location, point, radius_meters, False),
             )
-            .order_by(func.ST_Distance(Building.location, point), Organization.id)
-            .options(contains_eager(Organization.building))
+            .order_by(distance, source.id)
             .limit(limit)
             .offset(offset)
         )
-        return result.scalars().all()
+        if after is not None:
+            query = query.where(tuple_(distance, source.id) > tuple_(*after))
+
+        result = await self.session.execute(query)
+        return [(row, row.distance) for row in result]
+
+    async def get_nearest_organizations(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        activity_id: Optional[int] = None,
+    ) -> Sequence[Row[tuple[int, str, int, float]]]:
+        """The ``k`` nearest organizations as (id, name, building_id, distance).
+
+        Ordered by ``<->``, so the GiST index on ``buildings.location`` yields
+        buildings nearest first and the scan stops after ``k`` rows whatever
+        the density around the point. Distance is in meters, on the sphere.
+        """
+        spatial_index = get_spatial_index()
+        if spatial_index is not None and activity_id is None:
+            return [
+                OrganizationDistance(
+                    id=point.id,
+                    name=point.name,
+                    building_id=point.building_id,
+                    distance=distance,
+                )
+                for point, distance in spatial_index.nearest(latitude, longitude, k)
+            ]
+
+        point = func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326).cast(
+            Geography
+        )
+        source = _search_source()
+        distance = source.location.distance_centroid(point)
+        query = (
+            source.select(
+                *source.list_columns, distance.label("distance"), located=True
+            )
+            .where(source.location.isnot(None))
+            .order_by(distance, source.id)
+            .limit(k)
+        )
+        if activity_id is not None:
+            query = query.where(source.belongs_to_activity(activity_id))
+
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def search_organizations(
+        self,
+        activity_id: Optional[int] = None,
+        name: Optional[str] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        radius_meters: Optional[float] = None,
+        box: Optional[tuple[float, float, float, float]] = None,
+        limit: Optional[int] = None,
+        after: Optional[tuple] = None,
+    ) -> Sequence[Row[tuple[int, str, int, Optional[float]]]]:
+        """(id, name, building_id, distance) of organizations matching every
+        given filter, in one statement.
+
+        ``box`` is (min latitude, max latitude, min longitude, max longitude).
+        With a point, rows are ordered by ``<->`` distance in meters, so the
+        GiST index yields them nearest first, and ``after`` is the
+        ``(distance, id)`` of the last row of the previous page; without one
+        they are ordered by id, distance is null and ``after`` is ``(id,)``.
+        """
+        source = _search_source()
+        distance: Optional[ColumnElement] = None
+        if latitude is not None and longitude is not None:
+            point = func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326).cast(
+                Geography
+            )
+            distance = source.location.distance_centroid(point)
+
+        query = source.select(
+            *source.list_columns,
+            (distance if distance is not None else null()).label("distance"),
+            located=distance is not None or box is not None,
+        ).limit(limit)
+
+        if activity_id is not None:
+            query = query.where(source.belongs_to_activity(activity_id))
+        if name is not None:
+            query = query.where(
+                source.search_name.like(
+                    _contains_pattern(normalize_search_text(name)), escape="/"
+                )
+            )
+        if box is not None:
+            query = query.where(*source.in_box(*box))
+
+        if distance is None:
+            query = query.order_by(source.id)
+            if after is not None:
+                query = query.where(source.id > after[0])
+        else:
+            query = query.where(source.location.isnot(None)).order_by(
+                distance, source.id
+            )
+            if radius_meters is not None:
+                query = query.where(
+                    func.ST_DWithin(source.location, point, radius_meters, False)
+                )
+            if after is not None:
+                query = query.where(tuple_(distance, source.id) > tuple_(*after))
 
-    async def get_building_by_address(self, address: str) -> Optional[Building]:
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def get_buildings_by_address(
+        self,
+        address: str,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+    ) -> Sequence[Row]:
+        query = normalize_search_text(address)
+        normalized_address = func.search_normalize(Building.address)
         result = await self.session.execute(
-            select(Building).where(Building.address.ilike(f"%{address}%"))
+            select(*BUILDING_COLUMNS)
+            .where(normalized_address.like(_contains_pattern(query), escape="/"))
+            .order_by(func.similarity(normalized_address, query).desc(), Building.id)
+            .limit(limit)
+            .offset(offset)
         )
-        return result.scalar_one_or_none()
+        return result.all()
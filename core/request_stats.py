@@ -0,0 +1,141 @@
+"""Where each request spends its time: database, cache and serialization.
+
+``MonitoringMiddleware`` starts a ``RequestStats`` per request in a context
+variable; SQLAlchemy engine events (models/database.py), the Redis client
+(core/cache/redis.py) and serialization helpers add to it. It is reported
+as a ``Server-Timing`` header and as metrics.
+"""
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_PARAMETER = re.compile(r"\$\d+(?:::[\w\[\]]+)?|%\(\w+\)s|\?")
+_PARAMETER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class RequestStats:
+    db_count: int = 0
+    db_time: float = 0.0
+    cache_count: int = 0
+    cache_time: float = 0.0
+    serialization_time: float = 0.0
+    # Statements with their parameters blanked out, by number of runs
+    statements: Counter = field(default_factory=Counter)
+
+    def server_timing(self, total_time: float) -> str:
+        """``Server-Timing`` header value, durations in milliseconds."""
+        db_time = self.db_time * 1000
+        cache_time = self.cache_time * 1000
+        return ", ".join(
+            (
+                f'db;dur={db_time:.2f};desc="{self.db_count} queries"',
+                f'cache;dur={cache_time:.2f};desc="{self.cache_count} calls"',
+                f"serialize;dur={self.serialization_time * 1000:.2f}",
+                f"total;dur={total_time * 1000:.2f}",
+            )
+        )
+
+    def repeated_statements(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements run more than ``threshold`` times, the N+1 suspects."""
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count > threshold
+        ]
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def start_request_stats() -> tuple[RequestStats, Token]:
+    stats = RequestStats()
+    return stats, _request_stats.set(stats)
+
+
+def finish_request_stats(token: Token) -> None:
+    _request_stats.reset(token)
+
+
+def get_request_stats() -> Optional[RequestStats]:
+    """Stats of the current request, None outside of one."""
+    return _request_stats.get()
+
+
+def normalize_statement(statement: str) -> str:
+    """``statement`` with its parameters and IN lists blanked out, so runs
+    differing only by their values compare equal."""
+    statement = _PARAMETER.sub("?", statement)
+    statement = _PARAMETER_LIST.sub("?", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def record_statement(statement: str, seconds: float) -> None:
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_count += 1
+        stats.db_time += seconds
+        stats.statements[normalize_statement(statement)] += 1
+
+
+def record_cache_call(seconds: float) -> None:
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.cache_count += 1
+        stats.cache_time += seconds
+
+
+@contextmanager
+def measure_serialization() -> Iterator[None]:
+    stats = _request_stats.get()
+    if stats is None:
+        yield
+        return
+
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serialization_time += time.perf_counter() - start_time
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count and time the statements ``engine`` runs for the current request.
+
+    For an ``AsyncEngine`` pass its ``sync_engine``; SQLAlchemy runs the
+    events in greenlets sharing the request's context.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        start_time = conn.info["query_start_time"].pop()
+        record_statement(statement, time.perf_counter() - start_time)
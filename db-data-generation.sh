@@ -100,3 +100,6 @@ INSERT INTO phones (number, organization_id) VALUES
 ('8-495-101-01-01', 10);
 
 SQL
+
+# Drop everything cached before the load
+docker compose exec -T app python -m core.cache.cli bump
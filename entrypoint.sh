@@ -7,6 +7,12 @@ alembic upgrade head
 
 echo "Starting app..."
 
-exec gunicorn --workers 4 --worker-class uvicorn.workers.UvicornWorker \
+# Workers write metrics there for /metrics to sum them; files of a previous
+# run would be summed too
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+exec gunicorn --config gunicorn.conf.py --workers 4 --worker-class uvicorn.workers.UvicornWorker \
     --bind 0.0.0.0:8051 \
     --worker-connections 1000 main:app
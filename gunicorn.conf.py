@@ -0,0 +1,8 @@
+# Used by entrypoint.sh; the rest of the settings are on its command line
+
+
+def child_exit(server, worker):
+    # Drop the live gauges of a dead worker from the aggregated /metrics
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
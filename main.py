@@ -3,9 +3,13 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from loguru import logger
 
-from api import buildings_router, organizations_router
+from api import admin_router, buildings_router, organizations_router
 from api.health import health_check
+from api.metrics import metrics
 from core.cache.redis import init_redis, shutdown_redis
+from core.cache.stats import init_cache_stats, shutdown_cache_stats
+from core.geo import init_geo_engine, shutdown_geo_engine
+from core.repository.activity_tree import init_activity_tree, shutdown_activity_tree
 from middleware import (
     configure_cors_middleware,
     configure_exception_middleware,
@@ -28,12 +32,18 @@ async def lifespan(app: FastAPI):
     logger.info("Starting application...")
     await _startup_db()
     await init_redis()
+    await init_cache_stats()
+    await init_activity_tree()
+    await init_geo_engine()
 
     yield
 
     logger.info("Shutting down application...")
 
+    await shutdown_geo_engine()
+    await shutdown_activity_tree()
     await shutdown_db()
+    await shutdown_cache_stats()
     await shutdown_redis()
 
 
@@ -45,8 +55,10 @@ def _configure_middleware(app: FastAPI) -> None:
 
 def _register_routes(app: FastAPI) -> None:
     app.add_api_route("/health", health_check, methods=["GET"])
+    app.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
     app.include_router(organizations_router)
     app.include_router(buildings_router)
+    app.include_router(admin_router)
 
 
 def create_app() -> FastAPI:
@@ -10,5 +10,12 @@ def configure_cors_middleware(app: FastAPI) -> None:
         allow_origins=settings.allowed_origins,
         allow_credentials=True,
         allow_methods=["GET", "POST", "OPTIONS"],
-        allow_headers=["Content-Type", "X-Requested-With", "Accept", "Origin"],
+        allow_headers=[
+            "Content-Type",
+            "X-Requested-With",
+            "Accept",
+            "Origin",
+            "If-None-Match",
+        ],
+        expose_headers=["ETag", "Server-Timing"],
     )
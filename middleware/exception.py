@@ -5,8 +5,14 @@ from fastapi.responses import JSONResponse
 from loguru import logger
 from starlette.requests import Request
 
+from core.repository.pagination import InvalidCursorError
+
 
 def configure_exception_middleware(app: FastAPI) -> None:
+    @app.exception_handler(InvalidCursorError)
+    async def invalid_cursor_handler(request: Request, exc: InvalidCursorError):
+        return JSONResponse(status_code=400, content={"detail": "Invalid cursor"})
+
     @app.exception_handler(Exception)
     async def global_exception_handler(request: Request, exc: Exception):
         logger.error(
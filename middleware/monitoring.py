@@ -2,39 +2,113 @@ import time
 
 from fastapi import FastAPI
 from loguru import logger
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.requests import Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from config import settings
+from core.metrics import (
+    HTTP_REQUEST_DB_QUERIES,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUEST_PHASE_DURATION,
+    HTTP_REQUESTS,
+    HTTP_REQUESTS_IN_PROGRESS,
+    REPEATED_STATEMENTS,
+)
+from core.request_stats import RequestStats, finish_request_stats, start_request_stats
 
-class MonitoringMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint):
-        start_time = time.time()
+SLOW_REQUEST_SECONDS = 5
+VERY_SLOW_REQUEST_SECONDS = 30
 
-        logger.debug(f"Request started: {request.method} {request.url.path}")
 
-        try:
-            response = await call_next(request)
+class MonitoringMiddleware:
+    """Per-route latency, status and in-flight metrics, plus slow request logs.
 
-            process_time = time.time() - start_time
-            if process_time > 5:
-                logger.warning(
-                    f"Slow request: {request.method} {request.url.path} "
-                    f"took {process_time:.2f}s"
-                )
-            elif process_time > 30:
-                logger.error(
-                    f"Very slow request: {request.method} {request.url.path} "
-                    f"took {process_time:.2f}s - consider optimizing"
+    A plain ASGI middleware: it only wraps ``send`` to see the status code,
+    with no extra task or body streaming per request. Requests are labelled
+    with the template of the matched route (``scope["route"]``, set by
+    FastAPI routing), so path parameters don't multiply the series.
+
+    It also collects the request's ``RequestStats``, sent back as a
+    ``Server-Timing`` header, recorded as metrics and checked for
+    statements repeated in a loop.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method: str = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append(
+                    "Server-Timing",
+                    stats.server_timing(time.perf_counter() - start_time),
                 )
+            await send(message)
 
-            return response
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        stats, stats_token = start_request_stats()
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
         except Exception as e:
-            process_time = time.time() - start_time
             logger.error(
-                f"Request failed: {request.method} {request.url.path} "
-                f"after {process_time:.2f}s - Error: {e}"
+                f"Request failed: {method} {scope['path']} "
+                f"after {time.perf_counter() - start_time:.2f}s - Error: {e}"
             )
             raise
+        finally:
+            process_time = time.perf_counter() - start_time
+            in_progress.dec()
+            finish_request_stats(stats_token)
+
+            route = _route_template(scope)
+            HTTP_REQUEST_DURATION.labels(method, route).observe(process_time)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            _record_stats(stats, method, route)
+
+            if process_time > VERY_SLOW_REQUEST_SECONDS:
+                logger.error(
+                    f"Very slow request: {method} {scope['path']} "
+                    f"took {process_time:.2f}s - consider optimizing"
+                )
+            elif process_time > SLOW_REQUEST_SECONDS:
+                logger.warning(
+                    f"Slow request: {method} {scope['path']} took {process_time:.2f}s"
+                )
+
+
+def _record_stats(stats: RequestStats, method: str, route: str) -> None:
+    HTTP_REQUEST_DB_QUERIES.labels(route).observe(stats.db_count)
+    for phase, seconds in (
+        ("db", stats.db_time),
+        ("cache", stats.cache_time),
+        ("serialization", stats.serialization_time),
+    ):
+        HTTP_REQUEST_PHASE_DURATION.labels(route, phase).observe(seconds)
+
+    repeated = stats.repeated_statements(settings.SQL_REPEATED_STATEMENT_THRESHOLD)
+    if repeated:
+        REPEATED_STATEMENTS.labels(route).inc()
+        for statement, count in repeated:
+            logger.warning(
+                f"Possible N+1 queries: {method} {route} ran {count} times "
+                f"{statement[:200]}"
+            )
+
+
+def _route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
 
 
 def configure_monitoring_middleware(app: FastAPI) -> None:
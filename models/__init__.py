@@ -1,5 +1,6 @@
-from models.activity import Activity
+from models.activity import Activity, activity_closure
 from models.building import Building
 from models.database import AsyncSessionLocal, Base, async_engine, get_session, init_db
 from models.organization import Organization, organization_activities
+from models.organization_search import organization_search, view_metadata
 from models.phone import Phone
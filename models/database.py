@@ -2,6 +2,7 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_asyn
 from sqlalchemy.ext.declarative import declarative_base
 
 from config import settings
+from core.request_stats import instrument_engine
 
 Base = declarative_base()
 
@@ -12,6 +13,8 @@ async_engine = create_async_engine(
     pool_size=settings.DB_POOL_SIZE,
 )
 
+instrument_engine(async_engine.sync_engine)
+
 AsyncSessionLocal = async_sessionmaker(
     bind=async_engine,
     expire_on_commit=False,
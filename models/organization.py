@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Table
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, Table
 from sqlalchemy.orm import relationship
 
 from models.database import Base
@@ -18,6 +18,12 @@ organization_activities = Table(
         ForeignKey("activities.id", ondelete="CASCADE"),
         primary_key=True,
     ),
+    # Covers activity -> organizations lookups without touching the heap
+    Index(
+        "ix_organization_activities_activity_id_organization_id",
+        "activity_id",
+        "organization_id",
+    ),
 )
 
 
@@ -27,15 +33,25 @@ class Organization(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
     building_id = Column(
-        Integer, ForeignKey("buildings.id", ondelete="CASCADE"), nullable=False
+        Integer,
+        ForeignKey("buildings.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
 
     building = relationship("Building", back_populates="organizations")
+    # Ordered like the JSON documents built by CrudRepository
     phones = relationship(
-        "Phone", back_populates="organization", cascade="all, delete-orphan"
+        "Phone",
+        back_populates="organization",
+        cascade="all, delete-orphan",
+        order_by="Phone.id",
     )
     activities = relationship(
-        "Activity", secondary=organization_activities, back_populates="organizations"
+        "Activity",
+        secondary=organization_activities,
+        back_populates="organizations",
+        order_by="Activity.id",
     )
 
     def __repr__(self):
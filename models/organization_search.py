@@ -0,0 +1,29 @@
+from geoalchemy2 import Geography
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table
+from sqlalchemy.dialects.postgresql import ARRAY
+
+# Materialized views live outside Base.metadata, so create_all and alembic
+# autogenerate don't mistake them for tables
+view_metadata = MetaData()
+
+# One row per organization, denormalized for searches; created by migration
+# and refreshed with `python -m core.repository.cli refresh-search`
+organization_search = Table(
+    "organization_search",
+    view_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    # search_normalize(name), trigram indexed
+    Column("search_name", String, nullable=False),
+    Column("building_id", Integer, nullable=False),
+    Column("latitude", Float, nullable=False),
+    Column("longitude", Float, nullable=False),
+    Column(
+        "location",
+        Geography(geometry_type="POINT", srid=4326, spatial_index=False),
+        nullable=True,
+    ),
+    # Activities of the organization and all their ancestors
+    Column("activity_ids", ARRAY(Integer), nullable=False),
+    Column("phones", ARRAY(String), nullable=False),
+)
@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+
+
+class BatchRequest(BaseModel):
+    ids: list[int] = Field(
+        ..., description="IDs to look up", min_length=1, max_length=100
+    )
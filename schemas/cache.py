@@ -0,0 +1,35 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class CacheGenerationResponse(BaseModel):
+    namespace: str = Field(..., description="Invalidated cache namespace")
+    generation: int = Field(..., description="New generation of the namespace")
+
+
+class CachePurgeResponse(BaseModel):
+    deleted: int = Field(..., description="Number of deleted cache entries")
+
+
+class CacheKeyHits(BaseModel):
+    key: str
+    prefix: str = Field(..., description="Cache policy prefix of the key")
+    path: Optional[str] = Field(
+        None, description="Canonical path and query of path-based entries"
+    )
+    hits: int = Field(..., description="Local and Redis hits of all workers")
+
+
+class LocalCacheStats(BaseModel):
+    entries: int
+    bytes: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class CacheTopKeysResponse(BaseModel):
+    pid: int = Field(..., description="Worker process of the local cache stats")
+    local_cache: LocalCacheStats
+    keys: list[CacheKeyHits]
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, Field
 
 from schemas.activity import ActivityResponse
@@ -31,3 +33,19 @@ class OrganizationListResponse(BaseModel):
     model_config = {
         "from_attributes": True,
     }
+
+
+class OrganizationDistanceResponse(OrganizationListResponse):
+    distance: float = Field(..., description="Distance from the point in meters")
+
+
+class OrganizationSearchResponse(OrganizationListResponse):
+    distance: Optional[float] = Field(
+        None, description="Distance from the point in meters, when one is given"
+    )
+
+
+class ClusterResponse(BaseModel):
+    latitude: float = Field(..., description="Centroid latitude")
+    longitude: float = Field(..., description="Centroid longitude")
+    count: int = Field(..., description="Organizations in the cell")
@@ -1,3 +1,4 @@
+from fnmatch import fnmatch
 from pathlib import Path
 
 import pytest
@@ -5,6 +6,7 @@ from dotenv import load_dotenv
 from fastapi.testclient import TestClient
 
 from config import settings
+from core.cache.local import local_cache
 from core.cache.redis import get_redis_client
 from main import app
 from models import get_session
@@ -16,18 +18,136 @@ if test_env_path.exists():
 
 class DummyRedis:
     def __init__(self):
-        self.storage: dict[str, str] = {}
+        self.storage: dict[str, bytes] = {}
+        self.ttls: dict[str, int] = {}
+        self.sorted_sets: dict[str, dict[bytes, float]] = {}
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
 
     async def get(self, name: str):
         return self.storage.get(name)
 
     async def setex(self, name: str, time: int, value: str):
         self.storage[name] = value
+        self.ttls[name] = time * 1000
         return True
 
+    async def set(self, name: str, value: str, nx: bool = False, px: int = None):
+        if nx and name in self.storage:
+            return None
+        self.storage[name] = value
+        return True
+
+    async def pttl(self, name: str):
+        if name not in self.storage:
+            return -2
+        return self.ttls.get(name, -1)
+
+    async def mget(self, names: list[str]):
+        return [self.storage.get(name) for name in names]
+
+    async def incr(self, name: str):
+        value = int(self.storage.get(name, 0)) + 1
+        self.storage[name] = str(value).encode()
+        return value
+
     async def delete(self, name: str):
         self.storage.pop(name, None)
 
+    async def unlink(self, *names: bytes):
+        return sum(self.storage.pop(name.decode(), None) is not None for name in names)
+
+    async def scan_iter(self, match: str, count: int = None):
+        for name in list(self.storage):
+            if fnmatch(name, match):
+                yield name.encode()
+
+    async def zincrby(self, name: str, amount: float, value: str):
+        scores = self.sorted_sets.setdefault(name, {})
+        scores[value.encode()] = scores.get(value.encode(), 0) + amount
+        return scores[value.encode()]
+
+    def _ranked(self, name: str):
+        scores = self.sorted_sets.get(name, {})
+        return sorted(scores, key=lambda member: (scores[member], member))
+
+    async def zrange(self, name: str, start: int, end: int):
+        ranked = self._ranked(name)
+        return ranked[start : len(ranked) + end + 1 if end < 0 else end + 1]
+
+    async def zrevrange(self, name: str, start: int, end: int, withscores=False):
+        ranked = self._ranked(name)[::-1][start : end + 1]
+        if withscores:
+            return [(member, self.sorted_sets[name][member]) for member in ranked]
+        return ranked
+
+    async def zremrangebyrank(self, name: str, min: int, max: int):
+        removed = await self.zrange(name, min, max)
+        for member in removed:
+            del self.sorted_sets[name][member]
+        return len(removed)
+
+    async def hset(self, name: str, mapping: dict):
+        fields = self.hashes.setdefault(name, {})
+        fields.update({key.encode(): value.encode() for key, value in mapping.items()})
+        return len(mapping)
+
+    async def hmget(self, name: str, keys: list):
+        fields = self.hashes.get(name, {})
+        return [fields.get(key) for key in keys]
+
+    async def hdel(self, name: str, *keys: bytes):
+        fields = self.hashes.get(name, {})
+        return sum(fields.pop(key, None) is not None for key in keys)
+
+    def pipeline(self, transaction: bool = True):
+        return DummyPipeline(self)
+
+    def lock(self, name: str, **kwargs):
+        return DummyLock(self, name)
+
+
+class DummyPipeline:
+    def __init__(self, client: DummyRedis):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return None
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self):
+        results = [
+            await getattr(self.client, name)(*args, **kwargs)
+            for name, args, kwargs in self.commands
+        ]
+        self.commands = []
+        return results
+
+
+class DummyLock:
+    def __init__(self, client: DummyRedis, name: str):
+        self.client = client
+        self.name = name
+
+    async def acquire(self, blocking: bool = True):
+        return bool(await self.client.set(self.name, "1", nx=True))
+
+    async def release(self):
+        await self.client.delete(self.name)
+
+
+async def load_through(client, key, ttl, loader):
+    return await loader()
+
 
 @pytest.fixture(scope="function")
 def test_app(monkeypatch):
@@ -43,12 +163,37 @@ def test_app(monkeypatch):
     async def fake_shutdown_redis():
         return None
 
+    async def fake_init_activity_tree():
+        return None
+
+    async def fake_shutdown_activity_tree():
+        return None
+
+    async def fake_init_cache_stats():
+        return None
+
+    async def fake_shutdown_cache_stats():
+        return None
+
+    async def fake_init_geo_engine():
+        return None
+
+    async def fake_shutdown_geo_engine():
+        return None
+
     monkeypatch.setattr("main.init_db", fake_init_db)
     monkeypatch.setattr("main.shutdown_db", fake_shutdown_db)
     monkeypatch.setattr("main.init_redis", fake_init_redis)
     monkeypatch.setattr("main.shutdown_redis", fake_shutdown_redis)
+    monkeypatch.setattr("main.init_cache_stats", fake_init_cache_stats)
+    monkeypatch.setattr("main.shutdown_cache_stats", fake_shutdown_cache_stats)
+    monkeypatch.setattr("main.init_activity_tree", fake_init_activity_tree)
+    monkeypatch.setattr("main.shutdown_activity_tree", fake_shutdown_activity_tree)
+    monkeypatch.setattr("main.init_geo_engine", fake_init_geo_engine)
+    monkeypatch.setattr("main.shutdown_geo_engine", fake_shutdown_geo_engine)
 
     redis_client = DummyRedis()
+    local_cache.clear()
 
     async def override_session():
         yield None
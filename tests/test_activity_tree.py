@@ -0,0 +1,24 @@
+from core.repository.activity_tree import ActivityTreeIndex
+
+
+def make_tree() -> ActivityTreeIndex:
+    return ActivityTreeIndex(
+        rows=[(1, None), (2, 1), (3, 1), (4, 2), (5, 4), (6, None)],
+        version="v1",
+    )
+
+
+def test_descendants_include_activity_and_all_levels():
+    tree = make_tree()
+
+    assert tree.descendants(1) == (1, 2, 3, 4, 5)
+    assert tree.descendants(2) == (2, 4, 5)
+    assert tree.descendants(6) == (6,)
+
+
+def test_unknown_activity_is_not_in_tree():
+    tree = make_tree()
+
+    assert 7 not in tree
+    assert 5 in tree
+    assert len(tree) == 6
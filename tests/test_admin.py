@@ -0,0 +1,52 @@
+import os
+from types import SimpleNamespace
+
+from core.cache.stats import key_hits
+
+
+def test_bump_cache_generation(test_app, test_headers):
+    response = test_app.post("/admin/cache/organizations/bump", headers=test_headers)
+    assert response.status_code == 200
+    assert response.json() == {"namespace": "organizations", "generation": 1}
+
+    response = test_app.post("/admin/cache/organizations/bump", headers=test_headers)
+    assert response.json()["generation"] == 2
+
+
+def test_bump_cache_generation_unknown_namespace(test_app, test_headers):
+    response = test_app.post("/admin/cache/phones/bump", headers=test_headers)
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Cache namespace not found"}
+
+
+def test_purge_cache(test_app, test_headers):
+    response = test_app.post("/admin/cache/purge", headers=test_headers)
+    assert response.status_code == 200
+    assert response.json() == {"deleted": 0}
+
+
+def test_cache_top_keys(monkeypatch, test_app, test_headers):
+    key_hits.clear()
+
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+        async def get_building_by_id(self, building_id):
+            return SimpleNamespace(id=building_id, address="a", latitude=1, longitude=2)
+
+    monkeypatch.setattr("api.buildings.CrudRepository", RepoStub)
+
+    for building_id in (1, 2, 2, 2, 1):
+        test_app.get(f"/buildings/{building_id}", headers=test_headers)
+
+    response = test_app.get(
+        "/admin/cache/top-keys", headers=test_headers, params={"limit": 1}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["pid"] == os.getpid()
+    assert [(i["prefix"], i["path"], i["hits"]) for i in body["keys"]] == [
+        ("building_id", "/buildings/2?", 2)
+    ]
+    assert body["local_cache"]["hits"] >= 3
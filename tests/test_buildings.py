@@ -3,6 +3,8 @@ from unittest.mock import AsyncMock
 
 import orjson
 
+from tests.conftest import load_through
+
 
 def make_building():
     return SimpleNamespace(id=1, address="addr", latitude=1.1, longitude=2.2)
@@ -11,14 +13,10 @@ def make_building():
 def test_list_buildings_returns_cached_data(monkeypatch, test_app, test_headers):
     cached = [{"id": 1, "address": "addr", "latitude": 1.1, "longitude": 2.2}]
 
-    async def fake_get_cache(client, key):
+    async def fake_get_or_set_cache(client, key, ttl, loader):
         return orjson.dumps(cached)
 
-    async def fake_set_cache(*args, **kwargs):
-        raise AssertionError("set_cache should not be called")
-
-    monkeypatch.setattr("api.buildings.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.buildings.set_cache", fake_set_cache)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", fake_get_or_set_cache)
 
     response = test_app.get("/buildings/", headers=test_headers)
     assert response.status_code == 200
@@ -28,10 +26,7 @@ def test_list_buildings_returns_cached_data(monkeypatch, test_app, test_headers)
 def test_list_buildings_fetches_repository(monkeypatch, test_app, test_headers):
     building = make_building()
 
-    async def fake_get_cache(client, key):
-        return None
-
-    cache_spy = AsyncMock(return_value=True)
+    cache_spy = AsyncMock(side_effect=load_through)
 
     class RepoStub:
         def __init__(self, session):
@@ -40,8 +35,7 @@ def test_list_buildings_fetches_repository(monkeypatch, test_app, test_headers):
         async def get_all_buildings(self, limit=None, offset=None):
             return [building]
 
-    monkeypatch.setattr("api.buildings.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.buildings.set_cache", cache_spy)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
     monkeypatch.setattr("api.buildings.CrudRepository", RepoStub)
 
     response = test_app.get("/buildings/", headers=test_headers, params={"limit": 5})
@@ -62,18 +56,14 @@ def test_list_buildings_fetches_repository(monkeypatch, test_app, test_headers):
 def test_get_building_by_id_uses_cache(monkeypatch, test_app, test_headers):
     cached = {"id": 7, "address": "cached", "latitude": 3.3, "longitude": 4.4}
 
-    async def fake_get_cache(client, key):
+    async def fake_get_or_set_cache(client, key, ttl, loader):
         return orjson.dumps(cached)
 
-    async def fake_set_cache(*args, **kwargs):
-        raise AssertionError("set_cache should not be called")
-
     class RepoStub:
         def __init__(self, session):
             raise AssertionError("repository should not be used")
 
-    monkeypatch.setattr("api.buildings.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.buildings.set_cache", fake_set_cache)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", fake_get_or_set_cache)
     monkeypatch.setattr("api.buildings.CrudRepository", RepoStub)
 
     response = test_app.get("/buildings/7", headers=test_headers)
@@ -84,10 +74,7 @@ def test_get_building_by_id_uses_cache(monkeypatch, test_app, test_headers):
 def test_get_building_by_id_fetches_repository(monkeypatch, test_app, test_headers):
     building = make_building()
 
-    async def fake_get_cache(client, key):
-        return None
-
-    cache_spy = AsyncMock(return_value=True)
+    cache_spy = AsyncMock(side_effect=load_through)
 
     class RepoStub:
         def __init__(self, session):
@@ -97,8 +84,7 @@ def test_get_building_by_id_fetches_repository(monkeypatch, test_app, test_heade
             assert building_id == building.id
             return building
 
-    monkeypatch.setattr("api.buildings.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.buildings.set_cache", cache_spy)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
     monkeypatch.setattr("api.buildings.CrudRepository", RepoStub)
 
     response = test_app.get("/buildings/1", headers=test_headers)
@@ -114,20 +100,16 @@ def test_get_building_by_id_fetches_repository(monkeypatch, test_app, test_heade
 
 
 def test_get_building_by_address_uses_cache(monkeypatch, test_app, test_headers):
-    cached = {"id": 5, "address": "cached addr", "latitude": 3.0, "longitude": 4.0}
+    cached = [{"id": 5, "address": "cached addr", "latitude": 3.0, "longitude": 4.0}]
 
-    async def fake_get_cache(client, key):
+    async def fake_get_or_set_cache(client, key, ttl, loader):
         return orjson.dumps(cached)
 
-    async def fake_set_cache(*args, **kwargs):
-        raise AssertionError("set_cache should not be called")
-
     class RepoStub:
         def __init__(self, session):
             raise AssertionError("repository should not be used")
 
-    monkeypatch.setattr("api.buildings.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.buildings.set_cache", fake_set_cache)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", fake_get_or_set_cache)
     monkeypatch.setattr("api.buildings.CrudRepository", RepoStub)
 
     response = test_app.get(
@@ -144,21 +126,19 @@ def test_get_building_by_address_fetches_repository(
 ):
     building = make_building()
 
-    async def fake_get_cache(client, key):
-        return None
-
-    cache_spy = AsyncMock(return_value=True)
+    cache_spy = AsyncMock(side_effect=load_through)
 
     class RepoStub:
         def __init__(self, session):
             self.session = session
 
-        async def get_building_by_address(self, address):
+        async def get_buildings_by_address(self, address, limit=None, offset=None):
             assert address == building.address
-            return building
+            assert limit == 20
+            assert offset == 0
+            return [building]
 
-    monkeypatch.setattr("api.buildings.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.buildings.set_cache", cache_spy)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
     monkeypatch.setattr("api.buildings.CrudRepository", RepoStub)
 
     response = test_app.get(
@@ -167,11 +147,39 @@ def test_get_building_by_address_fetches_repository(
         params={"address": building.address},
     )
     assert response.status_code == 200
-    assert response.json() == {
-        "id": building.id,
-        "address": building.address,
-        "latitude": building.latitude,
-        "longitude": building.longitude,
-    }
+    assert response.json() == [
+        {
+            "id": building.id,
+            "address": building.address,
+            "latitude": building.latitude,
+            "longitude": building.longitude,
+        }
+    ]
     assert cache_spy.await_count == 1
     assert cache_spy.await_args.kwargs["ttl"] == 180
+
+
+def test_get_buildings_batch(monkeypatch, test_app, test_headers):
+    loaded = []
+
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+        async def get_buildings_by_ids(self, building_ids):
+            loaded.append(building_ids)
+            return [
+                SimpleNamespace(id=i, address="addr", latitude=1.1, longitude=2.2)
+                for i in building_ids
+            ]
+
+    monkeypatch.setattr("api.buildings.CrudRepository", RepoStub)
+
+    for _ in range(2):
+        response = test_app.post(
+            "/buildings/batch", headers=test_headers, json={"ids": [5, 4]}
+        )
+        assert response.status_code == 200
+        assert [i["id"] for i in response.json()] == [5, 4]
+
+    assert loaded == [[5, 4]]
@@ -0,0 +1,413 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from config import settings
+from core.cache import local as local_module
+from core.cache.local import LocalCache
+from core.cache.policy import CachePolicy, purge_stale_entries
+from core.cache.responses import cached_response, etag_matches
+from core.cache.singleflight import is_in_flight, single_flight
+from core.cache.stats import (
+    TOP_KEYS_PATHS_KEY,
+    flush_key_hits,
+    get_top_keys,
+    key_hits,
+)
+from core.cache.utils import (
+    build_query_cache_key,
+    bump_generation,
+    decode_payload,
+    encode_payload,
+    get_cache,
+    get_generations,
+    get_many_cache,
+    get_or_set_cache,
+    set_cache,
+    set_many_cache,
+    with_etag,
+)
+from core.metrics import CACHE_ERRORS, CACHE_LOOKUPS
+from tests.conftest import DummyRedis
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(local_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def l1(monkeypatch):
+    cache = LocalCache(max_entries=100, max_bytes=1024, default_ttl=5)
+    monkeypatch.setattr("core.cache.utils.local_cache", cache)
+    return cache
+
+
+def test_local_cache_expires_entries(clock):
+    cache = LocalCache(max_entries=10, max_bytes=1024, default_ttl=5)
+    cache.set("all_orgs:a", b"payload")
+
+    assert cache.get("all_orgs:a") == b"payload"
+    clock[0] += 5
+    assert cache.get("all_orgs:a") is None
+    assert cache.stats()["entries"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_local_cache_uses_prefix_ttls(clock):
+    cache = LocalCache(
+        max_entries=10, max_bytes=1024, default_ttl=5, prefix_ttls={"hot": 60}
+    )
+    cache.set("hot:a", b"1")
+    cache.set("cold:a", b"1")
+
+    clock[0] += 30
+    assert cache.get("hot:a") == b"1"
+    assert cache.get("cold:a") is None
+
+
+def test_local_cache_evicts_least_recently_used_by_count(clock):
+    cache = LocalCache(max_entries=2, max_bytes=1024, default_ttl=5)
+    cache.set("p:a", b"a")
+    cache.set("p:b", b"b")
+    cache.get("p:a")
+    cache.set("p:c", b"c")
+
+    assert cache.get("p:b") is None
+    assert cache.get("p:a") == b"a"
+    assert cache.get("p:c") == b"c"
+    assert cache.evictions == 1
+
+
+def test_local_cache_evicts_by_bytes(clock):
+    cache = LocalCache(max_entries=10, max_bytes=10, default_ttl=5)
+    cache.set("p:a", b"x" * 6)
+    cache.set("p:b", b"y" * 6)
+
+    assert cache.get("p:a") is None
+    assert cache.get("p:b") == b"y" * 6
+    assert cache.stats()["bytes"] == 6
+
+    cache.set("p:big", b"z" * 11)
+    assert cache.get("p:big") is None
+    assert cache.get("p:b") == b"y" * 6
+
+
+async def test_get_cache_reads_through_local_cache(l1):
+    client = DummyRedis()
+    client.storage["all_orgs:a"] = b"[]"
+
+    assert await get_cache(client=client, key="all_orgs:a") == b"[]"
+    client.storage.clear()
+    assert await get_cache(client=client, key="all_orgs:a") == b"[]"
+    assert l1.hits == 1
+
+
+async def test_set_cache_populates_both_tiers(l1):
+    client = DummyRedis()
+
+    await set_cache(client=client, key="all_orgs:a", value=b"[1]", ttl=180)
+
+    assert decode_payload(client.storage["all_orgs:a"]) == b"[1]"
+    assert l1.get("all_orgs:a") == b"[1]"
+
+
+async def test_get_or_set_cache_coalesces_concurrent_misses(l1):
+    client = DummyRedis()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return b"[1]"
+
+    results = await asyncio.gather(
+        *[
+            get_or_set_cache(client=client, key="all_orgs:a", ttl=180, loader=loader)
+            for _ in range(5)
+        ]
+    )
+
+    assert results == [b"[1]"] * 5
+    assert len(calls) == 1
+    assert decode_payload(client.storage["all_orgs:a"]) == b"[1]"
+    assert client.ttls["all_orgs:a"] == (180 + settings.CACHE_STALE_TTL) * 1000
+    assert "lock:all_orgs:a" not in client.storage
+
+
+async def test_single_flight_survives_a_cancelled_leader():
+    started = asyncio.Event()
+
+    async def compute():
+        started.set()
+        await asyncio.sleep(0.01)
+        return b"[1]"
+
+    leader = asyncio.create_task(single_flight("k", compute))
+    await started.wait()
+    waiter = asyncio.create_task(single_flight("k", compute))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert await waiter == b"[1]"
+    assert not is_in_flight("k")
+
+
+async def test_get_or_set_cache_does_not_store_failures(l1):
+    client = DummyRedis()
+
+    async def loader():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        await get_or_set_cache(client=client, key="all_orgs:a", ttl=180, loader=loader)
+
+    assert client.storage == {}
+
+
+async def test_get_or_set_cache_serves_stale_while_another_worker_refreshes(l1):
+    client = DummyRedis()
+    client.storage["all_orgs:a"] = b"stale"
+    client.ttls["all_orgs:a"] = 1000
+    client.storage["lock:all_orgs:a"] = "other-worker"
+
+    async def loader():
+        raise AssertionError("loader should not be called")
+
+    result = await get_or_set_cache(
+        client=client, key="all_orgs:a", ttl=180, loader=loader
+    )
+    assert result == b"stale"
+
+
+async def test_get_or_set_cache_refreshes_stale_entry_in_background(l1):
+    client = DummyRedis()
+    client.storage["all_orgs:a"] = b"stale"
+    client.ttls["all_orgs:a"] = 1000
+
+    async def loader():
+        return b"fresh"
+
+    result = await get_or_set_cache(
+        client=client, key="all_orgs:a", ttl=180, loader=loader
+    )
+    assert result == b"stale"
+    assert is_in_flight("all_orgs:a")
+
+    while is_in_flight("all_orgs:a"):
+        await asyncio.sleep(0)
+    assert decode_payload(client.storage["all_orgs:a"]) == b"fresh"
+    assert (
+        await get_or_set_cache(client=client, key="all_orgs:a", ttl=180, loader=loader)
+        == b"fresh"
+    )
+
+
+async def test_get_or_set_cache_reports_remaining_freshness(l1):
+    client = DummyRedis()
+    client.storage["all_orgs:fresh"] = b"[1]"
+    client.ttls["all_orgs:fresh"] = (settings.CACHE_STALE_TTL + 42) * 1000
+    client.storage["all_orgs:stale"] = b"[2]"
+    client.ttls["all_orgs:stale"] = 1000
+    client.storage["lock:all_orgs:stale"] = "other-worker"
+
+    async def loader():
+        return b"[3]"
+
+    async def get(key):
+        return await get_or_set_cache(client=client, key=key, ttl=180, loader=loader)
+
+    assert (await get("all_orgs:fresh")).fresh_for() in (41, 42)
+    assert (await get("all_orgs:fresh")).fresh_for() in (41, 42)
+    assert (await get("all_orgs:stale")).fresh_for() == 0
+    assert (await get("all_orgs:missing")).fresh_for() == 180
+
+    response = cached_response(
+        SimpleNamespace(headers={}), await get("all_orgs:fresh"), max_age=300
+    )
+    assert response.headers["cache-control"] in (
+        "public, max-age=41",
+        "public, max-age=42",
+    )
+
+
+def test_build_query_cache_key_ignores_parameter_order():
+    key = build_query_cache_key(
+        prefix="all_orgs",
+        path="/organizations/",
+        params=[("limit", "10"), ("offset", "0")],
+    )
+
+    assert key.startswith("all_orgs:")
+    assert key == build_query_cache_key(
+        prefix="all_orgs",
+        path="/organizations/",
+        params=[("offset", "0"), ("limit", "10")],
+    )
+    assert key != build_query_cache_key(prefix="all_orgs", path="/organizations/")
+
+
+def test_cache_policy_ttl_falls_back_to_settings(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_TTLS", {"all_orgs": 42})
+
+    assert CachePolicy("all_orgs", ttl=180).expires_in == 42
+    assert CachePolicy("buildings", ttl=180).expires_in == 180
+    assert CachePolicy("buildings").expires_in == settings.CACHE_TTL
+
+
+async def test_bump_generation_changes_dependent_keys(l1):
+    client = DummyRedis()
+
+    assert await get_generations(client, ["organizations", "buildings"]) == [0, 0]
+    assert await bump_generation(client, "organizations") == 1
+    assert await get_generations(client, ["organizations", "buildings"]) == [1, 0]
+
+    key = build_query_cache_key(
+        prefix="orgs_by_building",
+        path="/organizations/by-building/1",
+        generations=[1, 0],
+    )
+    assert key.startswith("orgs_by_building:g1.0:")
+
+
+async def test_purge_stale_entries_removes_old_generations_only(l1):
+    client = DummyRedis()
+    client.storage["all_orgs:g0:old"] = b"[]"
+    client.storage["all_orgs:g1:new"] = b"[]"
+    client.storage["buildings:g0:other"] = b"[]"
+
+    await bump_generation(client, "organizations")
+
+    assert await purge_stale_entries(client, "organizations") == 1
+    assert set(client.storage) == {
+        "cache_generation:organizations",
+        "all_orgs:g1:new",
+        "buildings:g0:other",
+    }
+
+
+async def test_cache_lookups_are_counted_per_prefix(l1):
+    client = DummyRedis()
+    client.storage["stats_prefix:a"] = b"[1, 2]"
+
+    def lookups(result):
+        return CACHE_LOOKUPS.labels("stats_prefix", result)._value.get()
+
+    before = {result: lookups(result) for result in ("local", "redis", "miss")}
+
+    await get_cache(client=client, key="stats_prefix:a")
+    await get_cache(client=client, key="stats_prefix:a")
+    await get_cache(client=client, key="stats_prefix:b")
+
+    assert lookups("redis") == before["redis"] + 1
+    assert lookups("local") == before["local"] + 1
+    assert lookups("miss") == before["miss"] + 1
+
+
+async def test_cache_errors_are_counted_per_prefix(l1):
+    class BrokenRedis(DummyRedis):
+        async def get(self, name):
+            raise ConnectionError("down")
+
+    errors = CACHE_ERRORS.labels("stats_prefix", "get")
+    before = errors._value.get()
+
+    with pytest.raises(ConnectionError):
+        await get_cache(client=BrokenRedis(), key="stats_prefix:a")
+
+    assert errors._value.get() == before + 1
+
+
+def test_payloads_are_compressed_from_the_threshold(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_COMPRESS_MIN_BYTES", 64)
+
+    small = b'[{"id": 1}]'
+    stored = encode_payload(small)
+    assert stored[:1] == b"\x02"
+    assert stored[17:] == small
+
+    large = b"[" + b",".join(b'{"id": 1, "name": "Org"}' for _ in range(100)) + b"]"
+    stored = encode_payload(large)
+    assert stored[:1] == b"\x03"
+    assert len(stored) < len(large) / 10
+    assert decode_payload(stored) == large
+
+
+def test_decoded_payloads_carry_their_etag(monkeypatch):
+    monkeypatch.setattr("core.cache.utils.hashlib.blake2b", None)
+
+    payload = with_etag(b"[1]", digest=bytes(range(16)))
+    decoded = decode_payload(encode_payload(payload))
+    assert decoded == b"[1]"
+    assert decoded.etag == '"000102030405060708090a0b0c0d0e0f"'
+
+
+def test_legacy_payloads_get_an_etag():
+    assert decode_payload(b"\x00[1]").etag == with_etag(b"[1]").etag
+    assert decode_payload(b"[1]").etag == with_etag(b"[1]").etag
+    assert with_etag(b"[1]").etag != with_etag(b"[2]").etag
+
+
+async def test_get_cache_reads_legacy_uncompressed_entries(l1, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_COMPRESS_MIN_BYTES", 4)
+    client = DummyRedis()
+    client.storage["all_orgs:legacy"] = b'[{"id": 1}]'
+
+    assert await get_cache(client=client, key="all_orgs:legacy") == b'[{"id": 1}]'
+
+    await set_many_cache(client, {"all_orgs:new": b'[{"id": 2}]'}, ttl=60)
+    l1.clear()
+    assert await get_many_cache(client, ["all_orgs:legacy", "all_orgs:new"]) == [
+        b'[{"id": 1}]',
+        b'[{"id": 2}]',
+    ]
+
+
+def test_etag_matches():
+    assert etag_matches('"a"', '"a"')
+    assert etag_matches('"b", W/"a"', '"a"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches('"b"', '"a"')
+    assert not etag_matches(None, '"a"')
+
+
+async def test_many_cache_keeps_etags_locally(l1):
+    client = DummyRedis()
+    await set_many_cache(client, {"all_orgs:set": b"[1]"}, ttl=60)
+    client.storage["all_orgs:redis"] = encode_payload(b"[2]")
+
+    values = await get_many_cache(client, ["all_orgs:set", "all_orgs:redis"])
+    assert values == [b"[1]", b"[2]"]
+    assert all(type(value) is bytes for value in values)
+
+    assert l1.get("all_orgs:set").etag == with_etag(b"[1]").etag
+    assert l1.get("all_orgs:redis").etag == with_etag(b"[2]").etag
+
+
+async def test_key_hits_are_added_up_in_redis(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_TOP_KEYS_TRACKED", 2)
+    client = DummyRedis()
+    key_hits.clear()
+
+    for key in ("all_orgs:1", "all_orgs:1", "all_orgs:2"):
+        key_hits.hit(key)
+    key_hits.describe("all_orgs:1", "/organizations/?limit=1")
+    key_hits.describe("all_orgs:2", "/organizations/?limit=2")
+    await flush_key_hits(client)
+
+    for key in ("all_orgs:1", "all_orgs:3", "all_orgs:3", "all_orgs:3"):
+        key_hits.hit(key)
+    await flush_key_hits(client)
+
+    assert await get_top_keys(client, limit=10) == [
+        ("all_orgs:3", None, 3),
+        ("all_orgs:1", "/organizations/?limit=1", 3),
+    ]
+    assert client.hashes[TOP_KEYS_PATHS_KEY] == {
+        b"all_orgs:1": b"/organizations/?limit=1"
+    }
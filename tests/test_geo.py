@@ -0,0 +1,157 @@
+import pytest
+
+from core.cache.local import LocalCache
+from core.geo import (
+    Cluster,
+    TileLocationSearch,
+    box_around,
+    get_clusters,
+    sphere_distance,
+    tiles_in_box,
+)
+from tests.conftest import DummyRedis
+
+POINTS = [
+    (1, "Near", 10, 55.7510, 37.6170),
+    (2, "Nearer", 11, 55.7501, 37.6171),
+    (3, "Far", 12, 55.8000, 37.7000),
+]
+
+
+@pytest.fixture(autouse=True)
+def l1(monkeypatch):
+    cache = LocalCache(max_entries=100, max_bytes=1024 * 1024, default_ttl=5)
+    monkeypatch.setattr("core.cache.utils.local_cache", cache)
+    return cache
+
+
+class RepoStub:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_organization_points(
+        self, min_latitude, max_latitude, min_longitude, max_longitude
+    ):
+        self.calls += 1
+        return [
+            point
+            for point in POINTS
+            if min_latitude <= point[3] <= max_latitude
+            and min_longitude <= point[4] <= max_longitude
+        ]
+
+
+def test_sphere_distance_matches_known_value():
+    # One degree of latitude on the mean sphere
+    assert sphere_distance(0, 0, 1, 0) == pytest.approx(111195.08, abs=0.01)
+    assert sphere_distance(55.75, 37.61, 55.75, 37.61) == 0
+
+
+def test_box_around_covers_radius():
+    min_lat, max_lat, min_lon, max_lon = box_around(55.75, 37.61, 1000)
+
+    assert sphere_distance(55.75, 37.61, max_lat, 37.61) == pytest.approx(1000)
+    assert sphere_distance(55.75, 37.61, 55.75, max_lon) >= 1000
+    assert box_around(89.999, 0, 1000)[2:] == (-180.0, 180.0)
+
+
+def test_tiles_in_box():
+    assert tiles_in_box(0.005, 0.015, 0.001, 0.002, tile_size=0.01) == [(0, 0), (1, 0)]
+
+
+async def test_radius_search_filters_sorts_and_reuses_tiles():
+    client, repository = DummyRedis(), RepoStub()
+    search = TileLocationSearch(client=client, repository=repository, tile_size=0.01)
+
+    result = await search.get_organizations_by_radius(
+        latitude=55.75, longitude=37.617, radius_meters=500
+    )
+    assert [(i.id, round(distance)) for i, distance in result] == [(2, 13), (1, 111)]
+    assert repository.calls == 1
+
+    # A few meters away: same tiles, no database round trip
+    result = await search.get_organizations_by_radius(
+        latitude=55.75003, longitude=37.61702, radius_meters=500, limit=1
+    )
+    assert [i.id for i, _ in result] == [2]
+    assert repository.calls == 1
+    assert any(key.startswith("geo_tile:g0.0:0.01:") for key in client.storage)
+
+
+async def test_radius_search_after_cursor():
+    search = TileLocationSearch(
+        client=DummyRedis(), repository=RepoStub(), tile_size=0.01
+    )
+    first = await search.get_organizations_by_radius(
+        latitude=55.75, longitude=37.617, radius_meters=500, limit=1
+    )
+
+    ((organization, distance),) = first
+    result = await search.get_organizations_by_radius(
+        latitude=55.75,
+        longitude=37.617,
+        radius_meters=500,
+        after=(distance, organization.id),
+    )
+    assert [i.id for i, _ in result] == [1]
+
+
+async def test_points_on_tile_edges_are_loaded(monkeypatch):
+    # 3006 * 0.01 rounds above 30.06, which tile_of still puts in row 3006
+    monkeypatch.setattr("tests.test_geo.POINTS", [(4, "Edge", 13, 30.06, 40.0)])
+    search = TileLocationSearch(
+        client=DummyRedis(), repository=RepoStub(), tile_size=0.01
+    )
+
+    result = await search.get_organizations_by_area(
+        min_latitude=30.06,
+        max_latitude=30.0699,
+        min_longitude=40.0,
+        max_longitude=40.0099,
+    )
+    assert [i.id for i in result] == [4]
+
+
+async def test_area_search_filters_by_box():
+    repository = RepoStub()
+    search = TileLocationSearch(
+        client=DummyRedis(), repository=repository, tile_size=0.01
+    )
+
+    result = await search.get_organizations_by_area(
+        min_latitude=55.7505,
+        max_latitude=55.81,
+        min_longitude=37.6,
+        max_longitude=37.71,
+        offset=1,
+    )
+    assert [i.id for i in result] == [3]
+    assert repository.calls == 1
+
+
+async def test_clusters_are_cached_per_tile():
+    calls = []
+
+    class ClusterRepoStub:
+        async def get_clusters(self, cell_size, **box):
+            calls.append(box)
+            half = cell_size / 2
+            return [
+                (half, half, 0.1, 0.2, 3),
+                (half, 10 * cell_size + half, 0.3, 3.0, 1),
+            ]
+
+    client = DummyRedis()
+    viewport = dict(
+        min_latitude=0.0, max_latitude=1.0, min_longitude=0.0, max_longitude=1.0
+    )
+
+    clusters = await get_clusters(client, ClusterRepoStub(), zoom=8, **viewport)
+    assert clusters == [Cluster(0.1, 0.2, 3)]
+    assert len(calls) == 1
+
+    assert await get_clusters(client, ClusterRepoStub(), zoom=8, **viewport) == [
+        Cluster(0.1, 0.2, 3)
+    ]
+    assert len(calls) == 1
+    assert any(key.startswith("clusters:g0.0:8:") for key in client.storage)
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from core.geo import SpatialIndex, sphere_distance
+
+random.seed(7)
+POINTS = [
+    (i, f"Org {i}", i // 3, 55.7 + random.random() * 0.1, 37.5 + random.random() * 0.2)
+    for i in range(1, 301)
+]
+CENTER = (55.75, 37.6)
+
+
+@pytest.fixture
+def index():
+    return SpatialIndex(POINTS)
+
+
+def brute_force_radius(radius):
+    result = [
+        (point[0], sphere_distance(*CENTER, point[3], point[4])) for point in POINTS
+    ]
+    return sorted([i for i in result if i[1] <= radius], key=lambda i: (i[1], i[0]))
+
+
+def test_radius_matches_brute_force(index):
+    expected = brute_force_radius(2000)
+    result = index.radius(*CENTER, 2000)
+
+    assert [i.id for i, _ in result] == [i for i, _ in expected]
+    assert [d for _, d in result] == pytest.approx([d for _, d in expected])
+
+
+def test_radius_pages_by_cursor(index):
+    first = index.radius(*CENTER, 2000, limit=5)
+    point, distance = first[-1]
+    rest = index.radius(*CENTER, 2000, after=(distance, point.id))
+
+    assert [i.id for i, _ in first + rest] == [i for i, _ in brute_force_radius(2000)]
+
+
+def test_box_is_ordered_by_id(index):
+    result = index.box(55.72, 55.76, 37.55, 37.65, offset=1, limit=10)
+
+    expected = [
+        point[0]
+        for point in POINTS
+        if 55.72 <= point[3] <= 55.76 and 37.55 <= point[4] <= 37.65
+    ]
+    assert [i.id for i in result] == expected[1:11]
+
+
+def test_nearest_returns_k_closest(index):
+    result = index.nearest(*CENTER, k=7)
+
+    assert [i.id for i, _ in result] == [i for i, _ in brute_force_radius(1e9)][:7]
+    assert index.nearest(*CENTER, k=1000)[-1][0].id == brute_force_radius(1e9)[-1][0]
+
+
+def test_updated_replaces_changed_rows(index):
+    moved = (1, "Org 1", 0, *CENTER)
+    updated = index.updated(organization_ids={1}, building_ids={5}, points=[moved])
+
+    assert len(updated) == len([p for p in POINTS if p[2] != 5 or p[0] == 1])
+    assert updated.nearest(*CENTER, k=1) == [(moved, 0.0)]
+    assert all(point.building_id != 5 for point in updated.box(-90, 90, -180, 180))
+
+
+def test_updated_matches_a_rebuilt_index(index):
+    added = [(1000 + i, f"New {i}", 500, 55.69 + i * 0.01, 37.6) for i in range(13)]
+    updated = index.updated(organization_ids={2, 3}, building_ids={7}, points=added)
+
+    rebuilt = SpatialIndex(
+        [p for p in POINTS if p[0] not in {2, 3} and p[2] != 7] + added
+    )
+    assert updated.names == rebuilt.names
+    for column in ("ids", "building_ids", "latitudes", "_phi", "_cos_phi"):
+        assert (getattr(updated, column) == getattr(rebuilt, column)).all()
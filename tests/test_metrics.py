@@ -0,0 +1,149 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from sqlalchemy import create_engine, text
+
+from config import settings
+from core.cache.redis import InstrumentedRedis
+from core.metrics import HTTP_REQUESTS, HTTP_REQUESTS_IN_PROGRESS, REPEATED_STATEMENTS
+from core.request_stats import (
+    finish_request_stats,
+    instrument_engine,
+    normalize_statement,
+    record_statement,
+    start_request_stats,
+)
+from tests.conftest import load_through
+
+
+def request_count(method, route, status):
+    return HTTP_REQUESTS.labels(method, route, status)._value.get()
+
+
+def test_requests_are_counted_by_route_template(monkeypatch, test_app, test_headers):
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+        async def get_organization_document(self, organization_id):
+            return None
+
+    monkeypatch.setattr(
+        "core.cache.policy.get_or_set_cache", AsyncMock(side_effect=load_through)
+    )
+    monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
+
+    route = "/organizations/{organization_id}"
+    before = request_count("GET", route, "404")
+
+    for organization_id in (1, 2, 3):
+        test_app.get(f"/organizations/{organization_id}", headers=test_headers)
+    test_app.get("/no-such-path")
+
+    assert request_count("GET", route, "404") == before + 3
+    assert request_count("GET", "unmatched", "404") >= 1
+    assert HTTP_REQUESTS_IN_PROGRESS.labels("GET")._value.get() == 0
+
+
+def test_metrics_endpoint(test_app):
+    test_app.get("/health")
+
+    response = test_app.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_request_duration_seconds_bucket{le="0.005",method="GET",route="/health"}'
+        in response.text
+    )
+    assert (
+        'http_requests_total{method="GET",route="/health",status="200"}'
+        in response.text
+    )
+
+
+def test_normalize_statement():
+    assert (
+        normalize_statement(
+            "SELECT phones.id FROM phones\n"
+            "WHERE phones.organization_id IN ($1::INTEGER, $2::INTEGER, $3::INTEGER)"
+        )
+        == "SELECT phones.id FROM phones WHERE phones.organization_id IN (?)"
+    )
+    assert normalize_statement(
+        "SELECT * FROM buildings WHERE id = $1::INTEGER"
+    ) == normalize_statement("SELECT * FROM buildings WHERE id = $7::INTEGER")
+
+
+def test_server_timing_and_repeated_statements(monkeypatch, test_app, test_headers):
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+        async def get_organization_document(self, organization_id):
+            for i in range(12):
+                record_statement(f"SELECT * FROM phones WHERE id = ${i + 1}", 0.001)
+            record_statement("SELECT * FROM organizations WHERE id = $1", 0.001)
+            return None
+
+    monkeypatch.setattr(
+        "core.cache.policy.get_or_set_cache", AsyncMock(side_effect=load_through)
+    )
+    monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
+    monkeypatch.setattr(settings, "SQL_REPEATED_STATEMENT_THRESHOLD", 10)
+
+    route = "/organizations/{organization_id}"
+    before = REPEATED_STATEMENTS.labels(route)._value.get()
+
+    response = test_app.get("/organizations/1", headers=test_headers)
+    timing = response.headers["server-timing"]
+    assert 'db;dur=13.00;desc="13 queries"' in timing
+    assert "cache;dur=" in timing
+    assert "total;dur=" in timing
+    assert REPEATED_STATEMENTS.labels(route)._value.get() == before + 1
+
+
+def test_engine_events_feed_request_stats():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+
+    stats, token = start_request_stats()
+    try:
+        with engine.connect() as connection:
+            for i in range(3):
+                connection.execute(text("SELECT :value"), {"value": i})
+    finally:
+        finish_request_stats(token)
+
+    assert stats.db_count == 3
+    assert stats.db_time > 0
+    assert stats.statements == {"SELECT ?": 3}
+
+
+def test_redis_calls_feed_request_stats(monkeypatch):
+    async def execute_command(self, *args, **options):
+        return b"[]"
+
+    async def execute(self, raise_on_error=True):
+        return [b"[]", -1]
+
+    monkeypatch.setattr(Redis, "execute_command", execute_command)
+    monkeypatch.setattr(Pipeline, "execute", execute)
+
+    async def run():
+        client = InstrumentedRedis()
+        await client.get("all_orgs:a")
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.get("all_orgs:a")
+            pipe.pttl("all_orgs:a")
+            await pipe.execute()
+
+    stats, token = start_request_stats()
+    try:
+        asyncio.run(run())
+    finally:
+        finish_request_stats(token)
+
+    assert stats.cache_count == 2
+    assert stats.cache_time > 0
@@ -2,6 +2,13 @@ from types import SimpleNamespace
 from unittest.mock import AsyncMock
 
 import orjson
+import pytest
+
+from config import settings
+from core.repository.pagination import decode_cursor
+from core.repository.repository import normalize_search_text
+from schemas.organization import OrganizationResponse
+from tests.conftest import load_through
 
 
 def make_building(building_id=10):
@@ -42,21 +49,22 @@ def make_org(org_id=1, building_id=10):
     )
 
 
+def make_document(org_id=1, building_id=10):
+    organization = make_org(org_id, building_id)
+    return orjson.dumps(OrganizationResponse.model_validate(organization).model_dump())
+
+
 def test_get_organizations_by_building_uses_cache(monkeypatch, test_app, test_headers):
     cached = [{"id": 1, "name": "Org 1", "building_id": 10}]
 
-    async def fake_get_cache(client, key):
+    async def fake_get_or_set_cache(client, key, ttl, loader):
         return orjson.dumps(cached)
 
-    async def fake_set_cache(*args, **kwargs):
-        raise AssertionError("set_cache should not be called")
-
     class RepoStub:
         def __init__(self, session):
             raise AssertionError("repository should not be instantiated")
 
-    monkeypatch.setattr("api.organizations.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.organizations.set_cache", fake_set_cache)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", fake_get_or_set_cache)
     monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
 
     response = test_app.get(
@@ -67,6 +75,37 @@ def test_get_organizations_by_building_uses_cache(monkeypatch, test_app, test_he
     assert response.json() == cached
 
 
+def test_cache_hit_returns_stored_bytes_unchanged(monkeypatch, test_app, test_headers):
+    cached = b'[{"id":1,"name":"Org 1","building_id":10}]'
+
+    async def fake_get_or_set_cache(client, key, ttl, loader):
+        return cached
+
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", fake_get_or_set_cache)
+
+    response = test_app.get("/organizations/", headers=test_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.content == cached
+
+
+def test_cache_key_ignores_host_and_query_order(monkeypatch, test_app, test_headers):
+    keys = []
+
+    async def fake_get_or_set_cache(client, key, ttl, loader):
+        keys.append(key)
+        return b"[]"
+
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", fake_get_or_set_cache)
+
+    test_app.get("/organizations/?limit=10&offset=0", headers=test_headers)
+    test_app.get(
+        "http://other-host/organizations/?offset=0&limit=10", headers=test_headers
+    )
+    assert len(keys) == 2
+    assert keys[0] == keys[1]
+
+
 def test_get_organizations_by_building_success(monkeypatch, test_app, test_headers):
     building = make_building(3)
     organizations = [
@@ -74,10 +113,7 @@ def test_get_organizations_by_building_success(monkeypatch, test_app, test_heade
         SimpleNamespace(id=2, name="Org 2", building_id=building.id),
     ]
 
-    async def fake_get_cache(client, key):
-        return None
-
-    cache_spy = AsyncMock(return_value=True)
+    cache_spy = AsyncMock(side_effect=load_through)
 
     class RepoStub:
         def __init__(self, session):
@@ -94,8 +130,7 @@ def test_get_organizations_by_building_success(monkeypatch, test_app, test_heade
             assert offset == 2
             return organizations
 
-    monkeypatch.setattr("api.organizations.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.organizations.set_cache", cache_spy)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
     monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
 
     response = test_app.get(
@@ -113,10 +148,7 @@ def test_get_organizations_by_building_success(monkeypatch, test_app, test_heade
 
 
 def test_get_organizations_by_building_not_found(monkeypatch, test_app, test_headers):
-    async def fake_get_cache(client, key):
-        return None
-
-    cache_spy = AsyncMock()
+    cache_spy = AsyncMock(side_effect=load_through)
 
     class RepoStub:
         def __init__(self, session):
@@ -128,8 +160,7 @@ def test_get_organizations_by_building_not_found(monkeypatch, test_app, test_hea
         async def get_organizations_by_building(self, *args, **kwargs):
             raise AssertionError("should not fetch organizations")
 
-    monkeypatch.setattr("api.organizations.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.organizations.set_cache", cache_spy)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
     monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
 
     response = test_app.get(
@@ -138,7 +169,6 @@ def test_get_organizations_by_building_not_found(monkeypatch, test_app, test_hea
     )
     assert response.status_code == 404
     assert response.json() == {"detail": "Building not found"}
-    assert cache_spy.await_count == 0
 
 
 def test_get_organizations_by_activity_success(monkeypatch, test_app, test_headers):
@@ -147,10 +177,7 @@ def test_get_organizations_by_activity_success(monkeypatch, test_app, test_heade
         SimpleNamespace(id=1, name="Org A", building_id=4),
     ]
 
-    async def fake_get_cache(client, key):
-        return None
-
-    cache_spy = AsyncMock(return_value=True)
+    cache_spy = AsyncMock(side_effect=load_through)
 
     class RepoStub:
         def __init__(self, session):
@@ -168,8 +195,7 @@ def test_get_organizations_by_activity_success(monkeypatch, test_app, test_heade
             assert offset == 0
             return organizations
 
-    monkeypatch.setattr("api.organizations.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.organizations.set_cache", cache_spy)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
     monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
 
     response = test_app.get(
@@ -186,10 +212,7 @@ def test_get_organizations_by_activity_success(monkeypatch, test_app, test_heade
 
 
 def test_get_organizations_by_activity_not_found(monkeypatch, test_app, test_headers):
-    async def fake_get_cache(client, key):
-        return None
-
-    cache_spy = AsyncMock()
+    cache_spy = AsyncMock(side_effect=load_through)
 
     class RepoStub:
         def __init__(self, session):
@@ -201,8 +224,7 @@ def test_get_organizations_by_activity_not_found(monkeypatch, test_app, test_hea
         async def get_organizations_by_activity(self, *args, **kwargs):
             raise AssertionError("should not fetch organizations")
 
-    monkeypatch.setattr("api.organizations.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.organizations.set_cache", cache_spy)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
     monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
 
     response = test_app.get(
@@ -211,7 +233,6 @@ def test_get_organizations_by_activity_not_found(monkeypatch, test_app, test_hea
     )
     assert response.status_code == 404
     assert response.json() == {"detail": "Activity not found"}
-    assert cache_spy.await_count == 0
 
 
 def test_get_organizations_by_location_radius(monkeypatch, test_app, test_headers):
@@ -219,10 +240,7 @@ def test_get_organizations_by_location_radius(monkeypatch, test_app, test_header
         SimpleNamespace(id=1, name="Org R", building_id=2),
     ]
 
-    async def fake_get_cache(client, key):
-        return None
-
-    cache_spy = AsyncMock(return_value=True)
+    cache_spy = AsyncMock(side_effect=load_through)
 
     class RepoStub:
         def __init__(self, session):
@@ -236,13 +254,12 @@ def test_get_organizations_by_location_radius(monkeypatch, test_app, test_header
             assert radius_meters == 1000.0
             assert limit == 1
             assert offset == 0
-            return organizations
+            return [(organization, 12.5) for organization in organizations]
 
         async def get_organizations_by_area(self, *args, **kwargs):
             raise AssertionError("area path should not be used")
 
-    monkeypatch.setattr("api.organizations.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.organizations.set_cache", cache_spy)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
     monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
 
     response = test_app.get(
@@ -265,30 +282,33 @@ def test_get_organizations_by_location_radius(monkeypatch, test_app, test_header
 
 
 def test_get_organizations_by_location_area(monkeypatch, test_app, test_headers):
-    async def fake_get_cache(client, key):
-        return None
-
-    async def fake_set_cache(*args, **kwargs):
-        raise AssertionError("set_cache should not be called")
+    cache_spy = AsyncMock(side_effect=load_through)
 
     class RepoStub:
         def __init__(self, session):
             self.session = session
 
         async def get_organizations_by_area(
-            self, min_latitude, max_latitude, min_longitude, max_longitude
+            self,
+            min_latitude,
+            max_latitude,
+            min_longitude,
+            max_longitude,
+            limit=None,
+            offset=None,
         ):
             assert min_latitude == 9.0
             assert max_latitude == 11.0
             assert min_longitude == 19.0
             assert max_longitude == 21.0
-            return [{"id": 1, "name": "Org A", "building_id": 2}]
+            assert limit == settings.LOCATION_MAX_RESULTS
+            assert offset == 5
+            return [SimpleNamespace(id=1, name="Org A", building_id=2)]
 
         async def get_organizations_by_radius(self, *args, **kwargs):
             raise AssertionError("radius path should not be used")
 
-    monkeypatch.setattr("api.organizations.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.organizations.set_cache", fake_set_cache)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
     monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
 
     response = test_app.get(
@@ -301,26 +321,25 @@ def test_get_organizations_by_location_area(monkeypatch, test_app, test_headers)
             "max_lat": 11.0,
             "min_lon": 19.0,
             "max_lon": 21.0,
+            "limit": settings.LOCATION_MAX_RESULTS,
+            "offset": 5,
         },
     )
     assert response.status_code == 200
     assert response.json() == [{"id": 1, "name": "Org A", "building_id": 2}]
+    assert cache_spy.await_args.kwargs["ttl"] == 300
 
 
 def test_get_organizations_by_location_missing_params(
     monkeypatch, test_app, test_headers
 ):
-    async def fake_get_cache(client, key):
-        return None
-
-    cache_spy = AsyncMock()
+    cache_spy = AsyncMock(side_effect=load_through)
 
     class RepoStub:
         def __init__(self, session):
             self.session = session
 
-    monkeypatch.setattr("api.organizations.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.organizations.set_cache", cache_spy)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
     monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
 
     response = test_app.get(
@@ -335,27 +354,224 @@ def test_get_organizations_by_location_missing_params(
     assert response.json() == {
         "detail": "Please provide either 'radius' or all rectangle parameters (min_lat, max_lat, min_lon, max_lon)"
     }
+
+
+def test_get_organizations_by_location_tiles_mode(monkeypatch, test_app, test_headers):
+    cache_spy = AsyncMock(side_effect=load_through)
+
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+        async def get_organization_points(self, **kwargs):
+            return [(1, "Org T", 2, 10.0001, 20.0001)]
+
+    monkeypatch.setattr(settings, "GEO_CACHE_MODE", "tiles")
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
+    monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
+
+    response = test_app.get(
+        "/organizations/by-location",
+        headers=test_headers,
+        params={"latitude": 10.0, "longitude": 20.0, "radius": 100},
+    )
+    assert response.status_code == 200
+    assert response.json() == [{"id": 1, "name": "Org T", "building_id": 2}]
     assert cache_spy.await_count == 0
 
 
-def test_get_organization_by_id_success(monkeypatch, test_app, test_headers):
-    organization = make_org(42, 7)
+def test_get_organization_clusters(monkeypatch, test_app, test_headers):
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+        async def get_clusters(self, cell_size, **box):
+            return [(cell_size / 2, cell_size / 2, 0.1, 0.2, 3)]
 
-    async def fake_get_cache(client, key):
+    monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
+
+    params = {"min_lat": 0, "max_lat": 1, "min_lon": 0, "max_lon": 1, "zoom": 8}
+    response = test_app.get(
+        "/organizations/clusters", headers=test_headers, params=params
+    )
+    assert response.status_code == 200
+    assert response.json() == [{"latitude": 0.1, "longitude": 0.2, "count": 3}]
+
+    response = test_app.get(
+        "/organizations/clusters",
+        headers=test_headers,
+        params={**params, "max_lat": 80, "max_lon": 170, "zoom": 12},
+    )
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Viewport is too large for this zoom level"}
+
+
+class SessionStub:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *args):
         return None
 
-    cache_spy = AsyncMock(return_value=True)
+
+def export_repo_stub(batches):
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+        async def stream_organizations(self, batch_size):
+            for batch in batches:
+                yield batch
+
+    return RepoStub
+
+
+def test_export_organizations_streams_ndjson(monkeypatch, test_app, test_headers):
+    monkeypatch.setattr("api.organizations.AsyncSessionLocal", SessionStub)
+    monkeypatch.setattr(
+        "api.organizations.CrudRepository",
+        export_repo_stub([[make_org(1), make_org(2)], [make_org(3)]]),
+    )
+
+    response = test_app.get("/organizations/export", headers=test_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    lines = response.content.splitlines()
+    assert [orjson.loads(line)["id"] for line in lines] == [1, 2, 3]
+    assert orjson.loads(lines[0])["building"]["id"] == 10
+
+
+def test_export_organizations_gzip(monkeypatch, test_app, test_headers):
+    monkeypatch.setattr("api.organizations.AsyncSessionLocal", SessionStub)
+    monkeypatch.setattr(
+        "api.organizations.CrudRepository", export_repo_stub([[make_org(1)]])
+    )
+
+    response = test_app.get(
+        "/organizations/export", headers=test_headers, params={"gzip": True}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert orjson.loads(response.content.splitlines()[0])["id"] == 1
+
+
+def test_get_nearest_organizations(monkeypatch, test_app, test_headers):
+    cache_spy = AsyncMock(side_effect=load_through)
+
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+        async def get_activity_by_id(self, activity_id):
+            return SimpleNamespace(id=activity_id)
+
+        async def get_nearest_organizations(self, latitude, longitude, k, activity_id):
+            assert (latitude, longitude, k, activity_id) == (10.0, 20.0, 2, 3)
+            return [
+                SimpleNamespace(id=1, name="Org N", building_id=2, distance=12.5),
+                SimpleNamespace(id=4, name="Org M", building_id=5, distance=40.0),
+            ]
+
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
+    monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
+
+    response = test_app.get(
+        "/organizations/nearest",
+        headers=test_headers,
+        params={"lat": 10.0, "lon": 20.0, "k": 2, "activity_id": 3},
+    )
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 1, "name": "Org N", "building_id": 2, "distance": 12.5},
+        {"id": 4, "name": "Org M", "building_id": 5, "distance": 40.0},
+    ]
+    assert cache_spy.await_args.kwargs["key"].startswith("orgs_nearest:")
+
+
+def test_get_nearest_organizations_unknown_activity(
+    monkeypatch, test_app, test_headers
+):
+    cache_spy = AsyncMock(side_effect=load_through)
+
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+        async def get_activity_by_id(self, activity_id):
+            return None
+
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
+    monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
+
+    response = test_app.get(
+        "/organizations/nearest",
+        headers=test_headers,
+        params={"lat": 10.0, "lon": 20.0, "activity_id": 3},
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Activity not found"}
+
+
+def test_get_organizations_batch_shares_detail_cache(
+    monkeypatch, test_app, test_headers
+):
+    loaded = []
+
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+        async def get_organization_document(self, organization_id):
+            return make_document(organization_id)
+
+        async def get_organization_documents(self, organization_ids):
+            loaded.append(organization_ids)
+            return {i: make_document(i) for i in organization_ids if i != 3}
+
+    monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
+
+    assert test_app.get("/organizations/1", headers=test_headers).status_code == 200
+
+    response = test_app.post(
+        "/organizations/batch", headers=test_headers, json={"ids": [2, 1, 3, 2]}
+    )
+    assert response.status_code == 200
+    assert [i["id"] for i in response.json()] == [2, 1]
+    assert (
+        response.json()[1]
+        == test_app.get("/organizations/1", headers=test_headers).json()
+    )
+    assert loaded == [[2, 3]]
+
+    response = test_app.post(
+        "/organizations/batch", headers=test_headers, json={"ids": [1, 2]}
+    )
+    assert [i["id"] for i in response.json()] == [1, 2]
+    assert loaded == [[2, 3]]
+
+
+def test_get_organizations_batch_validates_ids(test_app, test_headers):
+    response = test_app.post(
+        "/organizations/batch", headers=test_headers, json={"ids": []}
+    )
+    assert response.status_code == 422
+
+
+def test_get_organization_by_id_success(monkeypatch, test_app, test_headers):
+    organization = make_org(42, 7)
+
+    cache_spy = AsyncMock(side_effect=load_through)
 
     class RepoStub:
         def __init__(self, session):
             self.session = session
 
-        async def get_organization_by_id(self, organization_id):
+        async def get_organization_document(self, organization_id):
             assert organization_id == organization.id
-            return organization
+            return make_document(organization.id, organization.building_id)
 
-    monkeypatch.setattr("api.organizations.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.organizations.set_cache", cache_spy)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
     monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
 
     response = test_app.get(
@@ -393,20 +609,16 @@ def test_get_organization_by_id_success(monkeypatch, test_app, test_headers):
 
 
 def test_get_organization_by_id_not_found(monkeypatch, test_app, test_headers):
-    async def fake_get_cache(client, key):
-        return None
-
-    cache_spy = AsyncMock()
+    cache_spy = AsyncMock(side_effect=load_through)
 
     class RepoStub:
         def __init__(self, session):
             self.session = session
 
-        async def get_organization_by_id(self, organization_id):
+        async def get_organization_document(self, organization_id):
             return None
 
-    monkeypatch.setattr("api.organizations.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.organizations.set_cache", cache_spy)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
     monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
 
     response = test_app.get(
@@ -415,27 +627,45 @@ def test_get_organization_by_id_not_found(monkeypatch, test_app, test_headers):
     )
     assert response.status_code == 404
     assert response.json() == {"detail": "Organization not found"}
-    assert cache_spy.await_count == 0
 
 
 def test_search_organizations_by_name(monkeypatch, test_app, test_headers):
+    cache_spy = AsyncMock(side_effect=load_through)
+
     class RepoStub:
         def __init__(self, session):
             self.session = session
 
-        async def get_organization_by_name(self, name):
+        async def get_organization_by_name(self, name, limit=None, offset=None):
             assert name == "Target"
-            return [{"id": 1, "name": "Target", "building_id": 3}]
+            assert limit == 5
+            assert offset == 0
+            return [SimpleNamespace(id=1, name="Target", building_id=3)]
 
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
     monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
 
     response = test_app.get(
         "/organizations/search/by-name",
         headers=test_headers,
-        params={"name": "Target"},
+        params={"name": "Target", "limit": 5},
     )
     assert response.status_code == 200
     assert response.json() == [{"id": 1, "name": "Target", "building_id": 3}]
+    assert cache_spy.await_count == 1
+
+
+def test_search_organizations_by_name_limit_is_capped(test_app, test_headers):
+    response = test_app.get(
+        "/organizations/search/by-name",
+        headers=test_headers,
+        params={"name": "Target", "limit": 1000},
+    )
+    assert response.status_code == 422
+
+
+def test_normalize_search_text_folds_case_and_yo():
+    assert normalize_search_text("Ёлки-Палки МЁД") == "елки-палки мед"
 
 
 def test_list_all_organizations(monkeypatch, test_app, test_headers):
@@ -444,10 +674,7 @@ def test_list_all_organizations(monkeypatch, test_app, test_headers):
         SimpleNamespace(id=2, name="Org 2", building_id=2),
     ]
 
-    async def fake_get_cache(client, key):
-        return None
-
-    cache_spy = AsyncMock(return_value=True)
+    cache_spy = AsyncMock(side_effect=load_through)
 
     class RepoStub:
         def __init__(self, session):
@@ -458,8 +685,7 @@ def test_list_all_organizations(monkeypatch, test_app, test_headers):
             assert offset == 1
             return organizations
 
-    monkeypatch.setattr("api.organizations.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.organizations.set_cache", cache_spy)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
     monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
 
     response = test_app.get(
@@ -491,10 +717,7 @@ def test_get_activity_ids(monkeypatch, test_app, test_headers):
         },
     ]
 
-    async def fake_get_cache(client, key):
-        return None
-
-    cache_spy = AsyncMock(return_value=True)
+    cache_spy = AsyncMock(side_effect=load_through)
 
     class RepoStub:
         def __init__(self, session):
@@ -503,10 +726,9 @@ def test_get_activity_ids(monkeypatch, test_app, test_headers):
         async def get_activity_ids(self, limit=None, offset=None):
             assert limit == 5
             assert offset == 0
-            return activities
+            return [SimpleNamespace(**activity) for activity in activities]
 
-    monkeypatch.setattr("api.organizations.get_cache", fake_get_cache)
-    monkeypatch.setattr("api.organizations.set_cache", cache_spy)
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
     monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
 
     response = test_app.get(
@@ -523,3 +745,248 @@ def test_protected_endpoint_requires_valid_api_key(test_app):
     response = test_app.get("/buildings/", headers={"X-API-KEY": "wrong"})
     assert response.status_code == 401
     assert response.json() == {"detail": "invalid API key"}
+
+
+def test_list_all_organizations_cursor_pages(monkeypatch, test_app, test_headers):
+    organizations = [
+        SimpleNamespace(id=i, name=f"Org {i}", building_id=1) for i in range(1, 6)
+    ]
+    cache_spy = AsyncMock(side_effect=load_through)
+
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+        async def get_all_organizations(self, limit=None, offset=None, after_id=None):
+            assert offset is None
+            rows = [i for i in organizations if after_id is None or i.id > after_id]
+            return rows[:limit]
+
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
+    monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
+
+    response = test_app.get(
+        "/organizations/", headers=test_headers, params={"limit": 2, "cursor": ""}
+    )
+    assert response.status_code == 200
+    first = response.json()
+    assert [i["id"] for i in first["items"]] == [1, 2]
+    assert first["next_cursor"]
+
+    cursor = first["next_cursor"]
+    ids = []
+    while cursor:
+        page = test_app.get(
+            "/organizations/",
+            headers=test_headers,
+            params={"limit": 2, "cursor": cursor},
+        ).json()
+        ids += [i["id"] for i in page["items"]]
+        cursor = page["next_cursor"]
+    assert ids == [3, 4, 5]
+
+
+def test_get_organizations_by_location_radius_cursor(
+    monkeypatch, test_app, test_headers
+):
+    organizations = [
+        SimpleNamespace(id=1, name="Org A", building_id=2),
+        SimpleNamespace(id=2, name="Org B", building_id=3),
+    ]
+    cache_spy = AsyncMock(side_effect=load_through)
+
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+        async def get_organizations_by_radius(
+            self, latitude, longitude, radius_meters, limit=None, after=None
+        ):
+            assert limit == 2
+            assert after is None
+            return [(organizations[0], 10.5), (organizations[1], 20.0)]
+
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
+    monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
+
+    response = test_app.get(
+        "/organizations/by-location",
+        headers=test_headers,
+        params={
+            "latitude": 10.0,
+            "longitude": 20.0,
+            "radius": 1000,
+            "limit": 1,
+            "cursor": "",
+        },
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["items"] == [{"id": 1, "name": "Org A", "building_id": 2}]
+    assert decode_cursor(body["next_cursor"], "distance", "id") == (10.5, 1)
+
+
+def test_invalid_cursor_is_rejected(monkeypatch, test_app, test_headers):
+    cache_spy = AsyncMock(side_effect=load_through)
+
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+    monkeypatch.setattr("core.cache.policy.get_or_set_cache", cache_spy)
+    monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
+
+    response = test_app.get(
+        "/organizations/", headers=test_headers, params={"cursor": "not-a-cursor"}
+    )
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"cursor": "", "limit": -1},
+        {"limit": 0},
+        {"offset": -1},
+        {"limit": settings.MAX_PAGE_SIZE + 1},
+    ],
+)
+def test_list_all_organizations_validates_paging(test_app, test_headers, params):
+    response = test_app.get("/organizations/", headers=test_headers, params=params)
+    assert response.status_code == 422
+
+
+def test_search_organizations_combines_filters(monkeypatch, test_app, test_headers):
+    calls = []
+
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+        async def get_activity_by_id(self, activity_id):
+            return make_activity(activity_id)
+
+        async def search_organizations(self, **kwargs):
+            calls.append(kwargs)
+            return [
+                SimpleNamespace(
+                    id=i, name=f"Milk {i}", building_id=1, distance=i * 10.0
+                )
+                for i in range(1, 4)
+            ]
+
+    monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
+
+    params = {"activity_id": 3, "name": "Milk", "lat": 1, "lon": 2, "radius": 2000}
+    response = test_app.get(
+        "/organizations/search", headers=test_headers, params={**params, "limit": 2}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["items"] == [
+        {"id": 1, "name": "Milk 1", "building_id": 1, "distance": 10.0},
+        {"id": 2, "name": "Milk 2", "building_id": 1, "distance": 20.0},
+    ]
+    assert decode_cursor(body["next_cursor"], "distance", "id") == (20.0, 2)
+    assert calls[0] == {
+        "activity_id": 3,
+        "name": "Milk",
+        "latitude": 1.0,
+        "longitude": 2.0,
+        "radius_meters": 2000.0,
+        "box": None,
+        "limit": 3,
+        "after": None,
+    }
+
+    test_app.get(
+        "/organizations/search",
+        headers=test_headers,
+        params={**params, "limit": 2, "cursor": body["next_cursor"]},
+    )
+    assert calls[1]["after"] == (20.0, 2)
+
+
+def test_search_organizations_shares_cache_between_equivalent_queries(
+    monkeypatch, test_app, test_headers
+):
+    calls = []
+
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+        async def search_organizations(self, **kwargs):
+            calls.append(kwargs)
+            return [SimpleNamespace(id=1, name="Milk", building_id=1, distance=None)]
+
+    monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
+
+    first = test_app.get(
+        "/organizations/search?name=MILK&min_lat=1&max_lat=2&min_lon=3&max_lon=4",
+        headers=test_headers,
+    )
+    second = test_app.get(
+        "/organizations/search?max_lon=4.0&min_lon=3.0&max_lat=2&min_lat=1.0"
+        f"&name=milk&limit={settings.PAGE_SIZE}",
+        headers=test_headers,
+    )
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert first.json()["next_cursor"] is None
+    assert len(calls) == 1
+    assert calls[0]["box"] == (1.0, 2.0, 3.0, 4.0)
+
+
+def test_search_organizations_validation(test_app, test_headers):
+    for params, detail in (
+        ({}, "Please provide a filter"),
+        ({"lat": 1}, "Please provide both 'lat' and 'lon'"),
+        ({"radius": 100, "name": "x"}, "'radius' requires a point ('lat' and 'lon')"),
+        (
+            {"min_lat": 1, "max_lat": 2},
+            "Please provide all rectangle parameters (min_lat, max_lat, min_lon, max_lon)",
+        ),
+    ):
+        response = test_app.get(
+            "/organizations/search", headers=test_headers, params=params
+        )
+        assert response.status_code == 400
+        assert response.json() == {"detail": detail}
+
+
+def test_get_organization_by_id_revalidates_with_etag(
+    monkeypatch, test_app, test_headers
+):
+    loaded = []
+
+    class RepoStub:
+        def __init__(self, session):
+            self.session = session
+
+        async def get_organization_document(self, organization_id):
+            loaded.append(organization_id)
+            return make_document(organization_id)
+
+    monkeypatch.setattr("api.organizations.CrudRepository", RepoStub)
+
+    response = test_app.get("/organizations/1", headers=test_headers)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "public, max-age=180"
+
+    response = test_app.get(
+        "/organizations/1", headers={**test_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert loaded == [1]
+
+    response = test_app.get(
+        "/organizations/1", headers={**test_headers, "If-None-Match": '"other"'}
+    )
+    assert response.status_code == 200
+    assert response.json()["id"] == 1
+    assert loaded == [1]
@@ -0,0 +1,87 @@
+import asyncio
+
+from sqlalchemy.dialects import postgresql
+
+from config import settings
+from core.repository.repository import CrudRepository
+
+
+class SessionStub:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        return ResultStub()
+
+
+class ResultStub:
+    def all(self):
+        return []
+
+    def __iter__(self):
+        return iter([])
+
+
+def run_search(method, *args):
+    session = SessionStub()
+    asyncio.run(getattr(CrudRepository(session=session), method)(*args))
+    return session.statements[0]
+
+
+def test_searches_join_base_tables_by_default(monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_VIEW_ENABLED", False)
+
+    statement = run_search("get_organizations_by_activity", 3)
+    assert "organization_search" not in statement
+    assert "activity_closure" in statement
+
+    statement = run_search("get_organizations_by_area", 1.0, 2.0, 3.0, 4.0)
+    assert "JOIN buildings" in statement
+
+
+def test_searches_read_search_view_when_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_VIEW_ENABLED", True)
+
+    for method, args in (
+        ("get_organizations_by_activity", (3,)),
+        ("get_organizations_by_area", (1.0, 2.0, 3.0, 4.0)),
+        ("get_organizations_by_radius", (1.0, 2.0, 500.0)),
+        ("get_nearest_organizations", (1.0, 2.0, 5, 3)),
+        ("get_organization_by_name", ("Milk",)),
+    ):
+        statement = run_search(method, *args)
+        assert "FROM organization_search" in statement, method
+        assert "JOIN" not in statement, method
+
+    statement = run_search("get_organizations_by_activity", 3)
+    assert "organization_search.activity_ids @>" in statement
+
+
+def test_search_organizations_compiles_filters_into_one_statement(monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_VIEW_ENABLED", True)
+
+    statement = run_search(
+        "search_organizations", 3, "Milk", 1.0, 2.0, 500.0, (0.0, 2.0, 1.0, 3.0), 10
+    )
+    assert "activity_ids @>" in statement
+    assert "search_name LIKE" in statement
+    assert "ST_DWithin" in statement
+    assert "ST_Intersects" in statement
+    assert "ORDER BY organization_search.location <-> " in statement
+    assert "JOIN" not in statement
+
+    statement = run_search("search_organizations", None, "Milk")
+    assert "ORDER BY organization_search.id" in statement
+
+
+def test_wide_boxes_skip_the_envelope_prefilter(monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_VIEW_ENABLED", True)
+
+    statement = run_search("get_organizations_by_area", 1.0, 2.0, 3.0, 4.0)
+    assert "ST_Intersects" in statement
+
+    statement = run_search("get_organizations_by_area", -60.0, 60.0, -150.0, 150.0)
+    assert "ST_Intersects" not in statement
+    assert "organization_search.location IS NOT NULL" in statement
+    assert "organization_search.longitude BETWEEN" in statement